@@ -0,0 +1,222 @@
+"""
+    Algorithm library. Every algorithm is written in the usual notation for the standard frame (U on top, F in front)
+    and can be played in any frame, a mapping from the faces of the notation to the faces of the cube, e.g.
+    {R: L, U: D, F: B}. Played on a compact state (see compact.py), an algorithm is compiled once per frame into a
+    single composite sticker permutation, so applying it costs one itemgetter call like a single move.
+    CaseIndex precomputes, for a step of a method, the algorithms solving every case of the step, so that a solver
+    looks up its case instead of probing the cube with moves.
+"""
+from heapq import heappush, heappop
+from operator import itemgetter
+from constants import CENTERS, F, B, L, R, U, D, CW, ACW, OPPOSITE
+from compact import STICKERS, STICKER_INDEX, MOVE_PERMUTATIONS, SOLVED
+from rubik import Rotate
+
+NOTATION = {'F': F, 'B': B, 'L': L, 'R': R, 'U': U, 'D': D}
+IDENTITY = {face: face for face in CENTERS}
+
+
+def parse(notation):
+    # Returns the (direction, face) moves of an algorithm, e.g. "R U2 R'", in the standard frame.
+    moves = []
+    for token in notation.split():
+        face = NOTATION[token[0]]
+        if token[1:] == "'":
+            moves.append((ACW, face))
+        elif token[1:] in ('', '2'):
+            moves.extend([(CW, face)] * (2 if token[1:] else 1))
+        else:
+            raise ValueError(f'Unknown move {token}')
+    return moves
+
+
+def simplify(moves):
+    """
+        Cancels and merges the turns of (direction, face) moves: turns of a face are added up, also across turns of
+        the opposite face (which commute), and played as the fewest quarter turns (three clockwise become one
+        anticlockwise, four disappear).
+    """
+    turns = []
+    for direction, face in moves:
+        quarter = 1 if direction == CW else 3
+        if turns and turns[-1][0] == face:
+            turns[-1][1] += quarter
+        elif len(turns) > 1 and turns[-1][0] == OPPOSITE[face] and turns[-2][0] == face:
+            turns[-2][1] += quarter
+        else:
+            turns.append([face, quarter])
+        # Drop complete turns, which may bring together turns of the same face.
+        while turns and turns[-1][1] % 4 == 0 or len(turns) > 1 and turns[-2][1] % 4 == 0:
+            turns.pop(-1 if turns[-1][1] % 4 == 0 else -2)
+            if len(turns) > 1 and turns[-1][0] == turns[-2][0]:
+                turns[-2][1] += turns.pop()[1]
+    simplified = []
+    for face, quarter in turns:
+        simplified.extend({1: [(CW, face)], 2: [(CW, face)] * 2, 3: [(ACW, face)]}[quarter % 4])
+    return simplified
+
+
+def invert(moves):
+    # The moves undoing the (direction, face) moves.
+    return [(ACW if direction == CW else CW, face) for direction, face in reversed(moves)]
+
+
+def _frames():
+    # The 24 frames of the cube, keyed by (up, front): the faces the standard faces end up at after rotating.
+    frames, pending = {(U, F): IDENTITY}, [IDENTITY]
+    while pending:
+        frame = pending.pop()
+        for direction in (CW, ACW):
+            for axis in (R, U, F):
+                rotated = {face: Rotate[direction][axis].get(actual, actual) for face, actual in frame.items()}
+                if (rotated[U], rotated[F]) not in frames:
+                    frames[rotated[U], rotated[F]] = rotated
+                    pending.append(rotated)
+    return frames
+
+
+FRAMES = _frames()
+
+
+def frame(up, front):
+    return FRAMES[up, front]
+
+
+class Algorithm:
+    def __init__(self, name, notation, group):
+        self.name = name
+        self.notation = notation
+        self.group = group
+        self.moves = parse(notation)
+        self._compiled = {}
+
+    def moves_in(self, frame=IDENTITY):
+        # The moves to play the algorithm in the frame.
+        return [(direction, frame[face]) for direction, face in self.moves]
+
+    def _compile(self, frame):
+        # The composite sticker permutation of the whole algorithm in the frame and its getter, built on first use.
+        key = tuple(sorted(frame.items()))
+        if key not in self._compiled:
+            stickers = tuple(range(len(STICKERS)))
+            for direction, face in self.moves_in(frame):
+                stickers = itemgetter(*MOVE_PERMUTATIONS[direction, face])(stickers)
+            self._compiled[key] = stickers, itemgetter(*stickers)
+        return self._compiled[key]
+
+    def permutation(self, frame=IDENTITY):
+        return self._compile(frame)[0]
+
+    def apply(self, state, frame=IDENTITY):
+        return bytes(self._compile(frame)[1](state))
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __repr__(self):
+        return f'Algorithm({self.name}, {self.notation})'
+
+
+ALGORITHMS = {algorithm.name: algorithm for algorithm in [
+    # Used by RubikSolver, layer by layer.
+    Algorithm('middle_left', "U' L' U L U F U' F'", 'layer'),
+    Algorithm('middle_right', "U R U' R' U' F' U F", 'layer'),
+    Algorithm('top_cross', "F R U R' U' F'", 'layer'),
+    Algorithm('top_edges', "R U R' U R U2 R' U", 'layer'),
+    Algorithm('top_corners', "U R U' L' U R' U' L", 'layer'),
+    Algorithm('corner_twist', "R' D' R D", 'layer'),
+    # First two layers, inserting a pair from the top layer into the front right slot.
+    Algorithm('f2l_pair_right', "U R U' R'", 'f2l'),
+    Algorithm('f2l_pair_front', "U' F' U F", 'f2l'),
+    Algorithm('f2l_split_right', "R U R'", 'f2l'),
+    Algorithm('f2l_split_front', "F' U' F", 'f2l'),
+    Algorithm('f2l_corner_up', "R U2 R' U' R U R'", 'f2l'),
+    Algorithm('f2l_split_right_prime', "R U' R'", 'f2l'),
+    Algorithm('f2l_split_front_prime', "F' U F", 'f2l'),
+    Algorithm('f2l_split_right_half', "R U2 R'", 'f2l'),
+    Algorithm('f2l_split_front_half', "F' U2 F", 'f2l'),
+    # Orientation of the last layer.
+    Algorithm('oll_sune', "R U R' U R U2 R'", 'oll'),
+    Algorithm('oll_antisune', "R U2 R' U' R U' R'", 'oll'),
+    Algorithm('oll_h', "R U R' U R U' R' U R U2 R'", 'oll'),
+    Algorithm('oll_pi', "R U2 R2 U' R2 U' R2 U2 R", 'oll'),
+    Algorithm('oll_headlights', "R2 D R' U2 R D' R' U2 R'", 'oll'),
+    Algorithm('oll_t', "R U R' U' R' F R F'", 'oll'),
+    Algorithm('oll_line', "F R U R' U' F'", 'oll'),
+    Algorithm('oll_fish', "F R' F' R U R U' R'", 'oll'),
+    # Permutation of the last layer.
+    Algorithm('pll_ua', "R U' R U R U R U' R' U' R2", 'pll'),
+    Algorithm('pll_ub', "R2 U R U R' U' R' U' R' U R'", 'pll'),
+    Algorithm('pll_aa', "R' F R' B2 R F' R' B2 R2", 'pll'),
+    Algorithm('pll_ab', "R2 B2 R F R' B2 R F' R", 'pll'),
+    Algorithm('pll_t', "R U R' U' R' F R2 U' R' U' R U R' F'", 'pll'),
+    Algorithm('pll_jb', "R U R' F' R U R' U' R' F R2 U' R' U'", 'pll'),
+    Algorithm('pll_y', "F R U' R' U' R U R' F' R U R' U' R' F R F'", 'pll'),
+    Algorithm('pll_h', "R2 U2 R U2 R2 U2 R2 U2 R U2 R2", 'pll'),
+    Algorithm('pll_ja', "L' U' L F L' U' L U L F' L2 U L U", 'pll'),
+    Algorithm('pll_ra', "R U' R' U' R U R D R' U' R D' R' U2 R' U'", 'pll'),
+    Algorithm('pll_rb', "R U R' F' R U2 R' U2 R' F R U R U2 R' U'", 'pll'),
+    Algorithm('pll_f', "R' U' F' R U R' U' R' F R2 U' R' U' R U R' U R", 'pll'),
+    Algorithm('pll_na', "R U R' U R U R' F' R U R' U' R' F R2 U' R' U2 R U' R'", 'pll'),
+    # Turns of the top layer, to align a case with its algorithm.
+    Algorithm('u', 'U', 'auf'),
+    Algorithm('u2', 'U2', 'auf'),
+    Algorithm('u_prime', "U'", 'auf'),
+]}
+
+
+def face_key(stickers):
+    """
+        Returns a case key function over the given stickers: the face each sticker's color belongs to. Face turns
+        never move the centers, so the key does not depend on the colors of the cube or its orientation.
+    """
+    centers = [STICKER_INDEX[face, face] for face in CENTERS]
+
+    def key(state):
+        faces = {state[s]: face for s, face in zip(centers, CENTERS)}
+        return tuple(faces[state[s]] for s in stickers)
+
+    return key
+
+
+class CaseIndex:
+    """
+        Maps every case of a step (the key of a state) to the shortest sequence, in moves, of algorithm applications
+        solving it. Choices are (algorithm name, frame) pairs, and each choice must change keys in a way that only
+        depends on the key, which holds for a key made of all the stickers the step's algorithms move that matter.
+        Cases are discovered by playing the choices from the solved state, so the index only covers cases the
+        choices can solve.
+    """
+
+    def __init__(self, key, choices, is_goal, start=SOLVED):
+        self.key = key
+        self.choices = choices
+        states, pending = {key(start): start}, [start]
+        edges = {}
+        while pending:
+            state = pending.pop()
+            for choice, (name, choice_frame) in enumerate(choices):
+                moved = ALGORITHMS[name].apply(state, choice_frame)
+                case = key(moved)
+                edges.setdefault(case, []).append((key(state), choice))
+                if case not in states:
+                    states[case] = moved
+                    pending.append(moved)
+        # Dijkstra backwards from the goal cases, weighted by the move count of every choice.
+        self.cases = {}
+        queue = [(0, case, ()) for case in states if is_goal(case)]
+        while queue:
+            cost, case, sequence = heappop(queue)
+            if case in self.cases:
+                continue
+            self.cases[case] = sequence
+            for previous, choice in edges.get(case, ()):
+                if previous not in self.cases:
+                    heappush(queue, (cost + len(ALGORITHMS[choices[choice][0]]), previous, (choice,) + sequence))
+
+    def lookup(self, state):
+        # The (algorithm name, frame) applications solving the case of the state, KeyError for an unknown case.
+        return [self.choices[choice] for choice in self.cases[self.key(state)]]
+
+    def moves(self, state):
+        return [move for name, choice_frame in self.lookup(state) for move in ALGORITHMS[name].moves_in(choice_frame)]
@@ -0,0 +1,125 @@
+"""
+    Anytime solver: a valid solution right away (RubikSolver), then shorter ones searched in the background (the
+    CFOP solver, then the best of N search over every base and orientation) until the time budget runs out or a
+    solution reaches the target move count. Every improvement is passed to a callback (called from the background
+    thread) and to the async iterators of the search.
+"""
+import asyncio
+from threading import Thread, Lock, Event
+from time import monotonic
+from constants import D
+from compact import encode, decode
+from algorithms import simplify
+from best_of import BestOfSolver, LAYER, CFOP
+from solver import RubikSolver
+from cfop import CFOPSolver
+
+BUDGET = 5.0
+
+
+class AnytimeSearch:
+    def __init__(self, rubik, best_of, budget=BUDGET, target=0, on_improvement=None):
+        self.state = encode(rubik)
+        self.best_of = best_of
+        self.deadline = monotonic() + budget
+        self.target = target
+        self.on_improvement = on_improvement
+        self.lock, self.finished, self.cancelled = Lock(), Event(), False
+        self._queues = []
+        copy, moves = decode(self.state), []
+        for direction, face in RubikSolver.solve(copy, D):
+            copy.move(direction, face)
+            moves.append((direction, face))
+        self.best, self.label = simplify(moves), LAYER
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _searches(self):
+        yield CFOPSolver.solve_state(self.state, D), CFOP
+        if not self._stopped():
+            yield from self.best_of.improvements(decode(self.state), self.deadline - monotonic(), at_least_one=False)
+
+    def _stopped(self):
+        return self.cancelled or len(self.best) <= self.target or monotonic() > self.deadline
+
+    def _run(self):
+        try:
+            for moves, label in self._searches():
+                self._offer(moves, label)
+                if self._stopped():
+                    self.best_of.cancel()
+        finally:
+            with self.lock:
+                self.finished.set()
+                for loop, queue in self._queues:
+                    loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    def _offer(self, moves, label):
+        with self.lock:
+            if len(moves) >= len(self.best):
+                return
+            self.best, self.label = moves, label
+            for loop, queue in self._queues:
+                loop.call_soon_threadsafe(queue.put_nowait, (moves, label))
+        if self.on_improvement:
+            self.on_improvement(moves, label)
+
+    def cancel(self):
+        # Stops the background search, the best solution so far is kept.
+        self.cancelled = True
+        self.best_of.cancel()
+
+    def wait(self, timeout=None):
+        # Waits for the end of the search, returns the best solution.
+        self.finished.wait(timeout)
+        return self.best
+
+    async def improvements(self):
+        # Yields (solution, label) for the best solution so far, then for every improvement until the search ends.
+        loop, queue = asyncio.get_running_loop(), asyncio.Queue()
+        with self.lock:
+            queue.put_nowait((self.best, self.label))
+            if self.finished.is_set():
+                queue.put_nowait(None)
+            else:
+                self._queues.append((loop, queue))
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            yield item
+
+    def __aiter__(self):
+        return self.improvements()
+
+
+class AnytimeSolver:
+    """
+        Keeps the best of N worker pool between searches. Only one search runs at a time, starting one cancels
+        the previous one. The best of N search only tries the CFOP solver by default, as the layer solutions of the
+        other bases and orientations are all longer than the first CFOP one.
+    """
+
+    def __init__(self, processes=None, solvers=(CFOP,)):
+        self.best_of = BestOfSolver(processes, solvers)
+        self.search = None
+
+    def solve(self, rubik, budget=BUDGET, target=0, on_improvement=None):
+        # Returns the running AnytimeSearch, whose best attribute already holds a valid solution.
+        if self.search is not None:
+            self.search.cancel()
+            self.search.wait()
+        self.search = AnytimeSearch(rubik, self.best_of, budget, target, on_improvement)
+        return self.search
+
+    def close(self):
+        if self.search is not None:
+            self.search.cancel()
+            self.search.wait()
+        self.best_of.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,162 @@
+"""
+    Best of N solver: solves the cube from every base face in every one of its 24 orientations (each a candidate,
+    run concurrently by a pool of processes), simplifies every solution and keeps the shortest. Candidates differ
+    because the solvers pick their pieces and algorithm sides in a fixed order of the face positions.
+    A time budget bounds the search: when it runs out, the best solution found so far is returned right away and
+    the candidates not started yet are cancelled. Every search has a generation number, shared with the workers,
+    which skip the candidates of older generations.
+    Solutions are translated back to the original orientation, the cube itself is never rotated.
+"""
+from multiprocessing import Pool, Value, TimeoutError
+from time import monotonic
+from constants import CENTERS, CW, ACW, R, U, F, D
+from compact import SOLVED, encode, decode, rotate
+from algorithms import simplify
+from rubik import Rotate
+from solver import RubikSolver
+
+LAYER, CFOP = 'layer', 'cfop'
+# Solvers from the one giving the shortest solutions, whose candidates run first.
+STRENGTH = [CFOP, LAYER]
+BUDGET = 2.0
+
+
+def _orientations():
+    # The shortest rotation sequences bringing the cube to each of its 24 orientations.
+    found, pending = {SOLVED: ()}, [SOLVED]
+    while pending:
+        state = pending.pop(0)
+        for direction in (CW, ACW):
+            for axis in (R, U, F):
+                rotated = rotate(state, direction, axis)
+                if rotated not in found:
+                    found[rotated] = found[state] + ((direction, axis),)
+                    pending.append(rotated)
+    return list(found.values())
+
+
+ORIENTATIONS = _orientations()
+
+
+def original_faces(rotations):
+    # For every face position after the rotations, the position it had before.
+    positions = {face: face for face in CENTERS}
+    for direction, axis in rotations:
+        positions = {face: Rotate[direction][axis].get(position, position) for face, position in positions.items()}
+    return {position: face for face, position in positions.items()}
+
+
+def _layer_moves(state, base):
+    rubik, moves = decode(state), []
+    for direction, face in RubikSolver.solve(rubik, base):
+        rubik.move(direction, face)
+        moves.append((direction, face))
+    return moves
+
+
+def _cfop_moves(state, base):
+    from cfop import CFOPSolver
+    return CFOPSolver.solve_state(state, base)
+
+
+SOLVERS = {LAYER: _layer_moves, CFOP: _cfop_moves}
+
+# Per process state, set up once by _init_worker.
+_generation = None
+
+
+def _init_worker(generation):
+    global _generation
+    _generation = generation
+
+
+def _candidate(args):
+    # Returns (solution, label) of one candidate, or None if cancelled before it started.
+    generation, state, solver, orientation, base = args
+    if generation != _generation.value:
+        return None
+    rotations = ORIENTATIONS[orientation]
+    for direction, axis in rotations:
+        state = rotate(state, direction, axis)
+    faces = original_faces(rotations)
+    moves = [(direction, faces[face]) for direction, face in SOLVERS[solver](state, base)]
+    return simplify(moves), f'{solver} base {base} orientation {orientation}'
+
+
+class BestOfSolver:
+    """
+        Keeps its pool of workers between solves. Use as a context manager, or call close, to stop the workers.
+        With CFOP, its case tables of every base are built here (a few seconds) before the workers are forked, so
+        that they share them and the budget of a solve is never spent building tables.
+    """
+
+    def __init__(self, processes=None, solvers=(LAYER,), budget=BUDGET):
+        self.solvers = solvers
+        self.budget = budget
+        self.generation = Value('i', 0)
+        if CFOP in solvers:
+            from cfop import CFOPSolver
+            CFOPSolver.build_tables()
+        if processes == 1:
+            _init_worker(self.generation)
+        self.pool = Pool(processes, initializer=_init_worker, initargs=(self.generation,)) \
+            if processes != 1 else None
+
+    def cancel(self):
+        # Cancels the candidates of the running search which did not start yet.
+        with self.generation.get_lock():
+            self.generation.value += 1
+
+    def close(self):
+        if self.pool:
+            self.pool.close()
+            self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def candidates(self, state, generation):
+        # The plain solve of every solver (no rotation, base D) first, then the others of the strongest solver first,
+        # so that a short budget is spent where shorter solutions are likely and never beats the solvers alone.
+        candidates = [(generation, state, solver, orientation, base) for solver in self.solvers
+                      for orientation in range(len(ORIENTATIONS)) for base in CENTERS]
+        return sorted(candidates, key=lambda candidate: (candidate[3:] != (0, D), STRENGTH.index(candidate[2])))
+
+    def improvements(self, rubik, budget=None, at_least_one=True):
+        """
+            Generates (solution, label) every time a candidate beats the best solution so far, until every
+            candidate is done or the budget (seconds) runs out. With at_least_one, the search goes on past the
+            budget until it has a first solution.
+        """
+        deadline = monotonic() + (self.budget if budget is None else budget)
+        self.cancel()
+        tasks = self.candidates(encode(rubik), self.generation.value)
+        results = self.pool.imap_unordered(_candidate, tasks) if self.pool else map(_candidate, tasks)
+        best = None
+        try:
+            while True:
+                try:
+                    if self.pool is None:
+                        result = next(results)
+                    else:
+                        result = results.next(None if best is None and at_least_one else
+                                              max(0, deadline - monotonic()))
+                except (StopIteration, TimeoutError):
+                    break
+                if result is not None and (best is None or len(result[0]) < len(best)):
+                    best = result[0]
+                    yield result
+                if monotonic() > deadline and (best is not None or not at_least_one):
+                    break
+        finally:
+            self.cancel()
+
+    def solve(self, rubik, budget=None):
+        # Returns the shortest solution found within the budget as (direction, face) moves.
+        solution = None
+        for solution, _ in self.improvements(rubik, budget):
+            pass
+        return solution
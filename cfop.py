@@ -0,0 +1,223 @@
+"""
+    CFOP solver, table driven from start to end on compact states (see compact.py):
+        cross - optimal, by descending the distances of a pattern database of the four base edges,
+        F2L   - the corner / edge pairs inserted one slot at a time, each case looked up in a CaseIndex of the slot's
+                triggers (pieces stuck in another slot are taken out first),
+        OLL   - the orientation case of the last layer looked up in a CaseIndex of OLL algorithms and top turns,
+        PLL   - the permutation case likewise, the final top turn (AUF) included.
+    The solution is the shortest over the first CROSSES optimal crosses and every order of the F2L slots after them
+    (about 56 moves and 40ms, against 72 moves and 1ms for the first cross and the cheapest slot first).
+    Every table is built on first use for a base, which takes about 1 to 1.5s per base, so the first solve with a
+    base is that much slower. CFOPSolver.build_tables builds them ahead of time, e.g. before forking workers.
+    Same interface as RubikSolver.solve: the (direction, face) moves to apply in order.
+"""
+from functools import lru_cache
+from constants import CENTERS, EDGES, CORNERS, F, R, D, OPPOSITE, NEIGHBORS
+from compact import FACE_TURNS, STICKER_INDEX, SOLVED, encode, move
+from algorithms import ALGORITHMS, CaseIndex, frame, simplify
+
+AUF = ['u', 'u2', 'u_prime']
+F2L = [name for name, algorithm in ALGORITHMS.items() if algorithm.group == 'f2l']
+OLL = [name for name, algorithm in ALGORITHMS.items() if algorithm.group == 'oll']
+PLL = [name for name, algorithm in ALGORITHMS.items() if algorithm.group == 'pll']
+# Takes the pieces of the front right slot to the top layer.
+EXTRACT = 'f2l_split_right'
+# Optimal crosses tried by default, each followed by every order of the F2L slots.
+CROSSES = 4
+_CENTER_STICKERS = [STICKER_INDEX[face, face] for face in CENTERS]
+_STICKER_LOCATION = {STICKER_INDEX[location, f]: location for location in EDGES + CORNERS for f in location}
+
+
+def _faces(state):
+    return {state[s]: face for s, face in zip(_CENTER_STICKERS, CENTERS)}
+
+
+def _play(state, moves):
+    for direction, face in moves:
+        state = move(state, direction, face)
+    return state
+
+
+def slot_frames(base):
+    # The frame placing each slot (corner and edge between two sides) at the front right, keyed by the slot's sides.
+    up = OPPOSITE[base]
+    return {frozenset((front, frame(up, front)[R])): frame(up, front) for front in NEIGHBORS[up]}
+
+
+@lru_cache(maxsize=None)
+def cross_database(base):
+    from pattern_database import EdgePattern, PatternDatabase
+    return PatternDatabase.generate(EdgePattern([i for i, edge in enumerate(EDGES) if base in edge]))
+
+
+def cross_solutions(state, base=D, limit=1):
+    # The first limit optimal solutions of the cross: the database holds its exact distance, so a turn lowering it is
+    # always on a shortest path, and every such turn is tried in turn.
+    database = cross_database(base)
+    solutions = []
+
+    def descend(index, moves):
+        distance = database.distance(index)
+        if not distance:
+            solutions.append(moves)
+            return
+        for t in range(len(FACE_TURNS)):
+            if len(solutions) == limit:
+                return
+            turned = database.pattern.turn(index, t)
+            if database.distance(turned) < distance:
+                direction, face, times = FACE_TURNS[t]
+                descend(turned, moves + [(direction, face)] * times)
+
+    descend(database.pattern.index(state), [])
+    return solutions
+
+
+def solve_cross(state, base=D):
+    return cross_solutions(state, base)[0]
+
+
+def _locate(state, faces, pieces, piece):
+    # The stickers holding the colors of piece (in the order of its faces), wherever it is.
+    for location in pieces:
+        colors = [faces[state[STICKER_INDEX[location, f]]] for f in location]
+        if set(colors) == set(piece):
+            return tuple(STICKER_INDEX[location, location[colors.index(f)]] for f in piece)
+
+
+def pair_key(base, sides):
+    # Case key of the F2L pair of a slot: where its corner and its edge are, and how they are turned.
+    front, right = sides
+    corner, edge = (base, front, right), (front, right)
+
+    def key(state):
+        faces = _faces(state)
+        return _locate(state, faces, CORNERS, corner) + _locate(state, faces, EDGES, edge)
+
+    return key
+
+
+@lru_cache(maxsize=None)
+def pair_cases(base, sides):
+    slot_frame = slot_frames(base)[frozenset(sides)]
+    key = pair_key(base, (slot_frame[F], slot_frame[R]))
+    solved = key(SOLVED)
+    return CaseIndex(key, [(name, slot_frame) for name in F2L + AUF], lambda case: case == solved)
+
+
+def _slot_location(base, location):
+    # The slot (sides) a corner or edge location belongs to, None for the top layer.
+    if OPPOSITE[base] in location:
+        return None
+    return frozenset(f for f in location if f != base)
+
+
+def _pair_plan(state, base, sides, free):
+    # The moves solving the pair of a slot: its pieces stuck in other free slots are extracted first.
+    frames = slot_frames(base)
+    cases = pair_cases(base, tuple(sorted(sides)))
+    moves = []
+    for _ in range(4):
+        faces = _faces(state)
+        front, right = sorted(sides)
+        corner = _locate(state, faces, CORNERS, (base, front, right))
+        edge = _locate(state, faces, EDGES, (front, right))
+        stuck = [_slot_location(base, _STICKER_LOCATION[stickers[0]]) for stickers in (corner, edge)]
+        stuck = [slot for slot in stuck if slot is not None and slot != frozenset(sides) and slot in free]
+        if not stuck:
+            try:
+                solution = cases.moves(state)
+            except KeyError:
+                stuck = [frozenset(sides)]
+            else:
+                return moves + solution
+        extraction = ALGORITHMS[EXTRACT].moves_in(frames[stuck[0]])
+        moves += extraction
+        state = _play(state, extraction)
+    raise ValueError('F2L pair case not found')
+
+
+def solve_f2l(state, base=D):
+    # Solves the four pairs in the order of slots giving the fewest moves.
+    best = [None]
+    _search_f2l(state, base, frozenset(slot_frames(base)), [], best, last_layer=False)
+    return best[0]
+
+
+def _search_f2l(state, base, free, moves, best, last_layer=True):
+    # Depth first over the orders of the free slots, keeping in best[0] the shortest solution found, the last layer
+    # included if asked. A branch is cut once it is no shorter than the best solution.
+    if not free:
+        solution = simplify(moves + (solve_last_layer(state, base) if last_layer else []))
+        if best[0] is None or len(solution) < len(best[0]):
+            best[0] = solution
+        return
+    for sides in sorted(free, key=sorted):
+        plan = _pair_plan(state, base, sides, free)
+        if best[0] is None or len(simplify(moves + plan)) < len(best[0]):
+            _search_f2l(_play(state, plan), base, free - {sides}, moves + plan, best, last_layer)
+
+
+def _top_frames(base):
+    up = OPPOSITE[base]
+    return [frame(up, front) for front in NEIGHBORS[up]]
+
+
+@lru_cache(maxsize=None)
+def oll_cases(base):
+    # Cases: which stickers of the last layer show the up color.
+    up = OPPOSITE[base]
+    stickers = [STICKER_INDEX[location, f] for location in EDGES + CORNERS if up in location for f in location]
+
+    def key(state):
+        up_color = state[STICKER_INDEX[up, up]]
+        return tuple(state[s] == up_color for s in stickers)
+
+    solved = key(SOLVED)
+    return CaseIndex(key, [(name, f) for name in OLL + AUF for f in _top_frames(base)], lambda case: case == solved)
+
+
+@lru_cache(maxsize=None)
+def pll_cases(base):
+    # Cases: the side colors of the last layer, the last layer being oriented.
+    up = OPPOSITE[base]
+    stickers = [STICKER_INDEX[location, f] for location in EDGES + CORNERS if up in location for f in location
+                if f != up]
+
+    def key(state):
+        faces = _faces(state)
+        return tuple(faces[state[s]] for s in stickers)
+
+    solved = key(SOLVED)
+    return CaseIndex(key, [(name, f) for name in PLL + AUF for f in _top_frames(base)], lambda case: case == solved)
+
+
+def solve_last_layer(state, base=D):
+    # OLL then PLL, each a single case lookup.
+    moves = []
+    for cases in (oll_cases(base), pll_cases(base)):
+        step_moves = cases.moves(state)
+        moves += step_moves
+        state = _play(state, step_moves)
+    return moves
+
+
+class CFOPSolver:
+    @staticmethod
+    def solve_state(state, base=D, crosses=CROSSES):
+        # Returns the (direction, face) moves solving the compact state, the shortest of every order of the F2L slots
+        # after each of the first crosses optimal crosses.
+        best = [None]
+        for cross in cross_solutions(state, base, crosses):
+            _search_f2l(_play(state, cross), base, frozenset(slot_frames(base)), cross, best)
+        return best[0]
+
+    @staticmethod
+    def solve(rubik, base=D, crosses=CROSSES):
+        return iter(CFOPSolver.solve_state(encode(rubik), base, crosses))
+
+    @staticmethod
+    def build_tables(bases=CENTERS):
+        # Builds the case tables of the bases, solving the solved cube looks every one of them up.
+        for base in bases:
+            CFOPSolver.solve_state(SOLVED, base)
@@ -0,0 +1,192 @@
+"""
+    Compact state engine. A state is a bytes object of 54 stickers, each holding the index (in CENTERS) of the face
+    whose color it has. Moves are precomputed sticker permutations derived from the Rubik model (rubik.Move and
+    rubik.Rotate), so applying one is a single itemgetter call instead of moving 26 cubelets.
+    Sticker order: the 6 centers (CENTERS), then each edge (EDGES) and each corner (CORNERS) face by face.
+"""
+from operator import itemgetter
+from constants import CENTERS, EDGES, CORNERS, COLORS, ALL_MOVES
+from constants import F, B, L, R, U, D, CW, ACW
+from rubik import Rubik
+
+STICKERS = [(f, f) for f in CENTERS] + [(e, f) for e in EDGES for f in e] + [(c, f) for c in CORNERS for f in c]
+STICKER_INDEX = {sticker: index for index, sticker in enumerate(STICKERS)}
+COLOR_INDEX = {COLORS[f]: index for index, f in enumerate(CENTERS)}
+INDEX_COLOR = [COLORS[f] for f in CENTERS]
+
+# The face turn metric, 18 turns as (direction, face, times) grouped by face (turn // 3 is the face index).
+TURN_FACES = [U, D, R, L, F, B]
+FACE_TURNS = [(direction, face, times) for face in TURN_FACES for direction, times in ((CW, 1), (CW, 2), (ACW, 1))]
+
+
+def encode(rubik):
+    # Returns the compact state of the rubik.
+    state = bytearray(len(STICKERS))
+    for center in rubik.centers:
+        state[STICKER_INDEX[center.position, center.position]] = COLOR_INDEX[center.color]
+    for piece in (*rubik.edges, *rubik.corners):
+        for position, color in zip(piece.positions, piece.colors):
+            state[STICKER_INDEX[piece.positions, position]] = COLOR_INDEX[color]
+    return bytes(state)
+
+
+def decode(state):
+    # Returns a Rubik with the given compact state.
+    return load(Rubik(), state)
+
+
+def load(rubik, state):
+    # Sets the colors of the rubik to the given compact state, in place, and returns it.
+    for center in rubik.centers:
+        center.color = INDEX_COLOR[state[STICKER_INDEX[center.position, center.position]]]
+    for piece in (*rubik.edges, *rubik.corners):
+        piece.colors = tuple(INDEX_COLOR[state[STICKER_INDEX[piece.positions, f]]] for f in piece.positions)
+    rubik.version += 1
+    rubik._hash = None
+    return rubik
+
+
+def _derive_permutation(transform):
+    # Labels every sticker of a Rubik with its own index, applies the transformation and reads the labels back,
+    # giving for every sticker the index it is taken from.
+    rubik = Rubik()
+    for center in rubik.centers:
+        center.color = STICKER_INDEX[center.position, center.position]
+    for piece in (*rubik.edges, *rubik.corners):
+        piece.colors = tuple(STICKER_INDEX[piece.positions, f] for f in piece.positions)
+    transform(rubik)
+    permutation = [None] * len(STICKERS)
+    for center in rubik.centers:
+        permutation[STICKER_INDEX[center.position, center.position]] = center.color
+    for piece in (*rubik.edges, *rubik.corners):
+        for position, label in zip(piece.positions, piece.colors):
+            permutation[STICKER_INDEX[piece.positions, position]] = label
+    return tuple(permutation)
+
+
+MOVE_PERMUTATIONS = {(d, f): _derive_permutation(lambda rubik, d=d, f=f: rubik.move(d, f)) for d, f in ALL_MOVES}
+ROTATE_PERMUTATIONS = {(d, f): _derive_permutation(lambda rubik, d=d, f=f: rubik.rotate(d, f)) for d, f in ALL_MOVES}
+TURN_PERMUTATIONS = [_derive_permutation(lambda rubik, t=t: rubik.move(*t)) for t in FACE_TURNS]
+
+_move_getters = {key: itemgetter(*p) for key, p in MOVE_PERMUTATIONS.items()}
+_rotate_getters = {key: itemgetter(*p) for key, p in ROTATE_PERMUTATIONS.items()}
+_turn_getters = [itemgetter(*p) for p in TURN_PERMUTATIONS]
+
+SOLVED = encode(Rubik())
+
+
+def apply(state, permutation):
+    return bytes(itemgetter(*permutation)(state))
+
+
+def move(state, direction, face):
+    return bytes(_move_getters[direction, face](state))
+
+
+def rotate(state, direction, face):
+    return bytes(_rotate_getters[direction, face](state))
+
+
+def turn(state, index):
+    # Applies the face turn FACE_TURNS[index].
+    return bytes(_turn_getters[index](state))
+
+
+# Cubie level view of a state, used by the coordinate based searches (pattern databases, IDA*).
+# Pieces are identified by their home slot (index in CORNERS / EDGES), relative to the current center colors.
+# Corner twist is 0 when the U/D colored sticker is on the U/D face, 1 or 2 for a clockwise or anticlockwise twist.
+# Edge flip is 0 when the reference colored sticker (U/D, else F/B) is on the reference face of the slot.
+_AXIS = {R: 0, L: 0, U: 1, D: 1, F: 2, B: 2}
+_CENTER_STICKERS = [STICKER_INDEX[f, f] for f in CENTERS]
+_CORNER_STICKERS = [[STICKER_INDEX[c, f] for f in c] for c in CORNERS]
+_EDGE_STICKERS = [[STICKER_INDEX[e, f] for f in e] for e in EDGES]
+_EDGE_REFERENCE = [e.index(U) if U in e else e.index(D) if D in e else e.index(F) if F in e else e.index(B)
+                   for e in EDGES]
+# The (x, y, z) faces of a corner are in the opposite cyclic order for corners with an odd number of L, D, B faces,
+# so the twist is counted in the other direction for those to keep the total twist a multiple of 3.
+_CORNER_CLOCKWISE = [(c[0] == L) + (c[1] == D) + (c[2] == B) in (0, 2) for c in CORNERS]
+
+
+def _face_colors(state):
+    # Maps every color index to the face whose center currently has it.
+    return {state[index]: face for index, face in zip(_CENTER_STICKERS, CENTERS)}
+
+
+def corner_cubies(state):
+    # Returns (permutation, twist), permutation[slot] being the piece at the slot.
+    faces = _face_colors(state)
+    permutation, twist = [], []
+    for stickers in _CORNER_STICKERS:
+        colors = [faces[state[s]] for s in stickers]
+        piece = CORNERS.index(tuple(sorted(colors, key=_AXIS.get)))
+        up_down = next(i for i, f in enumerate(colors) if f in (U, D))
+        permutation.append(piece)
+        twist.append(0 if up_down == 1 else 1 if (up_down == 2) == _CORNER_CLOCKWISE[len(twist)] else 2)
+    return permutation, twist
+
+
+def edge_cubies(state):
+    # Returns (permutation, flip), permutation[slot] being the piece at the slot.
+    faces = _face_colors(state)
+    permutation, flip = [], []
+    for slot, stickers in enumerate(_EDGE_STICKERS):
+        colors = [faces[state[s]] for s in stickers]
+        key = tuple(sorted(colors, key=_AXIS.get))
+        piece = EDGES.index(key)
+        reference = EDGES[piece][_EDGE_REFERENCE[piece]]
+        permutation.append(piece)
+        flip.append(0 if colors[_EDGE_REFERENCE[slot]] == reference else 1)
+    return permutation, flip
+
+
+# Facelet strings: the state as 54 letters, the initial of the face whose color each sticker has (e.g. 'FBLRUD...').
+FACELET_LETTERS = ''.join(f[0] for f in CENTERS)
+
+
+def to_facelets(state):
+    return ''.join(FACELET_LETTERS[s] for s in state)
+
+
+def from_facelets(facelets):
+    if len(facelets) != len(STICKERS) or any(letter not in FACELET_LETTERS for letter in facelets):
+        raise ValueError(f'Expected {len(STICKERS)} letters out of {FACELET_LETTERS}')
+    return bytes(FACELET_LETTERS.index(letter) for letter in facelets)
+
+
+def _solved_states():
+    # The solved state in each of the 24 spatial orientations of the cube.
+    found, frontier = {SOLVED}, [SOLVED]
+    while frontier:
+        state = frontier.pop()
+        for key in ROTATE_PERMUTATIONS:
+            rotated = rotate(state, *key)
+            if rotated not in found:
+                found.add(rotated)
+                frontier.append(rotated)
+    return frozenset(found)
+
+
+SOLVED_STATES = _solved_states()
+_CENTER_ORIENTATIONS = {state[:len(CENTERS)] for state in SOLVED_STATES}
+
+
+def is_solved(state):
+    # A single set lookup, the state is compared only against the solved state of its own orientation.
+    return state in SOLVED_STATES
+
+
+def _parity(permutation):
+    return sum(1 for i in range(len(permutation)) for j in range(i) if permutation[j] > permutation[i]) % 2
+
+
+def is_valid(state):
+    # Whether the state can be reached from solved, any other state makes the solvers fail or loop forever.
+    if len(state) != len(STICKERS) or state[:len(CENTERS)] not in _CENTER_ORIENTATIONS:
+        return False
+    try:
+        corners, twist = corner_cubies(state)
+        edges, flip = edge_cubies(state)
+    except (ValueError, KeyError, StopIteration):
+        return False
+    return sorted(corners) == list(range(len(CORNERS))) and sorted(edges) == list(range(len(EDGES))) and \
+        sum(twist) % 3 == 0 and sum(flip) % 2 == 0 and _parity(corners) == _parity(edges)
@@ -0,0 +1,252 @@
+"""
+    Grid view, shows several independent cubes side by side (e.g. to compare solver variants).
+    All cubes share a single geometry (one get_init_points output, rotated together by the mouse and arrow keys),
+    which is projected once per view change. Only a cube which is animating projects its own moving stickers.
+    Each cube has its own move queue and animation state, and all of them are drawn in one pass per frame.
+
+    Usage: python grid.py [--cubes 6]
+    Keys are the same as in main.py, moves and functions are applied to every cube.
+"""
+import pygame
+from argparse import ArgumentParser
+from collections import deque
+from math import ceil, sqrt
+from constants import WIDTH, HEIGHT, MOVE_KEY_MAP, ROTATE_KEY_MAP, CW, ACW, MOVE, MOVE2LAYERS, ROTATE, OPPOSITE
+from constants import FUNCTIONAL_KEY_MAP, NEXT_STEP, SHUFFLE
+from constants import F, B, L, R, U, D
+from geometry import get_init_points, z_orientation, xy_projection
+from main import init_mouse_drag, handle_rotation_keys, surf_mid_point
+from utilities import RubikUtilities
+from solver import RubikSolver
+from cfop import CFOPSolver
+from rubik import Rubik
+
+STEP_ANGLE = 5
+BACKGROUND = (128, 128, 128)
+OUTLINE = (128, 128, 128)
+
+# Solver variants compared by the grid, the i-th cube uses the i-th variant (cycled).
+VARIANTS = [(f'base {base}', lambda rubik, base=base: RubikSolver.solve(rubik, base)) for base in (D, U, F, B, L, R)]
+VARIANTS.append(('cfop', CFOPSolver.solve))
+
+
+def init_stickers(centers, edges, corners):
+    # Flattens the geometry into (cubelet positions, index of face in positions, face, surface) stickers.
+    stickers = [(face, 0, face, centers[face]) for face in centers]
+    for edge in edges:
+        stickers.extend((edge, index, face, edges[edge][face]) for index, face in enumerate(edge))
+    for corner in corners:
+        stickers.extend((corner, index, face, corners[corner][face]) for index, face in enumerate(corner))
+    return stickers
+
+
+def is_moving(positions, face, action):
+    # Whether the cubelet at positions is rotated by the given face and action, see moving_points_on_rotation.
+    positions = positions if isinstance(positions, tuple) else (positions,)
+    if action == MOVE:
+        return face in positions
+    elif action == MOVE2LAYERS:
+        return OPPOSITE[face] not in positions
+    return True
+
+
+def project(stickers, rotated=None):
+    """
+        Returns the visible stickers as (sticker index, polygon) sorted back to front.
+        rotated maps sticker index to the surface to use instead of the shared one (for animating cubes).
+    """
+    visible = []
+    for index, sticker in enumerate(stickers):
+        surf = sticker[3] if rotated is None or index not in rotated else rotated[index]
+        if z_orientation(surf) > 0:
+            visible.append((surf_mid_point(surf).z, index, xy_projection(surf)))
+    visible.sort(key=lambda v: v[0])
+    return [(index, polygon) for _, index, polygon in visible]
+
+
+class GridCube:
+    """
+        A cube in the grid with its own rubik, move queue and animation state.
+        The queue holds either moves (direction, face, action) or solver factories, called with the rubik once
+        every move before them is applied, as the solvers inspect the state when they start.
+    """
+
+    def __init__(self, name, solve):
+        self.name = name
+        self.solve = solve
+        self.rubik = Rubik()
+        self.queue = deque()
+        self.generator = None
+        self.animation = None  # [direction, face, action, angle] of the running move.
+        self.colors, self.colors_version = None, None
+
+    def busy(self):
+        return self.animation is not None or self.generator is not None or bool(self.queue)
+
+    def next_move(self):
+        while True:
+            if self.generator is not None:
+                try:
+                    direction, face = next(self.generator)
+                    return direction, face, MOVE
+                except StopIteration:
+                    self.generator = None
+            if not self.queue:
+                return None
+            item = self.queue.popleft()
+            if callable(item):
+                self.generator = iter(item(self.rubik))
+            else:
+                return item
+
+    def step(self):
+        # Advances the running animation by a frame or starts the next move, returns whether anything changed.
+        if self.animation is None:
+            move = self.next_move()
+            if move is None:
+                return False
+            self.animation = [*move, 0]
+        self.animation[3] += STEP_ANGLE
+        if self.animation[3] >= 90:
+            direction, face, action, _ = self.animation
+            self.rubik.transform(direction, face, action)
+            self.animation = None
+        return True
+
+    def run_instantly(self, solve):
+        # Applies all the moves of a solver without animation (only when idle).
+        for direction, face in solve(self.rubik):
+            self.rubik.move(direction, face)
+
+    def sticker_colors(self, stickers):
+        # Colors per sticker, looked up from the rubik only when its state changed.
+        if self.colors_version != self.rubik.version:
+            pieces = {}
+            for positions, _, _, _ in stickers:
+                if positions not in pieces:
+                    pieces[positions] = self.rubik.get_colors(positions)
+            self.colors = [pieces[positions] if isinstance(positions, str) else pieces[positions][index]
+                           for positions, index, _, _ in stickers]
+            self.colors_version = self.rubik.version
+        return self.colors
+
+    def rotated_surfaces(self, stickers, centers):
+        # Surfaces of the moving stickers at the current animation angle, computed from the shared geometry.
+        direction, face, action, angle = self.animation
+        angle = -angle if direction == CW else angle
+        axis = surf_mid_point(centers[face])
+        return {index: [p.rotate(angle, axis) for p in sticker[3]]
+                for index, sticker in enumerate(stickers) if is_moving(sticker[0], face, action)}
+
+
+def grid_cells(count, width, height):
+    # Returns (x offset, y offset, scale) of each cell, scale being relative to the single cube window.
+    cols = ceil(sqrt(count))
+    rows = ceil(count / cols)
+    cell_w, cell_h = width / cols, height / rows
+    scale = min(cell_w / WIDTH, cell_h / HEIGHT)
+    return [((i % cols) * cell_w + (cell_w - WIDTH * scale) / 2, (i // cols) * cell_h + (cell_h - HEIGHT * scale) / 2,
+             scale) for i in range(count)]
+
+
+def draw_grid(win, cubes, cells, stickers, centers, shared_projection, font):
+    # Collect the polygons of every cube first, then draw them all in one pass.
+    polygons = []
+    for cube, (x, y, scale) in zip(cubes, cells):
+        colors = cube.sticker_colors(stickers)
+        visible = shared_projection if cube.animation is None else \
+            project(stickers, cube.rotated_surfaces(stickers, centers))
+        for index, polygon in visible:
+            polygons.append((colors[index], [(x + p.x * scale, y + p.y * scale) for p in polygon]))
+
+    win.fill(BACKGROUND)
+    for color, polygon in polygons:
+        pygame.draw.polygon(win, color, polygon)
+        pygame.draw.polygon(win, OUTLINE, polygon, 1)
+    for cube, (x, y, _) in zip(cubes, cells):
+        win.blit(font.render(cube.name, True, (0, 0, 0)), (x + 5, y + 5))
+
+
+def init_grid_keys(cubes):
+    def handle_key_event(event):
+        if event.type != pygame.KEYDOWN:
+            return
+        keys = pygame.key.get_pressed()
+        shift_pressed = keys[pygame.K_RSHIFT] or keys[pygame.K_LSHIFT]
+        direction = ACW if shift_pressed else CW
+        if event.key in MOVE_KEY_MAP:
+            action = MOVE2LAYERS if keys[pygame.K_LCTRL] or keys[pygame.K_RCTRL] else MOVE
+            for cube in cubes:
+                cube.queue.append((direction, MOVE_KEY_MAP[event.key], action))
+        elif event.key in ROTATE_KEY_MAP:
+            for cube in cubes:
+                cube.queue.append((direction, ROTATE_KEY_MAP[event.key], ROTATE))
+        elif event.key in FUNCTIONAL_KEY_MAP:
+            func = FUNCTIONAL_KEY_MAP[event.key]
+            if func == SHUFFLE:
+                # Same shuffle for every cube, so that the variants solve the same state.
+                moves = [RubikUtilities.random_move() for _ in range(50)]
+                solve = lambda rubik: iter(moves)
+            elif func == NEXT_STEP:
+                solve = lambda rubik: RubikSolver.solve_next_step(rubik, D)
+            else:
+                solve = None
+            for cube in cubes:
+                cube_solve = solve or cube.solve
+                if shift_pressed:
+                    cube.queue.append(cube_solve)
+                elif not cube.busy():
+                    cube.run_instantly(cube_solve)
+
+    return handle_key_event
+
+
+def mainloop(count):
+    pygame.init()
+    clock = pygame.time.Clock()
+    win = pygame.display.set_mode((WIDTH * 2, HEIGHT * 2) if count > 1 else (WIDTH, HEIGHT))
+    pygame.display.set_caption("Rubik's Cube Grid")
+    font = pygame.font.Font(None, 20)
+    cubes = [GridCube(*VARIANTS[i % len(VARIANTS)]) for i in range(count)]
+    cells = grid_cells(count, *win.get_size())
+
+    points, centers, edges, corners = get_init_points()
+    stickers = init_stickers(centers, edges, corners)
+    view_changed = True
+
+    def on_view_change():
+        nonlocal view_changed
+        view_changed = True
+
+    handle_mouse_drag = init_mouse_drag(points, on_view_change)
+    handle_key_event = init_grid_keys(cubes)
+    shared_projection = None
+    versions = None
+
+    run = True
+    while run:
+        clock.tick(60)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or \
+                    (event.type == pygame.KEYDOWN and event.key in (pygame.K_ESCAPE, pygame.K_q)):
+                run = False
+            handle_mouse_drag(event)
+            handle_key_event(event)
+        if handle_rotation_keys(points):
+            view_changed = True
+
+        animating = [cube.step() for cube in cubes]
+        if view_changed:
+            shared_projection = project(stickers)
+        current_versions = [cube.rubik.version for cube in cubes]
+        if view_changed or any(animating) or current_versions != versions:
+            draw_grid(win, cubes, cells, stickers, centers, shared_projection, font)
+            pygame.display.update()
+        view_changed, versions = False, current_versions
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Show several independently animated cubes side by side.')
+    parser.add_argument('--cubes', type=int, default=len(VARIANTS))
+    mainloop(parser.parse_args().cubes)
@@ -1,4 +1,8 @@
+import sys
 import pygame
+import profiling
+from telemetry import FrameTelemetry
+from argparse import ArgumentParser
 from geometry import get_init_points
 from constants import WIDTH, HEIGHT, MOVE_KEY_MAP, ROTATE_KEY_MAP, CW, ACW, MOVE, MOVE2LAYERS, ROTATE, OPPOSITE
 from constants import SAVE_POSITION, RESET_POSITION, SAVE_KEY_MAP
@@ -7,14 +11,16 @@ from constants import F, B, L, R, U, D
 from constants import ROTATIONAL_SPEED
 from utilities import RubikUtilities
 from solver import RubikSolver
+from algorithms import simplify, invert
 from copy import deepcopy
+from threading import Thread
 from geometry import z_orientation, xy_projection
 from functools import reduce
 from operator import add
 from rubik import Rubik
 
 
-def init_mouse_drag(points):
+def init_mouse_drag(points, on_change):
     dragging = False
 
     def handle_mouse_drag(event):
@@ -34,11 +40,13 @@ def init_mouse_drag(points):
             for point in points:
                 point.rotate_x_ip(y)
                 point.rotate_y_ip(x)
+            if x or y:
+                on_change()
 
     return handle_mouse_drag
 
 
-def handle_save_points(points):
+def handle_save_points(points, on_change):
     saved_points = deepcopy(points)
 
     def save_positions():
@@ -48,6 +56,7 @@ def handle_save_points(points):
     def reset_positions():
         for p, sp in zip(points, saved_points):
             p.update(sp)
+        on_change()
 
     return save_positions, reset_positions
 
@@ -75,10 +84,9 @@ def init_handle_keys(init_move, save_positions, reset_positions):
     return handle_key_event
 
 
-def draw_surface(win, color, surf):
-    if z_orientation(surf) > 0:
-        pygame.draw.polygon(win, color, xy_projection(surf))
-        pygame.draw.polygon(win, (128, 128, 128), xy_projection(surf), 1)
+def draw_surface(win, color, polygon):
+    pygame.draw.polygon(win, color, polygon)
+    pygame.draw.polygon(win, (128, 128, 128), polygon, 1)
 
 
 def surf_mid_point(surf):
@@ -142,7 +150,7 @@ def moving_points_on_rotation(face, action, centers, edges, corners):
     return points, rotation_axis
 
 
-def animation(rubik, centers, edges, corners):
+def animation(rubik, centers, edges, corners, on_change):
     # Implements the animation for move.
     # Also completes the move by applying it on the rubik's after animation is complete.
     running = False
@@ -172,6 +180,7 @@ def animation(rubik, centers, edges, corners):
         for p in rotation_points:
             p.rotate_ip(-step_angle if rotation_direction == CW else step_angle, rotation_axis)
         current_angle = current_angle + step_angle
+        on_change()
         if current_angle >= 90:
             for ip, rp in zip(initial_points, rotation_points):
                 rp.update(ip)
@@ -181,7 +190,7 @@ def animation(rubik, centers, edges, corners):
     return in_progress, init_move, animate
 
 
-def draw_rubik(win, rubik, centers, edges, corners):
+def sort_surfaces(rubik, centers, edges, corners):
     surfaces = []
     for face in centers:
         surfaces.append((rubik.get_colors(face), centers[face]))
@@ -196,12 +205,20 @@ def draw_rubik(win, rubik, centers, edges, corners):
     # Sort the surfaces according to their average z axis
     # hinge that this will surfaces on top to be drawn later on.
     surfaces.sort(key=lambda v: surf_mid_point(v[1]).z)
+    return surfaces
 
-    for color, surf in surfaces:
-        draw_surface(win, color, surf)
 
+def project_surfaces(surfaces):
+    # The screen polygon of every (color, surface) facing the viewer, in drawing order.
+    return [(color, xy_projection(surf)) for color, surf in surfaces if z_orientation(surf) > 0]
 
-def draw_orientation(win, rubik):
+
+def draw_rubik(win, rubik, centers, edges, corners):
+    for color, polygon in project_surfaces(sort_surfaces(rubik, centers, edges, corners)):
+        draw_surface(win, color, polygon)
+
+
+def orientation_surface(rubik):
     w, h = WIDTH / 3.5, HEIGHT / 4
     f = lambda *v: tuple(int(i) for i in v)
     surf = pygame.Surface(f(w, h))
@@ -213,11 +230,55 @@ def draw_orientation(win, rubik):
              R: f(2 * w / 5, h / 4, w / 5, h / 4), B: f(3 * w / 5, h / 4, w / 5, h / 4)}
     for f in faces:
         pygame.draw.rect(surf, rubik.get_colors(f), faces[f])
-    win.blit(surf, rect)
+    return surf, rect
+
+
+def draw_orientation(win, rubik):
+    win.blit(*orientation_surface(rubik))
+
+
+def init_render_scheduler(win, rubik, centers, edges, corners, overlay=None):
+    # Redraws the frame only when the view, the cube state or an animation changed since the last frame.
+    # An idle cube is never redrawn, the display simply keeps showing the cached frame.
+    # overlay(win), if given, draws on top of the frame every time it is shown.
+    frame = pygame.Surface(win.get_size())
+    dirty = True
+    drawn_version = None
+    orientation, orientation_version = None, None
+
+    def mark_dirty():
+        nonlocal dirty
+        dirty = True
+
+    def refresh():
+        # Window got exposed (uncovered/restored), the cached frame is still valid so only re-blit it.
+        win.blit(frame, (0, 0))
+        if overlay is not None:
+            overlay(win)
+        pygame.display.update()
+
+    def render():
+        nonlocal dirty, drawn_version, orientation, orientation_version
+        if not dirty and drawn_version == rubik.version:
+            return False
+        if orientation_version != rubik.version:
+            # The mini-map depends only on the center colors, so it is kept until the rubik changes.
+            orientation = orientation_surface(rubik)
+            orientation_version = rubik.version
+        frame.fill((128, 128, 128))
+        frame.blit(*orientation)
+        draw_rubik(frame, rubik, centers, edges, corners)
+        refresh()
+        dirty = False
+        drawn_version = rubik.version
+        return True
+
+    return render, mark_dirty, refresh
 
 
 def handle_rotation_keys(points):
     # Handle Key Inputs for Cube Rotation.
+    # Returns whether the view was rotated.
     keys = pygame.key.get_pressed()
     if keys[pygame.K_UP]:
         for p in points:
@@ -237,6 +298,8 @@ def handle_rotation_keys(points):
     if keys[pygame.K_RIGHTBRACKET]:
         for p in points:
             p.rotate_z_ip(-ROTATIONAL_SPEED)
+    return any(keys[k] for k in (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT,
+                                 pygame.K_LEFTBRACKET, pygame.K_RIGHTBRACKET))
 
 
 def shuffle_generator():
@@ -244,7 +307,59 @@ def shuffle_generator():
         yield RubikUtilities.random_move()
 
 
-def init_functional_keys(rubik, init_move):
+def anytime_generator(rubik, anytime):
+    # Plays the layer solution right away, then switches to a shorter one found by the background search. The search
+    # starts from the scrambled state as soon as the anytime solver is ready, anytime() returning None until then.
+    scrambled, copy, moves = deepcopy(rubik), deepcopy(rubik), []
+    for direction, face in RubikSolver.solve(copy, D):
+        copy.move(direction, face)
+        moves.append((direction, face))
+    best = simplify(moves)
+    search, played, remaining = None, [], list(best)
+    while remaining:
+        if search is None and anytime() is not None:
+            search = anytime().solve(scrambled)
+        if search is not None and search.best is not best:
+            best = search.best
+            # From the current state, undoing the moves played then playing the new solution.
+            switched = simplify(invert(played) + best)
+            if len(switched) < len(remaining):
+                remaining = switched
+                if not remaining:
+                    break
+        played.append(remaining.pop(0))
+        yield played[-1]
+    if search is not None:
+        search.cancel()
+
+
+def start_anytime_solver():
+    # Returns get and close. The first get starts building the anytime solver (its CFOP tables, then its worker pool)
+    # in the background, get returns None until it is ready, so that the window never waits for it. close stops its
+    # workers, if it was ever started.
+    solver, thread = [], None
+
+    def build():
+        from anytime import AnytimeSolver
+        solver.append(AnytimeSolver())
+
+    def get():
+        nonlocal thread
+        if thread is None:
+            thread = Thread(target=build, daemon=True)
+            thread.start()
+        return solver[0] if solver else None
+
+    def close():
+        if thread is not None:
+            thread.join()
+            if solver:
+                solver[0].close()
+
+    return get, close
+
+
+def init_functional_keys(rubik, init_move, anytime):
     def handle_functional_keys(event):
         if event.type == pygame.KEYDOWN and event.key in FUNCTIONAL_KEY_MAP:
             keys = pygame.key.get_pressed()
@@ -274,7 +389,7 @@ def init_functional_keys(rubik, init_move):
             generator = RubikSolver.solve_next_step(rubik, D)
         elif func == SOLVE:
             running = True
-            generator = RubikSolver.solve(rubik, D)
+            generator = anytime_generator(rubik, anytime)
 
     def continue_function():
         nonlocal running
@@ -291,7 +406,28 @@ def init_functional_keys(rubik, init_move):
     return handle_functional_keys, in_progress, continue_function
 
 
-def mainloop():
+def profile_phases(profiler):
+    # The functions timed as phases in profiling mode (see profiling.py), besides those of the mainloop. Each runs
+    # at most a few times a frame: functions called for every surface or move (xy_projection, Rubik.move) are left
+    # to the sampling profiler, as timing every call would weigh on the very timings measured.
+    module = sys.modules[__name__]
+    profiler.wrap(RubikSolver, 'solve', 'RubikSolver.solve')
+    profiler.wrap(module, 'draw_rubik')
+    profiler.wrap(module, 'sort_surfaces', 'sort')
+    profiler.wrap(module, 'project_surfaces', 'project')
+    profiler.wrap(module, 'orientation_surface', 'draw_orientation')
+    profiler.wrap(module, 'draw_overlay', 'overlay')
+    profiler.wrap(pygame.display, 'update', 'display.update')
+
+
+def draw_overlay(win, telemetry):
+    # Draws the frame-time overlay (see telemetry.py) on the window, returns its rect if it changed since, else None.
+    surface, rect, changed = telemetry.overlay()
+    win.blit(surface, rect)
+    return rect if changed else None
+
+
+def mainloop(profiler=profiling.DISABLED, telemetry=None):
     pygame.init()
     clock = pygame.time.Clock()
     win = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -299,35 +435,69 @@ def mainloop():
     run = True
     rubik = Rubik()
     points, centers, edges, corners = get_init_points()
-    save_positions, reset_positions = handle_save_points(points)
-    handle_mouse_drag = init_mouse_drag(points)
-    in_progress_animation, init_move, animate = animation(rubik, centers, edges, corners)
-    handle_functional_keys, in_progress_function, continue_function = init_functional_keys(rubik, init_move)
+    overlay = (lambda surface: draw_overlay(surface, telemetry)) if telemetry and telemetry.show else None
+    render, mark_dirty, refresh = init_render_scheduler(win, rubik, centers, edges, corners, overlay)
+    save_positions, reset_positions = handle_save_points(points, mark_dirty)
+    handle_mouse_drag = init_mouse_drag(points, mark_dirty)
+    in_progress_animation, init_move, animate = animation(rubik, centers, edges, corners, mark_dirty)
+    anytime, close_anytime = start_anytime_solver()
+    handle_functional_keys, in_progress_function, continue_function = init_functional_keys(rubik, init_move, anytime)
     handle_key_event = init_handle_keys(init_move, save_positions, reset_positions)
 
+    profiler = profiling.combine(profiler, telemetry or profiling.DISABLED)
+    profile_phases(profiler)
+
     while run:
         clock.tick(60)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT or \
-                    (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE) or \
-                    (event.type == pygame.KEYDOWN and event.key == pygame.K_q):
-                run = False
-            if not in_progress_animation() and not in_progress_function():
-                handle_mouse_drag(event)
-                handle_key_event(event)
-                handle_functional_keys(event)
-        if in_progress_animation():
-            animate()
-        elif in_progress_function():
-            continue_function()
-        else:
-            handle_rotation_keys(points)
-
-        win.fill((128, 128, 128))
-        draw_orientation(win, rubik)
-        draw_rubik(win, rubik, centers, edges, corners)
-        pygame.display.update()
+        with profiler.phase('frame'):
+            with profiler.phase('events'):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT or \
+                            (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE) or \
+                            (event.type == pygame.KEYDOWN and event.key == pygame.K_q):
+                        run = False
+                    if event.type == pygame.VIDEOEXPOSE:
+                        refresh()
+                    if not in_progress_animation() and not in_progress_function():
+                        handle_mouse_drag(event)
+                        handle_key_event(event)
+                        handle_functional_keys(event)
+            if in_progress_animation():
+                with profiler.phase('animate'):
+                    animate()
+            elif in_progress_function():
+                with profiler.phase('function'):
+                    continue_function()
+            elif handle_rotation_keys(points):
+                mark_dirty()
+
+            with profiler.phase('render'):
+                drawn = render()
+            if overlay is not None and not drawn:
+                # Between redraws of the cube, only the overlay is updated, when its numbers changed.
+                rect = overlay(win)
+                if rect is not None:
+                    pygame.display.update(rect)
+    close_anytime()
     pygame.quit()
 
 
-mainloop()
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Rubik's cube window.")
+    parser.add_argument('--profile', nargs='?', const=profiling.DIRECTORY, metavar='DIRECTORY',
+                        help=f'Profile the session into DIRECTORY (default {profiling.DIRECTORY}), also enabled by the '
+                             f'{profiling.ENVIRONMENT} environment variable')
+    parser.add_argument('--profiler', choices=(profiling.SAMPLE, profiling.CPROFILE), default=profiling.SAMPLE)
+    parser.add_argument('--overlay', action='store_true', help='Show fps and frame times by phase')
+    parser.add_argument('--histogram', metavar='PATH', help='Write histograms of the frame times to PATH on exit')
+    args = parser.parse_args()
+    session = profiling.from_settings(args.profile, args.profiler)
+    telemetry = FrameTelemetry(args.histogram, show=args.overlay) if args.overlay or args.histogram else None
+    try:
+        mainloop(session, telemetry)
+    finally:
+        if telemetry is not None and telemetry.stop():
+            print(f'Frame time histograms written to {args.histogram}')
+        directory = session.stop()
+        if directory:
+            print(f'Profile written to {directory}')
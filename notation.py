@@ -0,0 +1,136 @@
+"""
+    WCA notation. A sequence such as "R U R' U' F2" or "Rw2 3Fw' M E2 S' x y2 z'" is tokenized into turns of layers,
+    then compiled into a single composite sticker permutation, of compact states (see compact.py) or of NxN cubes
+    (see nxn.py). Compiled sequences are kept in a bounded LRU cache, so replaying a known sequence costs one
+    permutation of the state whatever its length.
+        R L U D F B   the outer layer, clockwise as seen from the face (' anticlockwise, 2 a half turn)
+        Rw or r       wide, the outer layer and the one below it, nRw (or nr) the n outer layers
+        nR            the n-th layer alone, counted from the face (big cubes)
+        M E S         the middle layers, turning like L, D and F
+        x y z         the whole cube, turning like R, U and F
+    Spaces between moves are optional.
+"""
+import re
+from functools import lru_cache
+from operator import itemgetter
+from constants import F, B, L, R, U, D, CW, ACW, OPPOSITE
+from compact import STICKERS, MOVE_PERMUTATIONS, ROTATE_PERMUTATIONS, encode, load
+
+FACES = {'F': F, 'B': B, 'L': L, 'R': R, 'U': U, 'D': D}
+# Slices and rotations as (face they turn like, first layer, last layer), negative layers counted from the far side.
+SLICES = {'M': (L, 1, -2), 'E': (D, 1, -2), 'S': (F, 1, -2), 'x': (R, 0, -1), 'y': (U, 0, -1), 'z': (F, 0, -1)}
+TOKEN = re.compile(r"\s*(\d*)([RLUDFB]w|[RLUDFBrludfbMESxyz])(\d*)('?)")
+# Compiled sequences kept, per kind of state.
+CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse(text):
+    """
+        Returns the turns of a sequence as (face, first layer, last layer, quarter turns clockwise) tuples, layers
+        counted from the face (0 being the face itself), negative ones from the far side (-1 the opposite face).
+    """
+    turns = []
+    end = 0
+    for match in TOKEN.finditer(text):
+        if match.start() != end:
+            break
+        end = match.end()
+        layers, move, amount, prime = match.groups()
+        if move in SLICES:
+            face, first, last = SLICES[move]
+        elif move.islower() or move.endswith('w'):
+            face, first, last = FACES[move[0].upper()], 0, int(layers or 2) - 1
+        else:
+            face, first = FACES[move], int(layers or 1) - 1
+            last = first
+        if layers and move in SLICES or layers == '0':
+            raise ValueError(f'Unknown move {match.group().strip()}')
+        quarters = int(amount or 1) * (-1 if prime else 1) % 4
+        if quarters:
+            turns.append((face, first, last, quarters))
+    if text[end:].strip():
+        raise ValueError(f'Unknown move at "{text[end:].strip()}"')
+    return tuple(turns)
+
+
+def _layers(n, first, last):
+    first, last = first % n if first < 0 else first, last % n if last < 0 else last
+    if not first <= last < n:
+        raise ValueError(f'No such layers on a {n}x{n}x{n} cube')
+    return range(first, last + 1)
+
+
+def _compact_layer(face, layer):
+    # The compact permutations turning one layer of the 3x3 clockwise as seen from face.
+    if layer == 0:
+        return [MOVE_PERMUTATIONS[CW, face]]
+    if layer == 2:
+        return [MOVE_PERMUTATIONS[ACW, OPPOSITE[face]]]
+    # The middle layer: the whole cube, with its two outer layers turned back.
+    return [ROTATE_PERMUTATIONS[CW, face], MOVE_PERMUTATIONS[ACW, face], MOVE_PERMUTATIONS[CW, OPPOSITE[face]]]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def permutation(text):
+    # The composite permutation of a sequence on compact states: state[i] is taken from permutation[i].
+    stickers = tuple(range(len(STICKERS)))
+    for face, first, last, quarters in parse(text):
+        if (first, last) in ((0, -1), (0, 2)):
+            steps = [ROTATE_PERMUTATIONS[CW, face]]
+        else:
+            steps = [p for layer in _layers(3, first, last) for p in _compact_layer(face, layer)]
+        for _ in range(quarters):
+            for step in steps:
+                stickers = itemgetter(*step)(stickers)
+    return stickers
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _getter(text):
+    return itemgetter(*permutation(text))
+
+
+def apply(state, text):
+    # Plays a sequence on a compact state.
+    return bytes(_getter(text)(state))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def nxn_permutation(n, text):
+    # The composite permutation of a sequence on NxN cubes, as a numpy index array: stickers = stickers[permutation].
+    from nxn import layer_turn, solved
+    import numpy as np
+    stickers = np.arange(len(solved(n)))
+    for face, first, last, quarters in parse(text):
+        for layer in _layers(n, first, last):
+            moving, destination = layer_turn(n, face, layer, CW)
+            turn = np.arange(len(stickers))
+            turn[destination] = moving
+            for _ in range(quarters):
+                stickers = stickers[turn]
+    return stickers
+
+
+def play(rubik, text):
+    # Plays a sequence on a Rubik or an NxNRubik with a single permutation of its state.
+    if hasattr(rubik, 'stickers'):
+        rubik.stickers = rubik.stickers[nxn_permutation(rubik.n, text)]
+        rubik.version += 1
+    else:
+        load(rubik, apply(encode(rubik), text))
+    return rubik
+
+
+def notation(moves):
+    # Writes (direction, face) moves in WCA notation, repeated quarter turns merged, e.g. "R U2 R'".
+    letters = {face: letter for letter, face in FACES.items()}
+    tokens = []
+    for direction, face in moves:
+        quarter = 1 if direction == CW else 3
+        if tokens and tokens[-1][0] == face:
+            tokens[-1][1] += quarter
+        else:
+            tokens.append([face, quarter])
+    return ' '.join(letters[face] + {1: '', 2: '2', 3: "'"}[quarter % 4] for face, quarter in tokens if quarter % 4)
+
@@ -0,0 +1,137 @@
+"""
+    NxN cube state engine (2x2 up to large N), array backed: the state is a numpy uint8 array of 6 N^2 stickers,
+    each holding the index (in CENTERS) of the face whose color it has. Faces are stored in CENTERS order, each
+    as N rows of N stickers as seen from outside the face (rows from top to bottom, see FACE_AXES for the axes).
+    The geometry is generated for any N: a sticker is a square of side 2 / N on the surface of the [-1, 1] cube,
+    the same coordinates as geometry.py (x right, y up, z front).
+    A turn of one layer is a pair of index arrays (source and destination stickers) derived from the geometry,
+    applied with one fancy indexing assignment, so its cost is proportional to the stickers it moves (4N for an
+    inner slice, 4N + N^2 for an outer layer) and not to the whole cube. Tables are built on first use.
+    Requires numpy.
+"""
+import numpy as np
+from functools import lru_cache
+from constants import CENTERS, F, B, L, R, U, D, CW, ACW
+
+# For every face: outward normal, then the directions of increasing column and of decreasing row as seen from
+# outside the face (column x row = normal, which also orders the corners of every sticker counterclockwise).
+FACE_AXES = {
+    F: ((0, 0, 1), (1, 0, 0), (0, 1, 0)),
+    B: ((0, 0, -1), (-1, 0, 0), (0, 1, 0)),
+    L: ((-1, 0, 0), (0, 0, 1), (0, 1, 0)),
+    R: ((1, 0, 0), (0, 0, -1), (0, 1, 0)),
+    U: ((0, 1, 0), (1, 0, 0), (0, 0, -1)),
+    D: ((0, -1, 0), (1, 0, 0), (0, 0, 1)),
+}
+NORMALS = {face: np.array(axes[0]) for face, axes in FACE_AXES.items()}
+
+
+@lru_cache(maxsize=None)
+def sticker_geometry(n):
+    """
+        Returns (centers, corners) of the 6 N^2 stickers: centers scaled by N (integers, which identify stickers
+        exactly), corners as an (6 N^2, 4, 3) float array of the counterclockwise corners on the [-1, 1] cube.
+    """
+    offsets = np.arange(n)
+    centers, corners = [], []
+    for face in CENTERS:
+        normal, column, row = (np.array(axis) for axis in FACE_AXES[face])
+        # Sticker (r, c) spans [-1 + 2c / N, -1 + 2(c + 1) / N] along column, from the top row down.
+        c, r = np.meshgrid(offsets, offsets)
+        c, r = c.ravel()[:, None], r.ravel()[:, None]
+        centers.append(normal * n + column * (2 * c + 1 - n) + row * (n - 2 * r - 1))
+        quad = [(c, r + 1), (c + 1, r + 1), (c + 1, r), (c, r)]
+        corners.append(np.stack([normal + column * (2 * x / n - 1) + row * (1 - 2 * y / n) for x, y in quad], axis=1))
+    return np.concatenate(centers), np.concatenate(corners).astype(np.float32)
+
+
+def _rotate(vectors, axis, direction):
+    # Quarter turn of integer vectors about an outward axis, clockwise as seen from outside for CW.
+    cross = np.cross(axis, vectors)
+    along = np.outer(vectors @ axis, axis)
+    return along - cross if direction == CW else along + cross
+
+
+@lru_cache(maxsize=None)
+def layer_turn(n, face, layer, direction):
+    """
+        Returns (source, destination) sticker indices of a quarter turn of the layer-th layer under face
+        (0 being the face itself, n - 1 the opposite face): state[destination] = state[source].
+    """
+    centers, _ = sticker_geometry(n)
+    axis = NORMALS[face]
+    # Coordinate along the axis: n for the face, n - 1 - 2 layer for the stickers around the layer.
+    depth = centers @ axis
+    moving = np.flatnonzero((depth == n - 1 - 2 * layer) | (layer == 0) & (depth == n) |
+                            (layer == n - 1) & (depth == -n))
+    keys = _keys(centers, n)
+    order = np.argsort(keys)
+    destination = order[np.searchsorted(keys[order], _keys(_rotate(centers[moving], axis, direction), n))]
+    return moving, destination
+
+
+def _keys(centers, n):
+    size = 2 * n + 1
+    shifted = centers + n
+    return (shifted[:, 0] * size + shifted[:, 1]) * size + shifted[:, 2]
+
+
+@lru_cache(maxsize=None)
+def solved(n):
+    return np.repeat(np.arange(len(CENTERS), dtype=np.uint8), n * n)
+
+
+class NxNRubik:
+    """
+        NxN cube with the move interface of Rubik: move turns the outer layer of a face (or an inner one with
+        layer), move_wide turns the first layers together, rotate turns the whole cube.
+    """
+
+    def __init__(self, n=4, stickers=None):
+        self.n = n
+        self.stickers = solved(n).copy() if stickers is None else stickers
+        # Incremented on every state change, lets observers (e.g. the renderer) detect changes cheaply.
+        self.version = 0
+
+    def move(self, direction, face, layer=0, times=1):
+        self.version += 1
+        source, destination = layer_turn(self.n, face, layer, direction)
+        for _ in range(times):
+            self.stickers[destination] = self.stickers[source]
+
+    def move_wide(self, direction, face, depth=2, times=1):
+        for layer in range(depth):
+            self.move(direction, face, layer, times)
+
+    def rotate(self, direction, face, times=1):
+        self.move_wide(direction, face, self.n, times)
+
+    def face(self, face):
+        # The N x N colors (index in CENTERS) of a face, as seen from outside.
+        index = CENTERS.index(face)
+        return self.stickers[index * self.n ** 2:(index + 1) * self.n ** 2].reshape(self.n, self.n)
+
+    def is_solved(self):
+        faces = self.stickers.reshape(len(CENTERS), -1)
+        return bool((faces == faces[:, :1]).all())
+
+    def copy(self):
+        return NxNRubik(self.n, self.stickers.copy())
+
+    def __eq__(self, other):
+        return isinstance(other, NxNRubik) and self.n == other.n and np.array_equal(self.stickers, other.stickers)
+
+    __hash__ = None
+
+
+@lru_cache(maxsize=None)
+def all_moves(n):
+    # Moves of an NxN cube as (direction, face, layer), layers counted from their face, the outer layers first.
+    return [(direction, face, layer) for layer in range(n // 2) for direction in (CW, ACW) for face in CENTERS]
+
+
+def shuffle(rubik, steps, random):
+    for _ in range(steps):
+        direction, face, layer = random.choice(all_moves(rubik.n))
+        rubik.move(direction, face, layer)
+
@@ -0,0 +1,185 @@
+"""
+    Window for NxN cubes (see nxn.py). The stickers are projected in batches: the corners of all the 6 N^2 stickers
+    are rotated, culled and projected with a few numpy operations, only when the view changes. Drawing merges every
+    run of same colored stickers of a row into one polygon (the run is a flat rectangle, so its projection is exact),
+    so a solved or lightly shuffled large cube costs a few hundred fills instead of thousands.
+
+    Usage: python nxn_view.py [--size 4]
+    Keys: F B L R U D turn a layer (SHIFT anticlockwise, digits 1-9 pick the layer, CTRL the layers up to it),
+          X Y Z rotate the cube, H shuffles, mouse drag or arrows rotate the view, Q / ESC quits.
+"""
+import numpy as np
+import pygame
+from argparse import ArgumentParser
+from random import Random
+from constants import CENTERS, WIDTH, HEIGHT, OFFSET, SCALE, MOVE_KEY_MAP, ROTATE_KEY_MAP, CW, ACW, ROTATIONAL_SPEED
+from compact import INDEX_COLOR
+from nxn import NORMALS, NxNRubik, sticker_geometry, shuffle
+
+# Same default view as renderer.py, rotated (in degrees) about the x and y axis.
+VIEW = (-30, -40)
+BACKGROUND = (128, 128, 128)
+OUTLINE = (128, 128, 128)
+# Below this side (in pixels) stickers are drawn without an outline, which would hide their color.
+OUTLINE_SIZE = 6
+# Distance of the camera, as in geometry.perspective_projection.
+CAMERA = 6
+
+
+def rotation_x(angle):
+    c, s = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+    return np.array([[1, 0, 0], [0, c, -s], [0, s, c]])
+
+
+def rotation_y(angle):
+    c, s = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+    return np.array([[c, 0, s], [0, 1, 0], [-s, 0, c]])
+
+
+def rotation_z(angle):
+    c, s = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+    return np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+
+
+def view_matrix(view=VIEW):
+    x_angle, y_angle = view
+    return rotation_y(y_angle) @ rotation_x(x_angle)
+
+
+def project(n, matrix, size=WIDTH):
+    """
+        Returns (stickers, polygons) for the view matrix: the indices of the visible stickers, face by face (the
+        farthest first, so that drawing in order puts nearer faces on top, as main.py sorts its surfaces) and row by
+        row, and their projected corners as an (visible, 4, 2) array of screen coordinates.
+    """
+    _, corners = sticker_geometry(n)
+    # Under perspective a face is visible when its normal points to the camera as seen from the face: the face
+    # center (its normal on the [-1, 1] cube, rotated to m) sees the camera at (0, 0, CAMERA) - m, and
+    # m . ((0, 0, CAMERA) - m) > 0 comes down to m.z > 1 / CAMERA, m having unit length.
+    centers = {index: (matrix @ NORMALS[face])[2] for index, face in enumerate(CENTERS)}
+    faces = sorted((index for index, z in centers.items() if z > 1 / CAMERA), key=centers.get)
+    stickers = np.concatenate([np.arange(index * n * n, (index + 1) * n * n) for index in faces])
+    points = corners[stickers] @ matrix.T.astype(np.float32)
+    projected = points[..., :2] * (CAMERA / (CAMERA - points[..., 2:]))
+    scale = np.array([SCALE.x * size / WIDTH, -SCALE.y * size / HEIGHT])
+    return stickers, projected * scale + np.array([OFFSET.x * size / WIDTH, OFFSET.y * size / HEIGHT])
+
+
+def runs(rubik, projection):
+    # The (color, polygon) of every run of same colored stickers in a row of the visible stickers.
+    stickers, polygons = projection
+    colors = rubik.stickers[stickers]
+    starts = np.flatnonzero((stickers % rubik.n == 0) | np.diff(colors, prepend=-1).astype(bool))
+    ends = np.append(starts[1:], len(stickers)) - 1
+    # Corners are counterclockwise from the bottom left, a run spans from the left of its first sticker to the
+    # right of its last one.
+    merged = np.stack([polygons[starts, 0], polygons[ends, 1], polygons[ends, 2], polygons[starts, 3]], axis=1)
+    return zip(colors[starts].tolist(), merged.tolist())
+
+
+def draw(surface, rubik, projection):
+    surface.fill(BACKGROUND)
+    if 2 * SCALE.x * surface.get_width() / WIDTH / rubik.n >= OUTLINE_SIZE:
+        stickers, polygons = projection
+        for color, polygon in zip(rubik.stickers[stickers].tolist(), polygons.tolist()):
+            pygame.draw.polygon(surface, INDEX_COLOR[color], polygon)
+            pygame.draw.polygon(surface, OUTLINE, polygon, 1)
+    else:
+        for color, polygon in runs(rubik, projection):
+            pygame.draw.polygon(surface, INDEX_COLOR[color], polygon)
+
+
+def view_keys():
+    # The view rotation held down this frame, as a matrix, None if none.
+    keys = pygame.key.get_pressed()
+    rotation = np.identity(3)
+    if keys[pygame.K_UP]:
+        rotation = rotation_x(-ROTATIONAL_SPEED) @ rotation
+    if keys[pygame.K_DOWN]:
+        rotation = rotation_x(ROTATIONAL_SPEED) @ rotation
+    if keys[pygame.K_LEFT]:
+        rotation = rotation_y(-ROTATIONAL_SPEED) @ rotation
+    if keys[pygame.K_RIGHT]:
+        rotation = rotation_y(ROTATIONAL_SPEED) @ rotation
+    if keys[pygame.K_LEFTBRACKET]:
+        rotation = rotation_z(ROTATIONAL_SPEED) @ rotation
+    if keys[pygame.K_RIGHTBRACKET]:
+        rotation = rotation_z(-ROTATIONAL_SPEED) @ rotation
+    return None if (rotation == np.identity(3)).all() else rotation
+
+
+def init_handle_keys(rubik, random):
+    layer = 0
+
+    def handle_key_event(event):
+        nonlocal layer
+        if event.type != pygame.KEYDOWN:
+            return
+        keys = pygame.key.get_pressed()
+        direction = ACW if keys[pygame.K_RSHIFT] or keys[pygame.K_LSHIFT] else CW
+        if pygame.K_1 <= event.key <= pygame.K_9:
+            layer = min(event.key - pygame.K_1, rubik.n - 1)
+        elif event.key in MOVE_KEY_MAP:
+            if keys[pygame.K_LCTRL] or keys[pygame.K_RCTRL]:
+                rubik.move_wide(direction, MOVE_KEY_MAP[event.key], layer + 1)
+            else:
+                rubik.move(direction, MOVE_KEY_MAP[event.key], layer)
+        elif event.key in ROTATE_KEY_MAP:
+            rubik.rotate(direction, ROTATE_KEY_MAP[event.key])
+        elif event.key == pygame.K_h:
+            shuffle(rubik, 10 * rubik.n, random)
+
+    return handle_key_event
+
+
+def mainloop(n):
+    pygame.init()
+    clock = pygame.time.Clock()
+    win = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption(f"{n}x{n}x{n} Rubik's Cube")
+    rubik = NxNRubik(n)
+    matrix = view_matrix()
+    projection = project(n, matrix)
+    handle_key_event = init_handle_keys(rubik, Random())
+    # Redraws only when the view or the cube changed, like main.py.
+    drawn_version = None
+    dragging = False
+    run = True
+    while run:
+        clock.tick(60)
+        rotation = None
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or \
+                    (event.type == pygame.KEYDOWN and event.key in (pygame.K_ESCAPE, pygame.K_q)):
+                run = False
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                dragging = True
+                # Ignore initial relative value.
+                pygame.mouse.get_rel()
+            elif event.type == pygame.MOUSEBUTTONUP:
+                dragging = False
+            elif event.type == pygame.MOUSEMOTION and dragging:
+                x, y = pygame.mouse.get_rel()
+                if x or y:
+                    rotation = rotation_y(x) @ rotation_x(y) @ (np.identity(3) if rotation is None else rotation)
+            elif event.type == pygame.VIDEOEXPOSE:
+                drawn_version = None
+            handle_key_event(event)
+        held = view_keys()
+        if held is not None:
+            rotation = held if rotation is None else held @ rotation
+        if rotation is not None:
+            matrix = rotation @ matrix
+            projection = project(n, matrix)
+            drawn_version = None
+        if drawn_version != rubik.version:
+            draw(win, rubik, projection)
+            pygame.display.update()
+            drawn_version = rubik.version
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='NxN cube window.')
+    parser.add_argument('--size', type=int, default=4, help='cube size N (default 4)')
+    mainloop(parser.parse_args().size)
@@ -0,0 +1,205 @@
+"""
+    Optimal solver, IDA* over the face turn metric (the 12 quarter turns of ALL_MOVES and the 6 half turns), using
+    the maximum of pattern database distances as admissible heuristic. Memory is bounded by the search depth.
+    Redundant sequences are pruned: a face is never turned twice in a row, and opposite faces (which commute) are only
+    turned in one canonical order.
+    With several processes, every iteration splits the first plies of the search tree across a pool, and the first
+    worker finding a solution cancels the others.
+    Optionally a transposition table (one per process) keeps the lower bounds learnt by failed iterations, so the
+    next iterations prune the positions they reach again. It is only used when the databases cover the whole cube,
+    as the search positions are then identified by their pattern indices.
+    Generate the tables first with pattern_database.py (corners, edges 0-5 and edges 6-11 by default).
+"""
+from multiprocessing import Pool, Event
+from compact import FACE_TURNS, STICKERS, STICKER_INDEX, encode, turn
+from pattern_database import PatternDatabase, CornerPattern
+from transposition import TranspositionTable, DEPTH
+
+DATABASES = ('corners.npz', 'edges_0-5.npz', 'edges_6-11.npz')
+TURNS = len(FACE_TURNS)
+FOUND = -1
+# How often (in nodes) a worker checks whether another worker already found a solution.
+CANCEL_CHECK = 4096
+
+
+class Cancelled(Exception):
+    pass
+
+
+def allowed_turns(last_face):
+    # Turns allowed after a turn of last_face (index in TURN_FACES, opposite faces are pairs 2k, 2k + 1).
+    if last_face is None:
+        return range(TURNS)
+    return [t for t in range(TURNS) if t // 3 != last_face and not (t // 6 == last_face // 2 and t // 3 < last_face)]
+
+
+_ALLOWED = {face: allowed_turns(face) for face in (None, *range(TURNS // 3))}
+
+# Per process search state, set up once by _init_worker.
+_databases, _cancelled, _table, _nodes = None, None, None, 0
+
+
+def covers_cube(databases):
+    edges = set()
+    for db in databases:
+        if db.pattern.name != CornerPattern.name:
+            edges.update(db.pattern.pieces)
+    return any(db.pattern.name == CornerPattern.name for db in databases) and len(edges) == 12
+
+
+def _init_worker(paths, cancelled, table_memory=0, table_policy=DEPTH):
+    global _databases, _cancelled, _table
+    _databases = [PatternDatabase.load(path) for path in paths]
+    _cancelled = cancelled
+    _table = TranspositionTable(table_memory, table_policy) if table_memory and covers_cube(_databases) else None
+
+
+def _heuristic(indices):
+    return max(db.distance(index) for db, index in zip(_databases, indices))
+
+
+def _is_goal(state, target, path):
+    for t in path:
+        state = turn(state, t)
+    return state == target
+
+
+def _search(indices, g, bound, last_face, path, state, target):
+    # Depth first search below the bound, returns FOUND (path holds the solution) or the smallest f above the bound.
+    global _nodes
+    h = _heuristic(indices)
+    if _table is not None:
+        # The allowed turns depend on the last face, so bounds are only valid for the same last face.
+        key = hash((indices, last_face))
+        stored = _table.lookup(key)
+        if stored is not None and stored > h:
+            h = stored
+    if g + h > bound:
+        return g + h
+    if h == 0 and _is_goal(state, target, path):
+        return FOUND
+    _nodes += 1
+    if _nodes % CANCEL_CHECK == 0 and _cancelled is not None and _cancelled.is_set():
+        raise Cancelled
+    minimum = float('inf')
+    for t in _ALLOWED[last_face]:
+        path.append(t)
+        result = _search(tuple(db.pattern.turn(index, t) for db, index in zip(_databases, indices)), g + 1, bound,
+                         t // 3, path, state, target)
+        if result == FOUND:
+            return FOUND
+        path.pop()
+        minimum = min(minimum, result)
+    if _table is not None and minimum != float('inf'):
+        _table.store(key, minimum - g, bound - g)
+    return minimum
+
+
+def _search_task(args):
+    # Searches below a root prefix, returns (solution or None, smallest f above the bound).
+    indices, prefix, bound, state, target = args
+    if _cancelled.is_set():
+        return None, float('inf')
+    path = list(prefix)
+    try:
+        result = _search(indices, len(prefix), bound, prefix[-1] // 3 if prefix else None, path, state, target)
+    except Cancelled:
+        return None, float('inf')
+    return (path, bound) if result == FOUND else (None, result)
+
+
+def _prefixes(indices, depth):
+    # All pruned turn sequences of the given length with the pattern indices they lead to.
+    nodes = [((), indices)]
+    for _ in range(depth):
+        nodes = [(prefix + (t,), tuple(db.pattern.turn(index, t) for db, index in zip(_databases, node_indices)))
+                 for prefix, node_indices in nodes for t in _ALLOWED[prefix[-1] // 3 if prefix else None]]
+    return nodes
+
+
+def to_moves(turns):
+    # Converts turn indices to (direction, face) moves, a half turn being two clockwise moves.
+    moves = []
+    for t in turns:
+        direction, face, times = FACE_TURNS[t]
+        moves.extend([(direction, face)] * times)
+    return moves
+
+
+class OptimalSolver:
+    """
+        Loads the pattern databases once (in this process and in every worker) so that it can be reused for
+        many solves. Use as a context manager, or call close, to stop the workers.
+    """
+
+    def __init__(self, paths=DATABASES, processes=1, split_depth=2, table_memory=0, table_policy=DEPTH):
+        self.paths = paths
+        self.split_depth = split_depth
+        self.cancelled = Event()
+        _init_worker(paths, self.cancelled, table_memory, table_policy)
+        self.pool = Pool(processes, initializer=_init_worker,
+                         initargs=(paths, self.cancelled, table_memory, table_policy)) if processes > 1 else None
+
+    @staticmethod
+    def table_statistics():
+        # Hit and collision rates of this process' transposition table, None if not used.
+        return None if _table is None else _table.statistics()
+
+    def close(self):
+        if self.pool:
+            self.pool.close()
+            self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def lower_bound(self, state):
+        # Admissible estimate (pattern database distance) of the optimal solution length of the compact state.
+        return _heuristic(tuple(db.pattern.index(state) for db in _databases))
+
+    def solve_turns(self, state, max_depth=20):
+        """
+            Returns an optimal solution of the compact state as FACE_TURNS indices, or None if it needs more
+            than max_depth turns.
+        """
+        # Face turns never move the centers, so the goal is every sticker having the color of its face's center.
+        target = bytes(state[STICKER_INDEX[face, face]] for _, face in STICKERS)
+        indices = tuple(db.pattern.index(state) for db in _databases)
+        bound = _heuristic(indices)
+        while bound <= max_depth:
+            if self.pool is None or bound <= self.split_depth:
+                path = []
+                result = _search(indices, 0, bound, None, path, state, target)
+                if result == FOUND:
+                    return path
+            else:
+                result = self._parallel_search(indices, bound, state, target)
+                if isinstance(result, list):
+                    return result
+            bound = result
+        return None
+
+    def _parallel_search(self, indices, bound, state, target):
+        self.cancelled.clear()
+        tasks, minimum, solution = [], float('inf'), None
+        for prefix, prefix_indices in _prefixes(indices, self.split_depth):
+            f = len(prefix) + _heuristic(prefix_indices)
+            if f > bound:
+                minimum = min(minimum, f)
+            else:
+                tasks.append((prefix_indices, prefix, bound, state, target))
+        # Every task is consumed, so that no worker is left running a cancelled search of this iteration.
+        for path, result in self.pool.imap_unordered(_search_task, tasks):
+            if path is not None and solution is None:
+                solution = path
+                self.cancelled.set()
+            minimum = min(minimum, result)
+        return solution if solution is not None else minimum
+
+    def solve(self, rubik, max_depth=20):
+        # Returns an optimal solution of the rubik as (direction, face) moves, or None if longer than max_depth.
+        turns = self.solve_turns(encode(rubik), max_depth)
+        return None if turns is None else to_moves(turns)
@@ -0,0 +1,286 @@
+"""
+    Pattern databases, admissible heuristics for the search based solvers.
+    A pattern is a projection of the cube (all corners, or a subset of the edges) ranked into a dense index:
+    a Lehmer code for the permutation part and base-3 / base-2 digits for the orientation part.
+    The database holds the distance to solved (face turn metric) of every pattern, packed in 4-bit nibbles,
+    generated by a breadth first search from solved over the index space using a bit-packed visited set.
+    Requires numpy.
+
+    Usage: python pattern_database.py corners corners.npz [--processes 4]
+           python pattern_database.py edges edges_0-5.npz --pieces 0 1 2 3 4 5
+"""
+import numpy as np
+from argparse import ArgumentParser
+from contextlib import nullcontext
+from math import factorial, perm
+from multiprocessing import Pool, shared_memory
+from time import time
+from compact import FACE_TURNS, SOLVED, turn, corner_cubies, edge_cubies
+
+TURNS = len(FACE_TURNS)
+CORNER_TWISTS = 3 ** 7
+
+
+def rank_permutation(permutation):
+    # Lehmer code of a permutation of range(n).
+    n, rank = len(permutation), 0
+    for i in range(n):
+        smaller = sum(1 for j in range(i + 1, n) if permutation[j] < permutation[i])
+        rank += smaller * factorial(n - 1 - i)
+    return rank
+
+
+def rank_arrangement(positions, n):
+    # Rank of k distinct values out of range(n) in order (a partial Lehmer code), in range(n! / (n - k)!).
+    k, rank = len(positions), 0
+    for i, p in enumerate(positions):
+        digit = p - sum(1 for q in positions[:i] if q < p)
+        rank += digit * perm(n - 1 - i, k - 1 - i)
+    return rank
+
+
+def rank_arrangements(positions, n):
+    # Vectorised rank_arrangement over the rows of an (N, k) array.
+    count, k = positions.shape
+    rank = np.zeros(count, dtype=np.int64)
+    for i in range(k):
+        digit = positions[:, i] - (positions[:, :i] < positions[:, i:i + 1]).sum(axis=1)
+        rank += digit * perm(n - 1 - i, k - 1 - i)
+    return rank
+
+
+def unrank_arrangements(ranks, n, k):
+    # Inverse of rank_arrangements, returns an (N, k) array (a full permutation for k == n).
+    available = np.ones((len(ranks), n), dtype=bool)
+    positions = np.empty((len(ranks), k), dtype=np.int8)
+    for i in range(k):
+        digit = (ranks // perm(n - 1 - i, k - 1 - i)) % (n - i)
+        # The position is the digit-th still available value.
+        chosen = np.argmax(np.cumsum(available, axis=1) == (digit + 1)[:, None], axis=1)
+        positions[:, i] = chosen
+        available[np.arange(len(ranks)), chosen] = False
+    return positions
+
+
+def _cubie_turns(cubies, count):
+    # For every face turn, the slot each piece moves to and the orientation it gains on the way.
+    destination, orientation = np.empty((TURNS, count), dtype=np.int8), np.empty((TURNS, count), dtype=np.int8)
+    for t in range(TURNS):
+        permutation, orientations = cubies(turn(SOLVED, t))
+        for slot, piece in enumerate(permutation):
+            destination[t, piece], orientation[t, piece] = slot, orientations[slot]
+    return destination, orientation
+
+
+class _Pattern:
+    # Memoryviews of the move tables, indexing them is much faster than indexing numpy arrays one value at a time.
+    # They are recreated instead of pickled when the pattern is sent to another process.
+
+    def _init_views(self):
+        self._major_view = memoryview(self.major_move)
+        self._minor_view = memoryview(self.minor_move if hasattr(self, 'minor_move') else self.minor_mask)
+
+    def __getstate__(self):
+        return {key: value for key, value in self.__dict__.items() if not key.endswith('_view')}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_views()
+
+
+class CornerPattern(_Pattern):
+    """
+        All 8 corners. Index = permutation rank (8!) * 3^7 + twist of the first 7 slots in base 3, the twist of the
+        last slot follows from the others. Moves are applied with a permutation and a twist move table.
+    """
+    name = 'corners'
+    pieces = tuple(range(8))
+    major_size, minor_size = factorial(8), CORNER_TWISTS
+    size = major_size * minor_size
+
+    def __init__(self):
+        destination, twist = _cubie_turns(corner_cubies, 8)
+        permutations = unrank_arrangements(np.arange(self.major_size), 8, 8)
+        self.major_move = np.empty((TURNS, self.major_size), dtype=np.int32)
+        twists = ((np.arange(self.minor_size)[:, None] // 3 ** np.arange(6, -1, -1)) % 3).astype(np.int8)
+        twists = np.hstack([twists, ((-twists.sum(axis=1)) % 3)[:, None]])
+        self.minor_move = np.empty((TURNS, self.minor_size), dtype=np.int32)
+        for t in range(TURNS):
+            moved = np.empty_like(permutations)
+            moved[:, destination[t]] = permutations
+            self.major_move[t] = rank_arrangements(moved, 8)
+            moved = np.empty_like(twists)
+            moved[:, destination[t]] = (twists + twist[t]) % 3
+            self.minor_move[t] = moved[:, :7] @ (3 ** np.arange(6, -1, -1))
+        self._init_views()
+
+    def index(self, state):
+        permutation, twist = corner_cubies(state)
+        return rank_permutation(permutation) * self.minor_size + sum(t * 3 ** (6 - i) for i, t in enumerate(twist[:7]))
+
+    def neighbors(self, indices, t):
+        return self.major_move[t][indices // self.minor_size] * np.int64(self.minor_size) + \
+            self.minor_move[t][indices % self.minor_size]
+
+    def turn(self, index, t):
+        major, minor = divmod(index, self.minor_size)
+        return self._major_view[t, major] * self.minor_size + self._minor_view[t, minor]
+
+
+class EdgePattern(_Pattern):
+    """
+        A subset of the edges (given by their home slot in EDGES), the other edges are ignored.
+        Index = rank of the slots of the pieces (12! / (12 - k)!) * 2^k + flip of each piece as a bit.
+        Flips belong to the pieces, so a move xors the flip bits with a mask depending only on the slots.
+    """
+    name = 'edges'
+
+    def __init__(self, pieces=(0, 1, 2, 3, 4, 5)):
+        self.pieces = tuple(pieces)
+        k = len(self.pieces)
+        self.major_size, self.minor_size = perm(12, k), 2 ** k
+        self.size = self.major_size * self.minor_size
+        destination, flip = _cubie_turns(edge_cubies, 12)
+        positions = unrank_arrangements(np.arange(self.major_size), 12, k)
+        bits = 1 << np.arange(k)
+        self.major_move = np.empty((TURNS, self.major_size), dtype=np.int32)
+        self.minor_mask = np.empty((TURNS, self.major_size), dtype=np.uint8 if k <= 8 else np.uint16)
+        for t in range(TURNS):
+            self.major_move[t] = rank_arrangements(destination[t][positions], 12)
+            self.minor_mask[t] = flip[t][positions] @ bits
+        self._init_views()
+
+    def index(self, state):
+        permutation, flip = edge_cubies(state)
+        slots = [permutation.index(piece) for piece in self.pieces]
+        return rank_arrangement(slots, 12) * self.minor_size + sum(flip[s] << i for i, s in enumerate(slots))
+
+    def neighbors(self, indices, t):
+        major, minor = indices // self.minor_size, indices % self.minor_size
+        return self.major_move[t][major] * np.int64(self.minor_size) + (minor ^ self.minor_mask[t][major])
+
+    def turn(self, index, t):
+        major, minor = divmod(index, self.minor_size)
+        return self._major_view[t, major] * self.minor_size + (minor ^ self._minor_view[t, major])
+
+
+def _is_set(bits, indices):
+    return (bits[indices >> 3] >> (indices & 7).astype(np.uint8)) & 1
+
+
+def _set_packed(table, indices, values, per_byte):
+    # Ors values (already shifted) of sorted unique indices into a packed table, combining indices sharing a byte.
+    positions = indices // per_byte
+    unique, starts = np.unique(positions, return_index=True)
+    table[unique] |= np.bitwise_or.reduceat(values, starts) if len(values) else values
+
+
+def _mark(visited, table, indices, depth):
+    _set_packed(visited, indices, (1 << (indices & 7)).astype(np.uint8), 8)
+    _set_packed(table, indices, (depth << ((indices & 1) * 4)).astype(np.uint8), 2)
+
+
+# Per process state of the generation, set up once by _init_worker.
+_pattern, _visited, _shared = None, None, None
+
+
+def _init_worker(pattern, name, size):
+    global _pattern, _visited, _shared
+    _shared = shared_memory.SharedMemory(name=name)
+    _pattern, _visited = pattern, np.ndarray((size,), dtype=np.uint8, buffer=_shared.buf)
+
+
+def _close_worker():
+    global _pattern, _visited, _shared
+    _pattern, _visited = None, None
+    _shared.close()
+    _shared = None
+
+
+def _expand(frontier):
+    # Returns the sorted unique not yet visited neighbors of a chunk of the frontier.
+    found = []
+    for t in range(TURNS):
+        neighbors = _pattern.neighbors(frontier, t)
+        found.append(neighbors[_is_set(_visited, neighbors) == 0])
+    return np.unique(np.concatenate(found))
+
+
+class PatternDatabase:
+    def __init__(self, pattern, table):
+        self.pattern = pattern
+        self.table = table
+        self._table_view = memoryview(table)
+
+    def distance(self, index):
+        return (self._table_view[index >> 1] >> ((index & 1) << 2)) & 15
+
+    def heuristic(self, state):
+        # Lower bound of the number of face turns needed to solve the compact state.
+        return self.distance(self.pattern.index(state))
+
+    @staticmethod
+    def generate(pattern, processes=1, chunk_size=1 << 20, verbose=False):
+        """
+            Breadth first search from solved. Each layer of the frontier is split in chunks expanded by a pool of
+            processes against the shared visited set; the new nodes of a chunk are marked as soon as it returns
+            so that duplicates across chunks are dropped early.
+        """
+        started = time()
+        shared = shared_memory.SharedMemory(create=True, size=(pattern.size + 7) // 8)
+        visited = None
+        try:
+            visited = np.ndarray(((pattern.size + 7) // 8,), dtype=np.uint8, buffer=shared.buf)
+            visited[:] = 0
+            table = np.zeros((pattern.size + 1) // 2, dtype=np.uint8)
+            _init_worker(pattern, shared.name, len(visited))
+            # Leaving the pool terminates its workers, also when the search fails or is interrupted.
+            with (Pool(processes, initializer=_init_worker, initargs=(pattern, shared.name, len(visited)))
+                  if processes > 1 else nullcontext()) as pool:
+                frontier, depth = np.array([pattern.index(SOLVED)], dtype=np.int64), 0
+                _mark(visited, table, frontier, depth)
+                total = 1
+                while len(frontier):
+                    chunks = [frontier[i:i + chunk_size] for i in range(0, len(frontier), chunk_size)]
+                    layer = []
+                    for found in (pool.imap_unordered(_expand, chunks) if pool else map(_expand, chunks)):
+                        found = found[_is_set(visited, found) == 0]
+                        _mark(visited, table, found, depth + 1)
+                        layer.append(found)
+                    frontier, depth = np.concatenate(layer), depth + 1
+                    total += len(frontier)
+                    if verbose:
+                        print(f'depth {depth}: {len(frontier)} new, {total}/{pattern.size} in {time() - started:.1f}s')
+            return PatternDatabase(pattern, table)
+        finally:
+            if _shared is not None:
+                _close_worker()
+            # The shared memory cannot be closed while an array still uses its buffer.
+            visited = None
+            shared.close()
+            shared.unlink()
+
+    def save(self, path):
+        np.savez(path, table=self.table, name=self.pattern.name, pieces=np.array(self.pattern.pieces))
+
+    @staticmethod
+    def load(path):
+        data = np.load(path)
+        pattern = CornerPattern() if str(data['name']) == CornerPattern.name else EdgePattern(data['pieces'].tolist())
+        return PatternDatabase(pattern, data['table'])
+
+
+def main():
+    parser = ArgumentParser(description='Generate a pattern database table file.')
+    parser.add_argument('pattern', choices=[CornerPattern.name, EdgePattern.name])
+    parser.add_argument('output', help='Table file (.npz)')
+    parser.add_argument('--pieces', type=int, nargs='+', default=[0, 1, 2, 3, 4, 5],
+                        help='Edges (index in EDGES) of an edge pattern, 6 or 7 for a useful heuristic')
+    parser.add_argument('--processes', type=int, default=1)
+    args = parser.parse_args()
+    pattern = CornerPattern() if args.pattern == CornerPattern.name else EdgePattern(args.pieces)
+    PatternDatabase.generate(pattern, args.processes, verbose=True).save(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+    Permutations of the cube: a move sequence compiled into the permutation of the 54 stickers of a compact state
+    (see compact.py, whose move and rotation permutations are derived from rubik.Move and rubik.Rotate). Every
+    operation (compose, inverse, power, order, conjugate, commutator) costs O(stickers), whatever the length of the
+    sequences, so checking that a solution solves a scramble is one composition and one comparison instead of
+    replaying both through Rubik.move.
+"""
+from math import lcm
+from operator import itemgetter
+from compact import STICKERS, MOVE_PERMUTATIONS, ROTATE_PERMUTATIONS
+from stages import CENTER_OF
+
+_IDENTITY = tuple(range(len(STICKERS)))
+
+
+class Permutation:
+    """
+        Immutable; stickers[i] is the sticker whose content moves to sticker i. Products read left to right:
+        a * b plays a, then b.
+    """
+
+    def __init__(self, stickers=_IDENTITY):
+        self.stickers = tuple(stickers)
+        self._getter = None
+
+    @staticmethod
+    def from_moves(moves):
+        # The permutation of (direction, face) moves.
+        stickers = _IDENTITY
+        for direction, face in moves:
+            stickers = itemgetter(*MOVE_PERMUTATIONS[direction, face])(stickers)
+        return Permutation(stickers)
+
+    @staticmethod
+    def from_rotations(rotations):
+        # The permutation of (direction, face) whole cube rotations.
+        stickers = _IDENTITY
+        for direction, face in rotations:
+            stickers = itemgetter(*ROTATE_PERMUTATIONS[direction, face])(stickers)
+        return Permutation(stickers)
+
+    @staticmethod
+    def from_notation(text):
+        # The permutation of a sequence in WCA notation, see notation.py.
+        from notation import permutation
+        return Permutation(permutation(text))
+
+    @staticmethod
+    def move(direction, face):
+        return Permutation(MOVE_PERMUTATIONS[direction, face])
+
+    def __mul__(self, other):
+        return Permutation(itemgetter(*other.stickers)(self.stickers))
+
+    def inverse(self):
+        inverse = [0] * len(self.stickers)
+        for target, source in enumerate(self.stickers):
+            inverse[source] = target
+        return Permutation(inverse)
+
+    def __pow__(self, exponent):
+        # By squaring, so that a high power costs O(stickers log exponent).
+        base = self if exponent >= 0 else self.inverse()
+        result, exponent = Permutation(), abs(exponent)
+        while exponent:
+            if exponent & 1:
+                result = result * base
+            base = base * base
+            exponent >>= 1
+        return result
+
+    def conjugate(self, setup):
+        # setup, then self, then setup undone: the same effect on the stickers the setup brings to self's.
+        return setup * self * setup.inverse()
+
+    def commutator(self, other):
+        # self, other, self undone, other undone.
+        return self * other * self.inverse() * other.inverse()
+
+    def cycles(self):
+        # The cycles of stickers moved, each as a tuple of stickers, every one taking the content of the next.
+        seen, found = set(), []
+        for start in range(len(self.stickers)):
+            cycle = []
+            sticker = start
+            while sticker not in seen:
+                seen.add(sticker)
+                cycle.append(sticker)
+                sticker = self.stickers[sticker]
+            if len(cycle) > 1:
+                found.append(tuple(cycle))
+        return found
+
+    def order(self):
+        # How many times the permutation must be played to get back to the start, e.g. 105 for "R U".
+        return lcm(1, *(len(cycle) for cycle in self.cycles()))
+
+    def support(self):
+        # The stickers moved.
+        return [i for i, source in enumerate(self.stickers) if source != i]
+
+    def is_identity(self):
+        return self.stickers == _IDENTITY
+
+    def apply(self, state):
+        # Plays the permutation on a compact state.
+        if self._getter is None:
+            self._getter = itemgetter(*self.stickers)
+        return bytes(self._getter(state))
+
+    def solves(self, state):
+        # Whether playing the permutation solves the state (in any orientation of the cube).
+        played = self.apply(state)
+        return all(played[s] == played[center] for s, center in enumerate(CENTER_OF))
+
+    def __eq__(self, other):
+        return isinstance(other, Permutation) and self.stickers == other.stickers
+
+    def __hash__(self):
+        return hash(self.stickers)
+
+    def __repr__(self):
+        return f'Permutation(order {self.order()}, {len(self.support())} stickers moved)'
+
+
+def verify(scramble, solution):
+    """
+        Whether the (direction, face) moves of solution (e.g. those RubikSolver.solve played on a rubik shuffled by
+        scramble) solve the moves of scramble from the solved cube. Neither contains rotations, so the product
+        must be the identity.
+    """
+    return (Permutation.from_moves(scramble) * Permutation.from_moves(solution)).is_identity()
+
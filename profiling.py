@@ -0,0 +1,226 @@
+"""
+    Profiling mode: timings of named phases (the window's frame phases, sorting, projection, RubikSolver.solve, ...)
+    and a profile of where the time goes inside them. Enabled with python main.py --profile [DIRECTORY], or by
+    setting the RUBIK_PROFILE environment variable to the directory ("1" for the default one). Two profilers:
+        sample   - (default) a thread samples the Python stack of the main thread every INTERVAL seconds, cheap
+                   enough to keep the frame rate; every stack is prefixed with the phases it was sampled in
+        cprofile - cProfile, exact call counts but slower, saved as profile.pstats (see python -m pstats)
+    On exit the directory receives phases.txt (count, total, mean, p50, p99 and max of every phase, nested phases
+    included in their parents) and, for sample, stacks.collapsed: one "frame;frame;...;frame count" line per stack,
+    the input of flamegraph.pl and speedscope.
+"""
+import os
+import sys
+from array import array
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext, ExitStack
+from functools import wraps
+from threading import Thread, Event, main_thread, get_ident
+from time import perf_counter
+
+SAMPLE, CPROFILE = 'sample', 'cprofile'
+DIRECTORY = 'profile'
+ENVIRONMENT = 'RUBIK_PROFILE'
+INTERVAL = 0.001
+
+
+class Profiler:
+    def __init__(self, directory=DIRECTORY, mode=SAMPLE, interval=INTERVAL):
+        self.directory = directory
+        self.mode = mode
+        self.interval = interval
+        self.durations = {}
+        # Names of the phases the main thread is in, read by the sampling thread. Phases entered by other threads
+        # (e.g. a background solver) are timed but never pushed here, so they cannot mix with the main thread's.
+        self.current = []
+        self._main = main_thread().ident
+        self.stacks = Counter()
+        self._patched = []
+        self._stopped = Event()
+        self._sampler = None
+        self._profile = None
+
+    def start(self):
+        if self.mode == CPROFILE:
+            from cProfile import Profile
+            self._profile = Profile()
+            self._profile.enable()
+        else:
+            self._sampler = Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+        return self
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._main)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            self.stacks[tuple(f'[{name}]' for name in self.current) + tuple(reversed(stack))] += 1
+
+    def _record(self, name, seconds):
+        if name not in self.durations:
+            self.durations[name] = array('d')
+        self.durations[name].append(seconds)
+
+    @contextmanager
+    def phase(self, name):
+        # Times the enclosed code as one occurrence of the named phase.
+        tracked = get_ident() == self._main
+        if tracked:
+            self.current.append(name)
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, perf_counter() - started)
+            if tracked:
+                self.current.pop()
+
+    def wrap(self, owner, attribute, name=None):
+        """
+            Replaces owner.attribute by a timed version, until stop. A call returning an iterator (a generator, or
+            e.g. the chain of stage generators of RubikSolver.solve) is timed over its iteration too, as one
+            occurrence. Every call or step then costs two perf_counter calls, so only wrap functions called a few
+            times a frame, the sampler sees the others.
+        """
+        function = getattr(owner, attribute)
+        name = name or attribute
+        current, record, main = self.current, self._record, self._main
+
+        def iterate(iterator, seconds):
+            try:
+                while True:
+                    tracked = get_ident() == main
+                    if tracked:
+                        current.append(name)
+                    started = perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        seconds += perf_counter() - started
+                        if tracked:
+                            current.pop()
+                    yield item
+            finally:
+                record(name, seconds)
+
+        @wraps(function)
+        def timed(*args, **kwargs):
+            tracked = get_ident() == main
+            if tracked:
+                current.append(name)
+            started = perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except BaseException:
+                record(name, perf_counter() - started)
+                raise
+            finally:
+                if tracked:
+                    current.pop()
+            if isinstance(result, Iterator):
+                return iterate(result, perf_counter() - started)
+            record(name, perf_counter() - started)
+            return result
+
+        self._patched.append((owner, attribute, owner.__dict__.get(attribute, function)))
+        setattr(owner, attribute, staticmethod(timed) if isinstance(owner.__dict__.get(attribute), staticmethod)
+                else timed)
+
+    def restore(self):
+        # Puts back the functions replaced by wrap.
+        for owner, attribute, original in reversed(self._patched):
+            setattr(owner, attribute, original)
+        self._patched = []
+
+    def stop(self):
+        # Restores the wrapped functions and writes the results, returns the directory.
+        self.restore()
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, 'phases.txt'), 'w') as phases:
+            phases.write(self.summary())
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(os.path.join(self.directory, 'profile.pstats'))
+        else:
+            with open(os.path.join(self.directory, 'stacks.collapsed'), 'w') as stacks:
+                for stack, count in self.stacks.most_common():
+                    stacks.write(f"{';'.join(stack)} {count}\n")
+        return self.directory
+
+    def summary(self):
+        lines = [f"{'phase':<24}{'count':>9}{'total ms':>12}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for name, durations in sorted(self.durations.items(), key=lambda item: -sum(item[1])):
+            ordered = sorted(durations)
+            if not ordered:
+                continue
+            total = sum(ordered)
+            lines.append(f'{name:<24}{len(ordered):>9}{total * 1000:>12.1f}{total / len(ordered) * 1000:>10.3f}'
+                         f'{ordered[len(ordered) // 2] * 1000:>10.3f}{ordered[int(len(ordered) * 0.99)] * 1000:>10.3f}'
+                         f'{ordered[-1] * 1000:>10.3f}')
+        return '\n'.join(lines) + '\n'
+
+
+class _Disabled:
+    # Stands in for a Profiler when profiling is off, phases then cost a call to a shared null context.
+    _context = nullcontext()
+
+    def phase(self, name):
+        return self._context
+
+    def wrap(self, owner, attribute, name=None):
+        pass
+
+    def stop(self):
+        return None
+
+
+DISABLED = _Disabled()
+
+
+class _Combined:
+    # Several profilers used as one, each phase entered in all of them.
+    def __init__(self, profilers):
+        self.profilers = profilers
+
+    @contextmanager
+    def phase(self, name):
+        with ExitStack() as stack:
+            for profiler in self.profilers:
+                stack.enter_context(profiler.phase(name))
+            yield
+
+    def wrap(self, owner, attribute, name=None):
+        for profiler in self.profilers:
+            profiler.wrap(owner, attribute, name)
+
+
+def combine(*profilers):
+    # One profiler standing for all of the given ones (DISABLED ones left out) for phase and wrap. Each is still
+    # stopped on its own, in reverse order, so that every one puts back the functions it wrapped.
+    profilers = [profiler for profiler in profilers if profiler is not DISABLED]
+    if len(profilers) > 1:
+        return _Combined(profilers)
+    return profilers[0] if profilers else DISABLED
+
+
+def from_settings(directory=None, mode=SAMPLE):
+    """
+        Returns a started Profiler writing to directory, or to the directory of the RUBIK_PROFILE environment
+        variable when directory is None, else DISABLED.
+    """
+    if directory is None:
+        directory = os.environ.get(ENVIRONMENT)
+        if not directory:
+            return DISABLED
+        directory = DIRECTORY if directory == '1' else directory
+    return Profiler(directory, mode).start()
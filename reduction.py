@@ -0,0 +1,417 @@
+"""
+    Reduction solver for NxN cubes (see nxn.py), in stages:
+        parity  - on even cubes an outer turn when the corners are an odd permutation, then an inner slice turn for
+                  every wing orbit which is an odd permutation (the cases a 3x3 solver or 3-cycles cannot solve),
+        centers - every orbit of center stickers solved by pure 3-cycles, the most stickers placed per move first,
+        edges   - every orbit of wings (the edge pieces off the middle) solved the same way, pairing the edges (on odd
+                  cubes with the middle edges, on even cubes in their home position),
+        3x3     - the cube, now equivalent to a 3x3 (corners, middle edges and solved centers), read as a compact
+                  state and solved by a 3x3 solver (RubikSolver or CFOPSolver), its face turns played as outer layer
+                  turns.
+    The 3-cycles are commutators of the cube's moves found by a search over short sequences, then conjugated by
+    setup moves until every 3-cycle of an orbit is known. The tables are built on first use for a cube size.
+    The colors of the centers are those of the middle centers on odd cubes, and on even cubes those matching the
+    corner at the left down back position, which reduction never moves.
+
+    Usage: python reduction.py --size 4 [--count 20] [--steps 60] [--seed 0] [--solver cfop]
+"""
+import numpy as np
+from argparse import ArgumentParser
+from functools import lru_cache
+from heapq import heappush, heappop
+from random import Random
+from time import perf_counter
+from constants import CENTERS, EDGES, L, R, U, D, F, B, CW, ACW, OPPOSITE
+from compact import STICKERS, decode
+from nxn import NORMALS, sticker_geometry, layer_turn, all_moves, shuffle, NxNRubik
+from solver import RubikSolver
+from cfop import CFOPSolver
+
+STAGES = ['parity', 'centers', 'edges', '3x3']
+LAYER, CFOP = 'layer', 'cfop'
+
+
+def _layer_moves(state, base):
+    rubik, moves = decode(state), []
+    for direction, face in RubikSolver.solve(rubik, base):
+        rubik.move(direction, face)
+        moves.append((direction, face))
+    return moves
+
+
+# 3x3 solvers of the last stage, from a compact state and a base to (direction, face) moves.
+SOLVERS = {LAYER: _layer_moves, CFOP: CFOPSolver.solve_state}
+
+
+def inverse(move):
+    direction, face, layer = move
+    return ACW if direction == CW else CW, face, layer
+
+
+def simplify(moves):
+    # Merges consecutive turns of the same layer into the fewest quarter turns.
+    turns = []
+    for direction, face, layer in moves:
+        quarter = 1 if direction == CW else 3
+        if turns and turns[-1][:2] == [face, layer]:
+            turns[-1][2] += quarter
+            if turns[-1][2] % 4 == 0:
+                turns.pop()
+        else:
+            turns.append([face, layer, quarter])
+    simplified = []
+    for face, layer, quarter in turns:
+        simplified.extend({1: [(CW, face, layer)], 2: [(CW, face, layer)] * 2, 3: [(ACW, face, layer)]}[quarter % 4])
+    return simplified
+
+
+@lru_cache(maxsize=None)
+def move_map(n, move):
+    # For every sticker, where a move takes it.
+    direction, face, layer = move
+    moving, destination = layer_turn(n, face, layer, direction)
+    mapping = np.arange(6 * n * n)
+    mapping[moving] = destination
+    return mapping
+
+
+def _sequence_map(n, moves):
+    mapping = np.arange(6 * n * n)
+    for move in moves:
+        mapping = move_map(n, move)[mapping]
+    return mapping
+
+
+@lru_cache(maxsize=None)
+def pieces(n):
+    """
+        Returns (piece_of, stickers): the piece of every sticker, and the stickers of every piece (the cubie they
+        are on). The stickers of an edge or corner are in a fixed rotational order, which every move preserves, so
+        the colors read in that order identify the piece.
+    """
+    centers, _ = sticker_geometry(n)
+    normals = np.repeat([NORMALS[face] for face in CENTERS], n * n, axis=0)
+    cubies = centers - normals
+    _, piece_of = np.unique(cubies, axis=0, return_inverse=True)
+    piece_of = piece_of.ravel()
+    stickers = [[] for _ in range(piece_of.max() + 1)]
+    for sticker, piece in enumerate(piece_of):
+        stickers[piece].append(sticker)
+    for piece, group in enumerate(stickers):
+        if len(group) > 1 and np.linalg.det(np.array([normals[group[0]], normals[group[1]], cubies[group[0]]])) < 0:
+            group[0], group[1] = group[1], group[0]
+    return piece_of, [np.array(group) for group in stickers]
+
+
+@lru_cache(maxsize=None)
+def orbits(n):
+    # The orbits of the pieces under the moves of the cube (middle slices excluded), as lists of pieces.
+    piece_of, stickers = pieces(n)
+    parent = list(range(len(stickers)))
+
+    def root(piece):
+        while parent[piece] != piece:
+            parent[piece] = parent[parent[piece]]
+            piece = parent[piece]
+        return piece
+
+    for move in all_moves(n):
+        for piece, moved in zip(piece_of, piece_of[move_map(n, move)]):
+            parent[root(piece)] = root(moved)
+    found = {}
+    for piece in range(len(stickers)):
+        found.setdefault(root(piece), []).append(piece)
+    return list(found.values())
+
+
+def _kind(n, orbit):
+    # 'center', 'wing' or None for the pieces the 3x3 stage solves (corners, middle edges) or which never move.
+    centers, _ = sticker_geometry(n)
+    _, stickers = pieces(n)
+    size = len(stickers[orbit[0]])
+    if size == 1 and len(orbit) > 1:
+        return 'center'
+    if size == 2 and (n % 2 == 0 or np.count_nonzero(centers[stickers[orbit[0]][0]]) == 3):
+        return 'wing'
+    return None
+
+
+def _pure_cycle(n, mapping, piece_of, orbit_of):
+    # The (source, destination) stickers of a permutation moving exactly 3 whole pieces of one orbit, else None.
+    source = np.flatnonzero(mapping != np.arange(len(mapping)))
+    moved = set(piece_of[source].tolist())
+    if len(moved) != 3 or len({orbit_of[piece] for piece in moved}) != 1:
+        return None
+    if sum(len(pieces(n)[1][piece]) for piece in moved) != len(source):
+        return None
+    return source, mapping[source]
+
+
+@lru_cache(maxsize=None)
+def cycles(n):
+    """
+        Returns {orbit index: [(source, destination, moves)]}: every 3-cycle of the pieces of each center and wing
+        orbit, where playing the moves takes the stickers at source to destination. Base commutators A B A' B' are
+        searched among single moves and conjugates X Y X', and every conjugate of a known 3-cycle by one more move is
+        a 3-cycle too, shortest first.
+    """
+    piece_of, stickers = pieces(n)
+    orbit_of = {piece: index for index, orbit in enumerate(orbits(n)) for piece in orbit}
+    reduced = {index for index, orbit in enumerate(orbits(n)) if _kind(n, orbit)}
+    moves = all_moves(n)
+    if n % 2:
+        # Middle slices never change the orbits, but some pure 3-cycles need them (e.g. of the middle centers of
+        # the 5x5 faces).
+        moves = moves + [(direction, face, n // 2) for direction in (CW, ACW) for face in (R, U, F)]
+    parts = [(move,) for move in moves] + [(x, y, inverse(x)) for x in moves for y in moves if x[1:] != y[1:]]
+    maps = {part: _sequence_map(n, part) for part in parts}
+    inverses = {part: np.argsort(mapping) for part, mapping in maps.items()}
+    found = {}
+    queue = []
+    for a in moves:
+        for b in parts:
+            # Forward maps compose right to left: A, then B, then A', then B'.
+            mapping = inverses[b][inverses[(a,)][maps[b][maps[(a,)]]]]
+            cycle = _pure_cycle(n, mapping, piece_of, orbit_of)
+            if cycle is not None and orbit_of[piece_of[cycle[0][0]]] in reduced:
+                sequence = (a,) + b + (inverse(a),) + tuple(inverse(m) for m in reversed(b))
+                heappush(queue, (len(sequence), tuple(cycle[0].tolist()), tuple(cycle[1].tolist()), sequence))
+    # Dijkstra over conjugates: playing m, the cycle, then m' cycles the stickers m' takes the cycle's stickers to.
+    while queue:
+        length, source, destination, sequence = heappop(queue)
+        key = tuple(sorted(zip(source, destination)))
+        if key in found:
+            continue
+        found[key] = source, destination, sequence
+        for move in moves:
+            back = move_map(n, inverse(move))
+            conjugate = tuple(back[list(source)].tolist()), tuple(back[list(destination)].tolist())
+            if tuple(sorted(zip(*conjugate))) not in found:
+                heappush(queue, (length + 2, *conjugate, (move,) + sequence + (inverse(move),)))
+    table = {}
+    for source, destination, sequence in found.values():
+        table.setdefault(orbit_of[piece_of[source[0]]], []).append((source, destination, simplify(sequence)))
+    return table
+
+
+@lru_cache(maxsize=None)
+def _cycle_arrays(n, orbit):
+    # The cycles of an orbit as (sources, destinations, lengths) arrays, stickers grouped by destination piece.
+    piece_of, _ = pieces(n)
+    table = cycles(n)[orbit]
+    sources, destinations = [], []
+    for source, destination, _ in table:
+        order = sorted(range(len(source)), key=lambda i: (piece_of[destination[i]], destination[i]))
+        sources.append([source[i] for i in order])
+        destinations.append([destination[i] for i in order])
+    lengths = np.array([len(sequence) for _, _, sequence in table])
+    return np.array(sources), np.array(destinations), lengths
+
+
+def color_scheme(rubik):
+    # The color of every face: the middle centers on odd cubes, else matching the left down back corner.
+    n = rubik.n
+    centers, _ = sticker_geometry(n)
+    if n % 2:
+        return {face: rubik.face(face)[n // 2, n // 2] for face in CENTERS}
+    corner = (n - 1) * (NORMALS[L] + NORMALS[D] + NORMALS[B])
+    scheme = {}
+    for face in (L, D, B):
+        sticker = np.flatnonzero((centers == corner + NORMALS[face]).all(axis=1))[0]
+        scheme[face] = rubik.stickers[sticker]
+        scheme[OPPOSITE[face]] = CENTERS.index(OPPOSITE[CENTERS[scheme[face]]])
+    return scheme
+
+
+def solved_colors(rubik):
+    """
+        The color every sticker has once solved. On odd cubes the wings are paired with the middle edge they are
+        next to (whose colors are its current ones, the 3x3 stage solves it), on even cubes they go home.
+    """
+    n = rubik.n
+    target = np.repeat([color_scheme(rubik)[face] for face in CENTERS], n * n).astype(np.uint8)
+    if n % 2:
+        centers, _ = sticker_geometry(n)
+        index = {tuple(center): sticker for sticker, center in enumerate(centers.tolist())}
+        for orbit in orbits(n):
+            if _kind(n, orbit) == 'wing':
+                for sticker in np.concatenate([pieces(n)[1][piece] for piece in orbit]):
+                    # The middle edge sticker: same face and edge, off by the wing's place along the edge.
+                    middle = [0 if abs(c) < n - 1 else c for c in centers[sticker].tolist()]
+                    target[sticker] = rubik.stickers[index[tuple(middle)]]
+    return target
+
+
+def _is_odd(permutation):
+    # Parity of a permutation given as a list of positions.
+    seen, transpositions = set(), 0
+    for start in range(len(permutation)):
+        length = 0
+        while start not in seen:
+            seen.add(start)
+            start = permutation[start]
+            length += 1
+        transpositions += max(0, length - 1)
+    return transpositions % 2 == 1
+
+
+def _piece_permutation(rubik, target, group, ordered):
+    # Where the piece at every position of the group belongs, pieces identified by their (ordered) colors.
+    _, stickers = pieces(rubik.n)
+    key = tuple if ordered else frozenset
+    home = {key(target[stickers[piece]].tolist()): index for index, piece in enumerate(group)}
+    return [home[key(rubik.stickers[stickers[piece]].tolist())] for piece in group]
+
+
+def solve_parity(rubik, target):
+    n = rubik.n
+    _, stickers = pieces(n)
+    moves = []
+    if n % 2 == 0:
+        corners = [piece for piece, group in enumerate(stickers) if len(group) == 3]
+        if _is_odd(_piece_permutation(rubik, target, corners, False)):
+            moves.append((CW, U, 0))
+            rubik.move(CW, U, 0)
+    for orbit in orbits(n):
+        if _kind(n, orbit) == 'wing' and _is_odd(_piece_permutation(rubik, target, orbit, True)):
+            # The inner slice of the orbit cycles 4 of its wings, an odd permutation.
+            wings = np.concatenate([stickers[piece] for piece in orbit])
+            layer = next(layer for layer in range(1, n // 2) if np.isin(layer_turn(n, R, layer, CW)[0], wings).any())
+            moves.append((CW, R, layer))
+            rubik.move(CW, R, layer)
+    return moves
+
+
+def _solve_orbits(rubik, target, kind):
+    # Solves every orbit of the kind with 3-cycles, each time the one placing the most pieces per move.
+    n = rubik.n
+    table = cycles(n)
+    moves = []
+    for index, orbit in enumerate(orbits(n)):
+        if _kind(n, orbit) != kind:
+            continue
+        sources, destinations, lengths = _cycle_arrays(n, index)
+        shape = (len(lengths), 3, -1)
+        goal = target[destinations]
+        while True:
+            state = rubik.stickers
+            before = (state[destinations] == goal).reshape(shape).all(axis=2).sum(axis=1)
+            after = (state[sources] == goal).reshape(shape).all(axis=2).sum(axis=1)
+            gain = after - before
+            if gain.max() <= 0:
+                break
+            best = np.argmax(gain / lengths)
+            state[destinations[best]] = state[sources[best]]
+            rubik.version += 1
+            moves += table[index][best][2]
+    return moves
+
+
+def solve_centers(rubik, target):
+    return _solve_orbits(rubik, target, 'center')
+
+
+def solve_edges(rubik, target):
+    return _solve_orbits(rubik, target, 'wing')
+
+
+@lru_cache(maxsize=None)
+def compact_stickers(n):
+    # For every sticker of a compact state (see compact.py), the sticker of an NxN cube at the same place.
+    centers, _ = sticker_geometry(n)
+    index = {tuple(center): sticker for sticker, center in enumerate(centers.tolist())}
+    middle = 2 * (n // 2) + 1 - n
+    found = []
+    for piece, face in STICKERS:
+        faces = piece if isinstance(piece, tuple) else (piece,)
+        center = n * NORMALS[face] + sum((n - 1) * NORMALS[f] for f in faces if f != face)
+        for axis in range(3):
+            if center[axis] == 0:
+                center[axis] = middle
+        found.append(index[tuple(center.tolist())])
+    return np.array(found)
+
+
+def compact_state(rubik, target):
+    # The 3x3 state of a reduced cube: its corners and edges, and the centers of the color scheme.
+    state = rubik.stickers[compact_stickers(rubik.n)]
+    state[:len(CENTERS)] = target[compact_stickers(rubik.n)[:len(CENTERS)]]
+    if rubik.n == 2:
+        # No edges, solved ones will do.
+        edges = slice(len(CENTERS), len(CENTERS) + 2 * len(EDGES))
+        state[edges] = target[compact_stickers(rubik.n)[edges]]
+    return bytes(state)
+
+
+def solve_3x3(rubik, target, solver=CFOP):
+    moves = [(direction, face, 0) for direction, face in SOLVERS[solver](compact_state(rubik, target), D)]
+    for move in moves:
+        rubik.move(*move)
+    return moves
+
+
+class ReductionSolver:
+    @staticmethod
+    def solve_stages(rubik, solver=CFOP):
+        """
+            Returns [(stage, moves, seconds)] for the stages solving the rubik, which is left unchanged. Moves are
+            (direction, face, layer) as in NxNRubik.move.
+        """
+        cube = rubik.copy()
+        target = solved_colors(cube)
+        stages = []
+        for name, stage in zip(STAGES, (solve_parity, solve_centers, solve_edges)):
+            started = perf_counter()
+            moves = stage(cube, target)
+            stages.append((name, moves, perf_counter() - started))
+        started = perf_counter()
+        moves = solve_3x3(cube, target, solver)
+        stages.append((STAGES[-1], moves, perf_counter() - started))
+        return stages
+
+    @staticmethod
+    def solve(rubik, solver=CFOP):
+        return iter(simplify([move for _, moves, _ in ReductionSolver.solve_stages(rubik, solver)
+                              for move in moves]))
+
+
+def benchmark(n, count, steps, seed, solver=CFOP):
+    # Solves a seeded corpus of shuffled cubes, checks every solution and prints the mean cost of every stage.
+    started = perf_counter()
+    ReductionSolver.solve_stages(NxNRubik(n), solver)
+    print(f'{n}x{n}x{n}: tables built in {perf_counter() - started:.2f}s')
+    random = Random(seed)
+    totals = {name: [0, 0.0] for name in STAGES}
+    lengths = []
+    for _ in range(count):
+        rubik = NxNRubik(n)
+        shuffle(rubik, steps, random)
+        stages = ReductionSolver.solve_stages(rubik, solver)
+        for name, moves, seconds in stages:
+            totals[name][0] += len(moves)
+            totals[name][1] += seconds
+        solution = simplify([move for _, moves, _ in stages for move in moves])
+        for move in solution:
+            rubik.move(*move)
+        if not rubik.is_solved():
+            raise AssertionError('Reduction left the cube unsolved')
+        lengths.append(len(solution))
+    for name, (moves, seconds) in totals.items():
+        print(f'    {name}: {moves / count:.1f} moves, {seconds / count * 1000:.1f}ms')
+    print(f'{count} cubes solved, {sum(lengths) / count:.1f} moves on average '
+          f'({min(lengths)} to {max(lengths)}), {sum(t for _, t in totals.values()) / count * 1000:.1f}ms per cube')
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark of the reduction solver on a seeded corpus of shuffled cubes.')
+    parser.add_argument('--size', type=int, default=4, help='cube size N (default 4)')
+    parser.add_argument('--count', type=int, default=20)
+    parser.add_argument('--steps', type=int, default=60, help='random moves per shuffle')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--solver', choices=(CFOP, LAYER), default=CFOP, help='3x3 solver of the last stage')
+    args = parser.parse_args()
+    benchmark(args.size, args.count, args.steps, args.seed, args.solver)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+    Headless renderer, draws cube states to offscreen surfaces without opening a window and exports them in batches,
+    either as numbered PNG files or as a single stacked numpy array file (N x size x size x 3).
+    The view is fixed for a batch, so the visible stickers, their drawing order and their projection are computed
+    only once and every state costs just a fill of the visible polygons.
+
+    Usage: python renderer.py --count 1000 --output thumbnails/ [--size 128] [--processes 4] [--seed 0]
+           python renderer.py --count 1000 --output thumbnails.npy
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from argparse import ArgumentParser
+from multiprocessing import Pool
+from random import Random
+from constants import WIDTH, HEIGHT, ALL_MOVES
+from geometry import get_init_points, z_orientation, xy_projection
+from rubik import Rubik
+
+# Default view, rotated (in degrees) about the x and y axis so that the front, up and right faces are visible.
+VIEW = (-30, -40)
+BACKGROUND = (128, 128, 128)
+OUTLINE = (128, 128, 128)
+
+
+def view_polygons(view=VIEW, size=WIDTH):
+    """
+        Returns the visible stickers as (cubelet positions, index of face in positions, polygon) in drawing order,
+        for the cube rotated by the given view and rendered on a size x size surface.
+    """
+    points, centers, edges, corners = get_init_points()
+    x_angle, y_angle = view
+    for point in points:
+        point.rotate_x_ip(x_angle)
+        point.rotate_y_ip(y_angle)
+
+    stickers = [(face, 0, centers[face]) for face in centers]
+    for edge in edges:
+        stickers.extend((edge, index, edges[edge][face]) for index, face in enumerate(edge))
+    for corner in corners:
+        stickers.extend((corner, index, corners[corner][face]) for index, face in enumerate(corner))
+
+    # Same visibility test and painter's ordering as the interactive window, only done once per view.
+    stickers = [sticker for sticker in stickers if z_orientation(sticker[2]) > 0]
+    stickers.sort(key=lambda sticker: sum(p.z for p in sticker[2]))
+    scale = size / WIDTH, size / HEIGHT
+    return [(positions, index, tuple((p.x * scale[0], p.y * scale[1]) for p in xy_projection(surf)))
+            for positions, index, surf in stickers]
+
+
+def render(rubik, polygons, size=WIDTH, surface=None):
+    # Draws the rubik on an offscreen surface (reused if given) using the polygons from view_polygons.
+    if surface is None:
+        surface = pygame.Surface((size, size))
+    surface.fill(BACKGROUND)
+    colors = {}
+    for positions, index, polygon in polygons:
+        if positions not in colors:
+            colors[positions] = rubik.get_colors(positions)
+        color = colors[positions]
+        pygame.draw.polygon(surface, color if isinstance(positions, str) else color[index], polygon)
+        pygame.draw.polygon(surface, OUTLINE, polygon, 1)
+    return surface
+
+
+# Per process state, set up once by the pool initializer.
+_polygons, _size, _surface = None, None, None
+
+
+def _init_worker(view, size):
+    global _polygons, _size, _surface
+    _polygons, _size = view_polygons(view, size), size
+    _surface = pygame.Surface((size, size))
+
+
+def _render_png_chunk(args):
+    start, rubiks, directory = args
+    for offset, rubik in enumerate(rubiks):
+        pygame.image.save(render(rubik, _polygons, _size, _surface), os.path.join(directory, f'{start + offset:06d}.png'))
+    return start, len(rubiks)
+
+
+def _render_array_chunk(args):
+    start, rubiks, _ = args
+    # pygame.image.tostring gives rows in (height, width, rgb) order, matching the stacked array layout.
+    return start, b''.join(pygame.image.tostring(render(rubik, _polygons, _size, _surface), 'RGB') for rubik in rubiks)
+
+
+def _chunks(rubiks, chunk_size, directory):
+    chunk, start = [], 0
+    for rubik in rubiks:
+        chunk.append(rubik)
+        if len(chunk) == chunk_size:
+            yield start, chunk, directory
+            start, chunk = start + len(chunk), []
+    if chunk:
+        yield start, chunk, directory
+
+
+def _counted(rubiks, count):
+    # Yields the rubiks, raising ValueError as soon as there turn out to be more or fewer than count.
+    rendered = 0
+    for rubik in rubiks:
+        if rendered == count:
+            raise ValueError(f'More than {count} rubiks to render')
+        rendered += 1
+        yield rubik
+    if rendered != count:
+        raise ValueError(f'Only {rendered} rubiks to render out of {count}')
+
+
+def render_batch(rubiks, output, count, size=128, view=VIEW, processes=None, chunk_size=64):
+    """
+        Renders count rubiks (any iterable, consumed lazily) across a pool of processes, raises ValueError if the
+        iterable has more or fewer.
+        If output ends with .npy a single uint8 array of shape (count, size, size, 3) is written (requires numpy),
+        otherwise output is a directory which is filled with numbered PNG files.
+    """
+    if output.endswith('.npy'):
+        import numpy as np
+        images = np.lib.format.open_memmap(output, mode='w+', dtype=np.uint8, shape=(count, size, size, 3))
+        worker, directory = _render_array_chunk, None
+    else:
+        os.makedirs(output, exist_ok=True)
+        images, worker, directory = None, _render_png_chunk, output
+
+    with Pool(processes, initializer=_init_worker, initargs=(view, size)) as pool:
+        for start, result in pool.imap_unordered(worker, _chunks(_counted(rubiks, count), chunk_size, directory)):
+            if images is not None:
+                block = np.frombuffer(result, dtype=np.uint8).reshape(-1, size, size, 3)
+                images[start:start + len(block)] = block
+    if images is not None:
+        images.flush()
+
+
+def random_rubiks(count, steps=50, seed=None):
+    # Generates count independently shuffled rubiks, reproducible for a given seed.
+    random = Random(seed)
+    for _ in range(count):
+        rubik = Rubik()
+        for _ in range(steps):
+            rubik.move(*random.choice(ALL_MOVES))
+        yield rubik
+
+
+def main():
+    parser = ArgumentParser(description='Render shuffled cube states to PNG files or a stacked .npy array.')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--output', required=True, help='Directory for PNG files, or a file name ending in .npy')
+    parser.add_argument('--size', type=int, default=128)
+    parser.add_argument('--steps', type=int, default=50, help='Random moves used to shuffle each state')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--processes', type=int, default=None, help='Defaults to the number of CPUs')
+    args = parser.parse_args()
+    render_batch(random_rubiks(args.count, args.steps, args.seed), args.output, args.count, args.size,
+                 processes=args.processes)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,8 @@ from constants import CENTERS, EDGES, CORNERS
 from constants import F, B, R, L, U, D, CW, ACW
 from constants import COLORS, OPPOSITE, COLORS_MAP
 from constants import MOVE, MOVE2LAYERS, ROTATE
+from itertools import permutations
+from random import Random
 
 Move = {
     CW: {
@@ -42,6 +44,16 @@ Rotate = {
 }
 
 
+# Zobrist keys, a random 64-bit number for every (positions, colors) a cubelet can have.
+# The hash of a rubik is the xor of the keys of its cubelets, so a move only updates the keys of the moved cubelets.
+_zobrist_random = Random(26)
+ZOBRIST = {}
+for _slots, _size in ((CENTERS, 1), (EDGES, 2), (CORNERS, 3)):
+    for _slot in _slots:
+        for _colors in permutations(COLORS.values(), _size):
+            ZOBRIST[_slot, _colors[0] if _size == 1 else _colors] = _zobrist_random.getrandbits(64)
+
+
 class Cubelet:
     def __init__(self):
         pass
@@ -52,6 +64,9 @@ class Cubelet:
     def rotate(self, direction, face):
         pass
 
+    def key(self):
+        pass
+
 
 class Center(Cubelet):
     def __init__(self, position, color):
@@ -66,6 +81,9 @@ class Center(Cubelet):
         if self.position == position:
             return self.color
 
+    def key(self):
+        return self.position, self.color
+
     def __repr__(self):
         return f'Center({self.position}, {COLORS_MAP[self.color]})'
 
@@ -98,6 +116,9 @@ class MCubelet(Cubelet):
         if self.positions == positions:
             return self.colors
 
+    def key(self):
+        return self.positions, self.colors
+
 
 class Edge(MCubelet):
     def __repr__(self):
@@ -124,13 +145,34 @@ class Rubik:
         self.edges = [Edge((p1, p2), (COLORS[p1], COLORS[p2])) for p1, p2 in EDGES]
         self.corners = [Corner((p1, p2, p3), (COLORS[p1], COLORS[p2], COLORS[p3])) for p1, p2, p3 in CORNERS]
         self.pieces = [*self.centers, *self.edges, *self.corners]
+        # Incremented on every state change, lets observers (e.g. the renderer) detect changes cheaply.
+        self.version = 0
+        # Zobrist hash, computed on first use then updated on every move.
+        self._hash = None
 
     def move(self, direction, face, times=1):
+        self.version += 1
         for _ in range(times):
-            for piece in self.pieces:
-                piece.move(direction, face)
+            if self._hash is None:
+                for piece in self.pieces:
+                    piece.move(direction, face)
+                continue
+            # Centers never move with a face, only the edges and corners of the face update the hash.
+            for piece in self.edges:
+                if face in piece.positions:
+                    self._hash ^= ZOBRIST[piece.positions, piece.colors]
+                    piece.move(direction, face)
+                    self._hash ^= ZOBRIST[piece.positions, piece.colors]
+            for piece in self.corners:
+                if face in piece.positions:
+                    self._hash ^= ZOBRIST[piece.positions, piece.colors]
+                    piece.move(direction, face)
+                    self._hash ^= ZOBRIST[piece.positions, piece.colors]
 
     def rotate(self, direction, face, times=1):
+        self.version += 1
+        # Every cubelet moves, recomputing the hash on next use costs the same as updating it.
+        self._hash = None
         for _ in range(times):
             for piece in self.pieces:
                 piece.rotate(direction, face)
@@ -147,6 +189,15 @@ class Rubik:
         elif action == MOVE2LAYERS:
             self.move2layers(direction, face, times)
 
+    def state_key(self):
+        # 64-bit Zobrist hash of the state, equal rubiks have equal keys. A rubik itself keeps the identity hash and
+        # equality of objects, as it changes with every move: use this key to put states in sets or dicts.
+        if self._hash is None:
+            self._hash = 0
+            for piece in self.pieces:
+                self._hash ^= ZOBRIST[piece.key()]
+        return self._hash
+
     def get_colors(self, positions):
         if not isinstance(positions, tuple):
             for center in self.centers:
@@ -0,0 +1,116 @@
+"""
+    Short scramble solver, a bidirectional breadth first search over the face turn metric: one search grows from the
+    scramble, the other from the solved state (with inverse turns), always extending the smaller frontier by a full
+    layer, until a state reached by both is found. Both searches together only go about half the solution deep on
+    each side, so states within 10 to 12 turns of solved get optimal solutions without any pruning table.
+    The visited sets are dicts from the hash of a compact state to the turn which reached it, only the current frontier
+    keeps the states themselves. Paths are rebuilt by undoing the stored turns from the meeting state, and the
+    solution is checked once rebuilt, as two states sharing a hash could otherwise join unrelated paths.
+    Deeper states, or searches exceeding the state limit, are handed over to the fallback solver.
+"""
+from compact import FACE_TURNS, STICKERS, STICKER_INDEX, encode, decode, turn
+from constants import D
+from solver import RubikSolver
+
+MAX_DEPTH = 12
+MAX_STATES = 4_000_000
+
+
+def inverse(t):
+    # FACE_TURNS has the clockwise, half and anticlockwise turn of each face in this order.
+    return t - t % 3 + 2 - t % 3
+
+
+def _layer_solver(rubik):
+    moves = []
+    for direction, face in RubikSolver.solve(rubik, D):
+        rubik.move(direction, face)
+        moves.append((direction, face))
+    return moves
+
+
+def _expand(frontier, visited, other, limit):
+    # Extends frontier by one layer, returns the next frontier and the first state also in other (or None).
+    # The next frontier is None once visited holds limit states, the layer is then abandoned.
+    following = []
+    for state, last_face in frontier:
+        for t in range(len(FACE_TURNS)):
+            if t // 3 == last_face:
+                continue
+            moved = turn(state, t)
+            key = hash(moved)
+            if key in visited:
+                continue
+            visited[key] = t
+            if len(visited) >= limit:
+                return None, None
+            if key in other:
+                return following, moved
+            following.append((moved, t // 3))
+    return following, None
+
+
+def _walk(state, visited):
+    # Undoes the turns stored for state and its predecessors, returns the turns undone in order.
+    turns = []
+    t = visited[hash(state)]
+    while t is not None:
+        turns.append(t)
+        state = turn(state, inverse(t))
+        t = visited[hash(state)]
+    return turns
+
+
+class ShortSolver:
+    """
+        Bidirectional search for states at most max_depth turns from solved, exploring at most max_states states.
+        Anything else is solved by fallback, a function of a Rubik returning (direction, face) moves
+        (RubikSolver.solve by default, e.g. pass OptimalSolver(...).solve for optimal solutions).
+    """
+
+    def __init__(self, max_depth=MAX_DEPTH, max_states=MAX_STATES, fallback=_layer_solver):
+        self.max_depth = max_depth
+        self.max_states = max_states
+        self.fallback = fallback
+
+    def solve_turns(self, state):
+        # Returns an optimal solution of the compact state as FACE_TURNS indices, or None if beyond the limits.
+        # Face turns never move the centers, so the goal is every sticker having the color of its face's center.
+        target = bytes(state[STICKER_INDEX[face, face]] for _, face in STICKERS)
+        if state == target:
+            return []
+        forward, backward = {hash(state): None}, {hash(target): None}
+        forward_frontier, backward_frontier = [(state, None)], [(target, None)]
+        depth = 0
+        while depth < self.max_depth and len(forward) + len(backward) < self.max_states:
+            depth += 1
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meeting = _expand(forward_frontier, forward, backward,
+                                                    self.max_states - len(backward))
+            else:
+                backward_frontier, meeting = _expand(backward_frontier, backward, forward,
+                                                     self.max_states - len(forward))
+            if meeting is not None:
+                turns = _walk(meeting, forward)[::-1] + [inverse(t) for t in _walk(meeting, backward)]
+                moved = state
+                for t in turns:
+                    moved = turn(moved, t)
+                return turns if moved == target else None
+            if forward_frontier is None or backward_frontier is None:
+                # Over the state limit, in the middle of a layer.
+                return None
+            if not forward_frontier or not backward_frontier:
+                break
+        return None
+
+    def solve(self, rubik):
+        # Returns a solution of the rubik as (direction, face) moves, optimal when found by the bidirectional search.
+        state = encode(rubik)
+        turns = self.solve_turns(state)
+        if turns is None:
+            return self.fallback(decode(state))
+        moves = []
+        for t in turns:
+            direction, face, times = FACE_TURNS[t]
+            moves.extend([(direction, face)] * times)
+        return moves
@@ -0,0 +1,282 @@
+"""
+    Solve service, an asyncio server on a TCP or Unix socket answering solve requests without any per request
+    start up cost: solvers (and their tables) are loaded once in a pool of worker processes.
+    The protocol is line based, a connection can be kept open for any number of requests, and requests can be
+    pipelined: answers are written as soon as they are ready, tagged with the id of their request.
+    Each connection has a bounded number of requests in flight, once reached it stops reading until an answer
+    is written, so a client sending faster than the workers solve is throttled by the socket (backpressure).
+    Concurrent requests (from any connection) are micro-batched: they are collected for a short time window or
+    up to a batch size, then split into one chunk per worker, each sent as one array of compact states. This saves
+    the per request scheduling and inter-process overhead at the cost of at most one window of added latency,
+    while every worker stays busy and a slow request only delays the requests of its own chunk.
+
+    Request:  <id> <state> [layer|optimal]
+              state is 54 facelet letters (see compact.to_facelets) or the 108 hex digits of the compact state.
+    Answer:   OK <id> <count> <moves...>    moves in face notation, e.g. F R' U
+              ERR <id> <message>
+
+    Usage: python solve_service.py [--port 8765 | --unix /tmp/rubik.sock] [--workers 4]
+                                   [--batch-size 32] [--batch-window 2]
+                                   [--optimal corners.npz edges_0-5.npz edges_6-11.npz]
+"""
+import asyncio
+import os
+import socket
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from constants import CW, D
+from compact import SOLVED, decode, from_facelets, is_valid
+from solver import RubikSolver
+
+LAYER, OPTIMAL = 'layer', 'optimal'
+MAX_IN_FLIGHT = 64
+BATCH_SIZE = 32
+BATCH_WINDOW = 0.002
+
+# Per process state, set up once by _init_worker.
+_optimal = None
+
+
+def _init_worker(databases):
+    global _optimal
+    if databases:
+        from optimal_solver import OptimalSolver
+        _optimal = OptimalSolver(databases)
+
+
+def notation(direction, face):
+    return face[0] if direction == CW else face[0] + "'"
+
+
+def parse_state(token):
+    state = bytes.fromhex(token) if len(token) == 108 else from_facelets(token)
+    if not is_valid(state):
+        raise ValueError('Not a reachable cube state')
+    return state
+
+
+def solve(state, solver=LAYER):
+    # Runs in a worker, returns the solution in face notation.
+    rubik = decode(state)
+    if solver == OPTIMAL:
+        if _optimal is None:
+            raise ValueError('Optimal solver not enabled (start the service with --optimal)')
+        moves = _optimal.solve(rubik)
+    elif solver == LAYER:
+        moves = []
+        for direction, face in RubikSolver.solve(rubik, D):
+            rubik.move(direction, face)
+            moves.append((direction, face))
+    else:
+        raise ValueError(f'Unknown solver {solver}')
+    return [notation(direction, face) for direction, face in moves]
+
+
+def solve_batch(states, solver=LAYER):
+    # Runs in a worker, solves the concatenated compact states. Failures are returned in place of their solution.
+    solutions = []
+    for start in range(0, len(states), len(SOLVED)):
+        try:
+            solutions.append(solve(states[start:start + len(SOLVED)], solver))
+        except Exception as error:
+            solutions.append(ValueError(str(error) or type(error).__name__))
+    return solutions
+
+
+class Batcher:
+    """
+        Collects the requests of one solver until size of them are waiting or window seconds passed since the
+        first one, then splits them into chunks of at most pending / workers requests, solves every chunk with one
+        worker call and resolves each request's future as soon as its chunk is solved.
+    """
+
+    def __init__(self, executor, solver, size=BATCH_SIZE, window=BATCH_WINDOW, workers=1):
+        self.executor, self.solver, self.workers = executor, solver, workers
+        self.size, self.window = size, window
+        self.pending, self.timer = [], None
+
+    def submit(self, state):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((state, future))
+        if len(self.pending) >= self.size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        pending, self.pending = self.pending, []
+        chunk_size = -(-len(pending) // self.workers)
+        for start in range(0, len(pending), chunk_size or 1):
+            batch = pending[start:start + chunk_size]
+            solving = asyncio.get_running_loop().run_in_executor(
+                self.executor, solve_batch, b''.join(state for state, _ in batch), self.solver)
+            solving.add_done_callback(lambda done, batch=batch: self.resolve(batch, done))
+
+    @staticmethod
+    def resolve(batch, done):
+        if done.cancelled():
+            for _, future in batch:
+                future.cancel()
+            return
+        solutions = [done.exception()] * len(batch) if done.exception() else done.result()
+        for (_, future), solution in zip(batch, solutions):
+            if future.done():
+                continue
+            if isinstance(solution, Exception):
+                future.set_exception(solution)
+            else:
+                future.set_result(solution)
+
+
+class SolveService:
+    def __init__(self, workers=None, databases=(), max_in_flight=MAX_IN_FLIGHT, batch_size=BATCH_SIZE,
+                 batch_window=BATCH_WINDOW):
+        self.workers = workers or os.cpu_count()
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(databases,))
+        self.max_in_flight = max_in_flight
+        self.batchers = {solver: Batcher(self.executor, solver, batch_size, batch_window, self.workers)
+                         for solver in (LAYER, OPTIMAL)}
+
+    async def warm_up(self):
+        # Workers are started on demand, give each one a request so the tables are loaded before serving.
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, solve, SOLVED) for _ in range(self.workers)))
+
+    async def answer(self, line, writer, lock, in_flight):
+        request_id = '-'
+        try:
+            try:
+                line = line.decode()
+            except UnicodeDecodeError:
+                raise ValueError('Request is not UTF-8 text')
+            request_id, token, *solver = line.split()
+            solver = solver[0] if solver else LAYER
+            if solver not in self.batchers:
+                raise ValueError(f'Unknown solver {solver}')
+            moves = await self.batchers[solver].submit(parse_state(token))
+            response = f"OK {request_id} {len(moves)} {' '.join(moves)}\n"
+        except Exception as error:
+            response = f'ERR {request_id} {str(error) or type(error).__name__}\n'
+        try:
+            async with lock:
+                writer.write(response.encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            in_flight.release()
+
+    async def handle_connection(self, reader, writer):
+        lock, in_flight, tasks = asyncio.Lock(), asyncio.Semaphore(self.max_in_flight), set()
+        try:
+            while True:
+                # Do not read further requests while too many of this connection's requests are in flight.
+                await in_flight.acquire()
+                line = await reader.readline()
+                if not line:
+                    in_flight.release()
+                    break
+                task = asyncio.create_task(self.answer(line, writer, lock, in_flight))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host='127.0.0.1', port=8765, path=None):
+        await self.warm_up()
+        if path:
+            server = await asyncio.start_unix_server(self.handle_connection, path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+class SolveClient:
+    """
+        Blocking client keeping one connection open for all its requests, a new one after an error it cannot tell
+        the request of. Pass (host, port) for a TCP socket or a path for a Unix socket.
+    """
+
+    def __init__(self, address=('127.0.0.1', 8765)):
+        self.address = address
+        self.next_id = 0
+        self._connect()
+
+    def _connect(self):
+        family = socket.AF_UNIX if isinstance(self.address, str) else socket.AF_INET
+        self.socket = socket.socket(family, socket.SOCK_STREAM)
+        self.socket.connect(self.address)
+        self.file = self.socket.makefile('rw')
+        self.stale = False
+
+    def solve_many(self, states, solver=LAYER):
+        # Pipelines the requests of all states (compact states or facelet strings) and returns their solutions.
+        if self.stale:
+            # The answers of the requests failed by an unattributable error may still come on the old connection.
+            self.close()
+            self._connect()
+        ids = []
+        for state in states:
+            token = state if isinstance(state, str) else state.hex()
+            self.file.write(f'{self.next_id} {token} {solver}\n')
+            ids.append(str(self.next_id))
+            self.next_id += 1
+        self.file.flush()
+        answers = {}
+        while len(answers) < len(ids):
+            line = self.file.readline()
+            if not line:
+                error = ConnectionError('Connection closed by the server')
+            else:
+                status, request_id, *rest = line.split(' ', 3)
+                if request_id in ids:
+                    answers[request_id] = rest[1].split() if status == 'OK' and len(rest) > 1 else \
+                        [] if status == 'OK' else ValueError(' '.join(rest).strip())
+                    continue
+                # An error no request can be told from (e.g. id "-" of a malformed line) fails every pending one.
+                error = ValueError(line.strip())
+                self.stale = True
+            for request_id in ids:
+                answers.setdefault(request_id, error)
+        return [answers[request_id] for request_id in ids]
+
+    def solve(self, state, solver=LAYER):
+        solution, = self.solve_many([state], solver)
+        if isinstance(solution, Exception):
+            raise solution
+        return solution
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+
+def main():
+    parser = ArgumentParser(description='Serve cube solutions over a local socket.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='Listen on this Unix socket path instead of TCP')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--optimal', nargs='+', default=(), metavar='DATABASE',
+                        help='Pattern databases, enables the optimal solver')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Largest batch, 1 disables batching')
+    parser.add_argument('--batch-window', type=float, default=BATCH_WINDOW * 1000,
+                        help='Milliseconds a request waits for others to join its batch')
+    args = parser.parse_args()
+    service = SolveService(args.workers, args.optimal, batch_size=args.batch_size,
+                           batch_window=args.batch_window / 1000)
+    asyncio.run(service.serve(args.host, args.port, args.unix))
+
+
+if __name__ == '__main__':
+    main()
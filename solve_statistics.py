@@ -0,0 +1,182 @@
+"""
+    Solution length statistics over a corpus of states: the move count of RubikSolver.solve with its per stage
+    breakdown and solving time, and optionally a lower bound (pattern databases) and the optimal length (IDA*).
+    The corpus is a .npy array of compact states (N x 54, see compact.py). Work is split in chunks solved by a
+    process pool, every finished chunk is saved right away so an interrupted run resumes where it stopped, with any
+    chunk size.
+    Results are written as one column per array in a .npz file and summarised as depth histograms.
+    RubikSolver lengths count its (direction, face) moves, optimal lengths count face turns (a half turn is one).
+
+    Usage: python solve_statistics.py corpus.npy --generate 1000 [--steps 50] [--seed 0]
+           python solve_statistics.py corpus.npy results.npz [--optimal corners.npz edges_0-5.npz edges_6-11.npz]
+"""
+import os
+import numpy as np
+from argparse import ArgumentParser
+from collections import Counter
+from glob import glob
+from multiprocessing import Pool
+from random import Random
+from time import perf_counter
+from constants import ALL_MOVES, D
+from compact import SOLVED, decode, move
+from solver import RubikSolver
+
+STAGES = [
+    ('bottom_cross', RubikSolver.solve_bottom_cross),
+    ('bottom_corners', RubikSolver.solve_bottom_corners),
+    ('middle_layer', RubikSolver.solve_middle_layer),
+    ('top_cross', RubikSolver.solve_top_cross),
+    ('top_edges', RubikSolver.solve_top_edges),
+    ('position_top_corners', RubikSolver.solve_position_top_corners),
+    ('orient_top_corners', RubikSolver.solve_orient_top_corners),
+]
+# Seconds spent animating one move in the GUI (90 degrees at 5 degrees per frame, 60 frames per second).
+PLAYBACK_SECONDS = 90 / 5 / 60
+
+# Per process state, set up once by _init_worker.
+_optimal, _max_depth = None, None
+
+
+def _init_worker(databases, max_depth):
+    global _optimal, _max_depth
+    if databases:
+        from optimal_solver import OptimalSolver
+        _optimal, _max_depth = OptimalSolver(databases), max_depth
+
+
+def measure(state):
+    # Returns the result columns for one compact state.
+    row = {}
+    rubik = decode(state)
+    started = perf_counter()
+    for name, stage in STAGES:
+        moves = 0
+        for direction, face in stage(rubik, D):
+            rubik.move(direction, face)
+            moves += 1
+        row[f'stage_{name}'] = moves
+    row['solver_seconds'] = perf_counter() - started
+    row['solver_moves'] = sum(row[f'stage_{name}'] for name, _ in STAGES)
+    if _optimal is not None:
+        row['lower_bound'] = _optimal.lower_bound(state)
+        started = perf_counter()
+        turns = _optimal.solve_turns(state, _max_depth)
+        row['optimal_seconds'] = perf_counter() - started
+        row['optimal'] = -1 if turns is None else len(turns)
+    return row
+
+
+def _measure_chunk(args):
+    start, states, directory = args
+    rows = [measure(bytes(state)) for state in states]
+    columns = {key: np.array([row[key] for row in rows]) for key in rows[0]}
+    columns['index'] = np.arange(start, start + len(rows))
+    # Named after the range of states it holds, so that a run resumed with another chunk size only measures the
+    # states no part holds yet. Written under a temporary name first, so that a part cut short by an interruption
+    # is never taken for done.
+    path = os.path.join(directory, f'part-{start:09d}-{start + len(rows):09d}')
+    with open(path + '.tmp', 'wb') as part:
+        np.savez(part, **columns)
+    os.replace(path + '.tmp', path + '.npz')
+    return start
+
+
+def _part_range(path):
+    # The (start, end) range of the states of a part.
+    start, end = os.path.basename(path)[len('part-'):-len('.npz')].split('-')
+    return int(start), int(end)
+
+
+def collect(corpus, output, databases=(), max_depth=14, processes=None, chunk_size=100):
+    """
+        Measures every state of the corpus, skipping states already saved by a previous run of the same output,
+        and writes the combined columns to output.
+    """
+    states = np.load(corpus, mmap_mode='r')
+    directory = output + '.parts'
+    os.makedirs(directory, exist_ok=True)
+    done = np.zeros(len(states), dtype=bool)
+    for path in glob(os.path.join(directory, 'part-*-*.npz')):
+        start, end = _part_range(path)
+        done[start:end] = True
+    # Chunks of at most chunk_size consecutive states not done yet.
+    tasks, start = [], 0
+    while start < len(states):
+        if done[start]:
+            start += 1
+            continue
+        end = start + 1
+        while end < len(states) and end - start < chunk_size and not done[end]:
+            end += 1
+        tasks.append((start, np.array(states[start:end]), directory))
+        start = end
+    print(f'{np.count_nonzero(done)} states already done, {len(tasks)} chunks to go')
+    with Pool(processes, initializer=_init_worker, initargs=(databases, max_depth)) as pool:
+        for finished, _ in enumerate(pool.imap_unordered(_measure_chunk, tasks), 1):
+            print(f'{finished}/{len(tasks)} chunks', end='\r')
+
+    parts = [np.load(path) for path in sorted(glob(os.path.join(directory, 'part-*-*.npz')))]
+    columns = {key: np.concatenate([part[key] for part in parts]) for key in parts[0].files} if parts else {}
+    np.savez(output, **columns)
+    return columns
+
+
+def summary(columns):
+    # Prints the length histograms and the mean cost of each solver.
+    count = len(columns['index']) if columns else 0
+    print(f'\n{count} states')
+    if not count:
+        return
+    print(f"RubikSolver: {columns['solver_moves'].mean():.1f} moves on average, "
+          f"{columns['solver_moves'].mean() * PLAYBACK_SECONDS:.1f}s playback, "
+          f"{columns['solver_seconds'].mean() * 1000:.2f}ms to solve")
+    for name, _ in STAGES:
+        print(f"    {name}: {columns[f'stage_{name}'].mean():.1f} moves")
+    histograms = [('RubikSolver moves', columns['solver_moves'])]
+    if 'optimal' in columns:
+        found = columns['optimal'][columns['optimal'] >= 0]
+        print(f"Optimal: {len(found)}/{count} found, {found.mean() if len(found) else 0:.1f} moves on average, "
+              f"{columns['optimal_seconds'].mean():.2f}s to solve")
+        histograms += [('Lower bound', columns['lower_bound']), ('Optimal (-1: beyond max depth)', columns['optimal'])]
+    for title, values in histograms:
+        print(title)
+        for length, frequency in sorted(Counter(values.tolist()).items()):
+            print(f'    {length:4d}: {frequency}')
+
+
+def generate(corpus, count, steps=50, seed=None):
+    # Writes a corpus of count randomly shuffled states.
+    random = Random(seed)
+    states = np.empty((count, len(SOLVED)), dtype=np.uint8)
+    for i in range(count):
+        state = SOLVED
+        for _ in range(steps):
+            state = move(state, *random.choice(ALL_MOVES))
+        states[i] = np.frombuffer(state, dtype=np.uint8)
+    np.save(corpus, states)
+
+
+def main():
+    parser = ArgumentParser(description='Solution length statistics over a corpus of states.')
+    parser.add_argument('corpus', help='.npy array of compact states')
+    parser.add_argument('output', nargs='?', help='Result columns (.npz), required unless generating')
+    parser.add_argument('--generate', type=int, metavar='COUNT', help='Generate a shuffled corpus instead')
+    parser.add_argument('--steps', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--optimal', nargs='+', default=(), metavar='DATABASE',
+                        help='Pattern databases, enables the lower bound and optimal length columns')
+    parser.add_argument('--max-depth', type=int, default=14, help='Deepest optimal search (IDA* is slow beyond)')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=100)
+    args = parser.parse_args()
+    if not args.generate and not args.output:
+        parser.error('the output argument is required unless --generate is given')
+    if args.generate:
+        generate(args.corpus, args.generate, args.steps, args.seed)
+    else:
+        summary(collect(args.corpus, args.output, args.optimal, args.max_depth, args.processes, args.chunk_size))
+
+
+if __name__ == '__main__':
+    main()
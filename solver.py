@@ -1,9 +1,48 @@
 from constants import EDGES, CORNERS
-from constants import D, CW, ACW
+from constants import F, R, L, U, D, CW, ACW
 from constants import NEIGHBORS, OPPOSITE
 from itertools import chain
 from utilities import RubikUtilities
-from functools import wraps
+from functools import wraps, lru_cache
+from compact import STICKER_INDEX, encode
+from stages import stage
+from algorithms import ALGORITHMS, CaseIndex, face_key, frame
+
+
+def _top_choices(up, names):
+    # Every algorithm of names played from each side of the up face.
+    return [(name, frame(up, front)) for name in names for front in NEIGHBORS[up]]
+
+
+@lru_cache(maxsize=None)
+def top_cross_cases(up):
+    # Cases: which top edges have the up color on top.
+    key = face_key([STICKER_INDEX[e, up] for e in EDGES if up in e])
+    return CaseIndex(lambda state: tuple(face == up for face in key(state)),
+                     _top_choices(up, ['top_cross', 'u', 'u2', 'u_prime']), all)
+
+
+@lru_cache(maxsize=None)
+def top_edges_cases(up):
+    # Cases: the side color of every top edge, the top edges being oriented.
+    edges = [e for e in EDGES if up in e]
+    sides = [f for e in edges for f in e if f != up]
+    return CaseIndex(face_key([STICKER_INDEX[e, f] for e, f in zip(edges, sides)]),
+                     _top_choices(up, ['top_edges', 'u', 'u2', 'u_prime']),
+                     lambda case: list(case) == sides)
+
+
+@lru_cache(maxsize=None)
+def top_corners_cases(up):
+    # Cases: the colors of every top corner, whatever their orientation. Top turns would undo the top edges.
+    corners = [c for c in CORNERS if up in c]
+    stickers = face_key([STICKER_INDEX[c, f] for c in corners for f in c])
+
+    def key(state):
+        faces = stickers(state)
+        return tuple(frozenset(faces[i:i + 3]) for i in range(0, len(faces), 3))
+
+    return CaseIndex(key, _top_choices(up, ['top_corners']), lambda case: case == tuple(map(frozenset, corners)))
 
 
 def assert_conditions(pre_condition, post_condition):
@@ -136,15 +175,11 @@ class RubikSolver:
         # Algorithm definitions
         def left_algorithm(left, up, front):
             # Algorithm: U' L' U L U F U' F'
-            for _direction, _face in [(ACW, up), (ACW, left), (CW, up), (CW, left), (CW, up), (CW, front), (ACW, up),
-                                      (ACW, front)]:
-                yield _direction, _face
+            return ALGORITHMS['middle_left'].moves_in({L: left, U: up, F: front})
 
         def right_algorithm(right, up, front):
             # Algorithm: U R U' R' U' F' U F
-            for _direction, _face in [(CW, up), (CW, right), (ACW, up), (ACW, right), (ACW, up), (ACW, front), (CW, up),
-                                      (CW, front)]:
-                yield _direction, _face
+            return ALGORITHMS['middle_right'].moves_in({R: right, U: up, F: front})
 
         up_side = OPPOSITE[base]
         # The edges which need to be placed in order, without impacting the lower layers
@@ -207,154 +242,23 @@ class RubikSolver:
     @staticmethod
     @assert_conditions(RubikUtilities.is_middle_layer_solved, RubikUtilities.is_top_cross_solved)
     def solve_top_cross(rubik, base=D):
-        def algorithm(right, up, front):
-            # Algorithm: F R U R' U' F'
-            for _direction, _face in [(CW, front), (CW, right), (CW, up), (ACW, right), (ACW, up), (ACW, front)]:
-                yield _direction, _face
-
-        up_side = OPPOSITE[base]
-        up_color = rubik.get_colors(up_side)
-        edges = list(filter(lambda _edge: up_side in _edge.positions, [rubik.get_edge(positions=e) for e in EDGES]))
-
-        top_facing_edges = lambda: list(
-            filter(lambda _edge: _edge.colors[_edge.positions.index(up_side)] == up_color, edges))
-
-        if len(top_facing_edges()) == 0:
-            # now orientation is required to apply the algorithm
-            some_edge = edges[0]
-            right_side = some_edge.positions[0 if some_edge.positions[1] == up_side else 1]
-            yield (CW, up_side)
-            front_side = some_edge.positions[0 if some_edge.positions[1] == up_side else 1]
-            yield (ACW, up_side)
-
-            # Apply the algorithm to obtain at least 2 edges
-            for direction, face in algorithm(right_side, up_side, front_side):
-                yield direction, face
-
-        assert len(top_facing_edges()) > 0
-        if len(top_facing_edges()) == 2:
-            facing_edges = top_facing_edges()
-            edge1_side = facing_edges[0].positions[0 if facing_edges[0].positions[1] == up_side else 1]
-            edge2_side = facing_edges[1].positions[0 if facing_edges[1].positions[1] == up_side else 1]
-
-            if OPPOSITE[edge1_side] != edge2_side:
-                # L shape
-                # Apply algorithm to convert it to line orientation.
-                # First determine Orientation to apply algorithm
-                yield (CW, up_side)
-                if edge2_side == facing_edges[0].positions[0 if facing_edges[0].positions[1] == up_side else 1]:
-                    # If moving CW, edge1 moves to edge2. Then opposite of initial edge2 is front side.
-                    yield (ACW, up_side)
-                    front_side, right_side = OPPOSITE[edge2_side], OPPOSITE[edge1_side]
-                    for direction, face in algorithm(right_side, up_side, front_side):
-                        yield direction, face
-                else:
-                    yield (ACW, up_side)
-                    front_side, right_side = OPPOSITE[edge1_side], OPPOSITE[edge2_side]
-                    for direction, face in algorithm(right_side, up_side, front_side):
-                        yield direction, face
-
-            facing_edges = top_facing_edges()
-            edge1_side = facing_edges[0].positions[0 if facing_edges[0].positions[1] == up_side else 1]
-            edge2_side = facing_edges[1].positions[0 if facing_edges[1].positions[1] == up_side else 1]
-            assert OPPOSITE[edge1_side] == edge2_side
-            # Now there must be I shape
-
-            yield (CW, up_side)
-            right_side = edge1_side
-            front_side = facing_edges[0].positions[0 if facing_edges[0].positions[1] == up_side else 1]
-            yield (ACW, up_side)
-            for direction, face in algorithm(right_side, up_side, front_side):
-                yield direction, face
+        # Algorithm: F R U R' U' F', the case (which top edges are oriented) is looked up instead of probed.
+        for direction, face in top_cross_cases(OPPOSITE[base]).moves(encode(rubik)):
+            yield direction, face
 
     @staticmethod
     @assert_conditions(RubikUtilities.is_top_cross_solved, RubikUtilities.is_top_edges_solved)
     def solve_top_edges(rubik, base=D):
-        def algorithm(right, up):
-            # Algorithm: R U R' U R U2 R' U
-            for _direction, _face in [(CW, right), (CW, up), (ACW, right), (CW, up), (CW, right), (CW, up), (CW, up),
-                                      (ACW, right), (CW, up)]:
-                yield _direction, _face
-
-        up_side = OPPOSITE[base]
-        edges = list(filter(lambda _edge: up_side in _edge.positions, [rubik.get_edge(positions=e) for e in EDGES]))
-
-        def aligned_top_edges():
-            return list(filter(lambda _edge: rubik.get_colors(
-                _edge.positions[0 if _edge.positions[1] == up_side else 1]) in _edge.colors, edges))
-
-        while len(aligned_top_edges()) <= 1:
-            yield (CW, up_side)
-
-        aligned_edges = aligned_top_edges()
-        if len(aligned_edges) == 4:
-            # No need for any algorithm already aligned
-            return
-
-        assert len(aligned_edges) == 2
-
-        edge1_side = aligned_edges[0].positions[0 if aligned_edges[0].positions[1] == up_side else 1]
-        edge2_side = aligned_edges[1].positions[0 if aligned_edges[1].positions[1] == up_side else 1]
-        if OPPOSITE[edge1_side] == edge2_side:
-            # Aligned edges in opposite to each other.
-            # apply algorithm to convert it into L pattern
-            # any side would do for algorithm orientation not required
-            for direction, face in algorithm(edge1_side, up_side):
-                yield direction, face
-
-        # Update the aligned top edges in case conversion took place.
-        while len(aligned_top_edges()) <= 1:
-            yield (CW, up_side)
-
-        aligned_edges = aligned_top_edges()
-        edge1_side = aligned_edges[0].positions[0 if aligned_edges[0].positions[1] == up_side else 1]
-        edge2_side = aligned_edges[1].positions[0 if aligned_edges[1].positions[1] == up_side else 1]
-        assert OPPOSITE[edge1_side] != edge2_side
-
-        # Not oriented top edge orientation must have L shape
-        # Orientation is now required for the algorithm to complete this step.
-        yield (CW, up_side)
-        right_side = edge1_side
-        if edge2_side == aligned_edges[0].positions[0 if aligned_edges[0].positions[1] == up_side else 1]:
-            right_side = edge2_side
-        yield (ACW, up_side)
-        for direction, face in algorithm(right_side, up_side):
+        # Algorithm: R U R' U R U2 R' U, the case (where the top edges are) is looked up instead of probed.
+        for direction, face in top_edges_cases(OPPOSITE[base]).moves(encode(rubik)):
             yield direction, face
 
     @staticmethod
     @assert_conditions(RubikUtilities.is_top_edges_solved, RubikUtilities.is_positioned_top_corners)
     def solve_position_top_corners(rubik, base=D):
-        def algorithm(left, right, up):
-            # Algorithm: U R U' L' U R' U' L
-            for _direction, _face in [(CW, up), (CW, right), (ACW, up), (ACW, left), (CW, up), (ACW, right), (ACW, up),
-                                      (CW, left)]:
-                yield _direction, _face
-
-        up_side = OPPOSITE[base]
-        up_color = rubik.get_colors(up_side)
-        corners = list(filter(lambda cnr: up_color in cnr.colors, [rubik.get_corner(positions=c) for c in CORNERS]))
-
-        def aligned_top_corners():
-            return list(filter(lambda cnr: set(cnr.colors) == set(rubik.get_colors(f) for f in cnr.positions), corners))
-
-        if len(aligned_top_corners()) == 0:
-            # Simply apply the algorithm.
-            # Then one of them will auto align
-            left_side = NEIGHBORS[up_side][0]
-            right_side = OPPOSITE[left_side]
-            for direction, face in algorithm(left_side, right_side, up_side):
-                yield direction, face
-
-        while len(aligned_top_corners()) == 1:
-            aligned_corner = aligned_top_corners()[0]
-            side1, side2 = list(filter(lambda f: f != up_side, aligned_corner.positions))
-            yield (CW, up_side)
-            right_side = side2 if side1 in aligned_corner.positions else side1
-            left_side = OPPOSITE[right_side]
-            yield (ACW, up_side)
-
-            for direction, face in algorithm(left_side, right_side, up_side):
-                yield direction, face
+        # Algorithm: U R U' L' U R' U' L, the case (where the top corners are) is looked up instead of probed.
+        for direction, face in top_corners_cases(OPPOSITE[base]).moves(encode(rubik)):
+            yield direction, face
 
     @staticmethod
     @assert_conditions(RubikUtilities.is_positioned_top_corners, RubikUtilities.is_oriented_top_corners)
@@ -391,10 +295,9 @@ class RubikSolver:
 
             # Apply algorithm till corner oriented.
             while not (up_side in corner.positions and corner.colors[corner.positions.index(up_side)] == up_color):
-                yield (ACW, right_side)
-                yield (ACW, down_side)
-                yield (CW, right_side)
-                yield (CW, down_side)
+                # Algorithm: R' D' R D
+                for direction, face in ALGORITHMS['corner_twist'].moves_in({R: right_side, D: down_side}):
+                    yield direction, face
 
 
     @staticmethod
@@ -417,18 +320,11 @@ class RubikSolver:
         """
             This method identifies the current stage the cube is solved to, then solves it to the next stage.
         """
-        if not RubikUtilities.is_bottom_cross_solved(rubik, base):
-            return RubikSolver.solve_bottom_cross(rubik, base)
-        elif not RubikUtilities.is_bottom_layer_solved(rubik, base):
-            return RubikSolver.solve_bottom_corners(rubik, base)
-        elif not RubikUtilities.is_middle_layer_solved(rubik, base):
-            return RubikSolver.solve_middle_layer(rubik, base)
-        elif not RubikUtilities.is_top_cross_solved(rubik, base):
-            return RubikSolver.solve_top_cross(rubik, base)
-        elif not RubikUtilities.is_top_edges_solved(rubik, base):
-            return RubikSolver.solve_top_edges(rubik, base)
-        elif not RubikUtilities.is_positioned_top_corners(rubik, base):
-            return RubikSolver.solve_position_top_corners(rubik, base)
-        elif not RubikUtilities.is_oriented_top_corners(rubik, base):
-            return RubikSolver.solve_orient_top_corners(rubik, base)
-        return ()
+        stages = [RubikSolver.solve_bottom_cross, RubikSolver.solve_bottom_corners, RubikSolver.solve_middle_layer,
+                  RubikSolver.solve_top_cross, RubikSolver.solve_top_edges, RubikSolver.solve_position_top_corners,
+                  RubikSolver.solve_orient_top_corners]
+        # Single pass classification of the compact state instead of rescanning the rubik for every predicate.
+        completed = stage(encode(rubik), base)
+        if completed == len(stages):
+            return ()
+        return stages[completed](rubik, base)
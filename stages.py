@@ -0,0 +1,70 @@
+"""
+    Stage classification of the layer by layer method in a single pass over a compact state (see compact.py),
+    and over N states at once with numpy. Equivalent to calling the RubikUtilities predicates in sequence
+    (is_bottom_cross_solved, ..., is_oriented_top_corners), which each rescan the Rubik.
+    A stage is the number of consecutive completed steps, from 0 (bottom cross not solved) to 7 (solved).
+"""
+from constants import CENTERS, EDGES, CORNERS, D, OPPOSITE
+from compact import STICKERS, STICKER_INDEX
+
+STAGES = ['bottom_cross', 'bottom_corners', 'middle_layer', 'top_cross', 'top_edges', 'position_top_corners',
+          'orient_top_corners']
+SOLVED_STAGE = len(STAGES)
+POSITION_TOP_CORNERS = STAGES.index('position_top_corners')
+
+# For every sticker, the sticker of the center of its face.
+CENTER_OF = [STICKER_INDEX[face, face] for _, face in STICKERS]
+
+
+def _stickers(pieces, faces=None):
+    return [STICKER_INDEX[piece, f] for piece in pieces for f in piece if faces is None or f in faces]
+
+
+def stage_stickers(base=D):
+    """
+        Stickers which must match their center for each stage to be complete. Positioning the top corners only
+        needs the right pieces in place, so that stage has the corner stickers grouped by corner instead.
+    """
+    top = OPPOSITE[base]
+    top_corners = [c for c in CORNERS if top in c]
+    return [
+        _stickers(e for e in EDGES if base in e),
+        _stickers(c for c in CORNERS if base in c),
+        _stickers(e for e in EDGES if base not in e and top not in e),
+        _stickers((e for e in EDGES if top in e), (top,)),
+        _stickers(e for e in EDGES if top in e),
+        [_stickers([c]) for c in top_corners],
+        _stickers(top_corners),
+    ]
+
+
+_STAGE_STICKERS = {base: stage_stickers(base) for base in CENTERS}
+
+
+def stage(state, base=D):
+    # Returns the number of consecutive completed stages of the compact state.
+    for index, stickers in enumerate(_STAGE_STICKERS[base]):
+        if index == POSITION_TOP_CORNERS:
+            complete = all(sorted(state[s] for s in corner) == sorted(state[CENTER_OF[s]] for s in corner)
+                           for corner in stickers)
+        else:
+            complete = all(state[s] == state[CENTER_OF[s]] for s in stickers)
+        if not complete:
+            return index
+    return SOLVED_STAGE
+
+
+def stages(states, base=D):
+    # Vectorised stage over an (N, 54) uint8 array of compact states, returns an array of N stages.
+    import numpy as np
+    matches = states == states[:, CENTER_OF]
+    complete = np.empty((len(states), SOLVED_STAGE), dtype=bool)
+    for index, stickers in enumerate(_STAGE_STICKERS[base]):
+        if index == POSITION_TOP_CORNERS:
+            corners = np.array(stickers)
+            complete[:, index] = (np.sort(states[:, corners], axis=2) ==
+                                  np.sort(states[:, np.array(CENTER_OF)[corners]], axis=2)).all(axis=(1, 2))
+        else:
+            complete[:, index] = matches[:, stickers].all(axis=1)
+    # The first incomplete stage, or SOLVED_STAGE when every stage is complete.
+    return np.where(complete.all(axis=1), SOLVED_STAGE, np.argmin(complete, axis=1))
@@ -0,0 +1,144 @@
+"""
+    Frame-time telemetry of the window: the time of every frame and of its phases, shown in an on-screen overlay
+    (python main.py --overlay) and exported as histograms on exit (--histogram PATH). It reuses the phases of the
+    profiling mode (see profiling.py): a FrameTelemetry is a Profiler that adds up the phases entered during each
+    "frame" phase instead of sampling stacks. The overlay shows, over the last HISTORY frames:
+        fps          frames started per second, the 60 fps cap of the mainloop included
+        frame        p50 and p99 of the time spent working on a frame, waiting for the next one excluded
+        input        handling the events
+        animate      playing the animations and the solving functions
+        sort         collecting and sorting the surfaces of the cube
+        project      projecting the surfaces to the screen
+        draw         the rest of rendering: filling polygons, the orientation mini-map and display updates
+        overlay      drawing this overlay, its text being rendered again every UPDATE_INTERVAL seconds
+    The histogram file has one line per bucket, "upper bound in ms" then the number of frames of every phase.
+"""
+from array import array
+from bisect import bisect_left
+from collections import deque
+from threading import get_ident
+from time import perf_counter
+import pygame
+from profiling import Profiler
+
+FRAME = 'frame'
+# The phases recorded, as mainloop and profile_phases name them.
+PHASES = ['events', 'animate', 'function', 'render', 'sort', 'project', 'overlay']
+HISTORY = 120
+# Seconds between two updates of the overlay text.
+UPDATE_INTERVAL = 0.25
+# Upper bounds of the histogram buckets, in milliseconds, the last bucket takes every longer frame.
+BUCKETS = [0.25, 0.5, 1, 2, 4, 8, 16.7, 33.3, 50, 100, 250, 1000, float('inf')]
+COLOR, BACKGROUND = (255, 255, 255), (40, 40, 40)
+FONT_SIZE = 18
+# Right edges of the value columns of the overlay, in pixels.
+COLUMNS = [0, 110, 160, 210]
+
+
+class FrameTelemetry(Profiler):
+    def __init__(self, histogram=None, history=HISTORY, show=True):
+        super().__init__(directory=None, mode=None)
+        self.histogram = histogram
+        self.show = show
+        self.recent = {name: deque(maxlen=history) for name in [FRAME] + PHASES}
+        self.starts = deque(maxlen=history)
+        self.session = {name: array('d') for name in [FRAME] + PHASES}
+        # Phase seconds of the frame in progress.
+        self.frame = dict.fromkeys(PHASES, 0.0)
+        self._font = None
+        self._overlay = None
+        self._updated = 0.0
+
+    def start(self):
+        return self
+
+    def _record(self, name, seconds):
+        if get_ident() != self._main:
+            # Phases of background threads (e.g. the anytime solver) are not part of the frames.
+            return
+        if name != FRAME:
+            if name in self.frame:
+                self.frame[name] += seconds
+            return
+        self.starts.append(perf_counter() - seconds)
+        self.frame[FRAME] = seconds
+        for name, seconds in self.frame.items():
+            self.recent[name].append(seconds)
+            self.session[name].append(seconds)
+        self.frame = dict.fromkeys(PHASES, 0.0)
+
+    def fps(self):
+        if len(self.starts) < 2:
+            return 0.0
+        return (len(self.starts) - 1) / max(self.starts[-1] - self.starts[0], 1e-9)
+
+    def rows(self):
+        # The (label, mean, p50, p99) rows of the overlay, in milliseconds over the recent frames.
+        recent = self.recent
+        count = len(recent[FRAME])
+        if not count:
+            return []
+        phases = {
+            'frame': list(recent[FRAME]),
+            'input': list(recent['events']),
+            'animate': [a + b for a, b in zip(recent['animate'], recent['function'])],
+            'sort': list(recent['sort']),
+            'project': list(recent['project']),
+            # The overlay is drawn inside render when the cube is redrawn, and on its own in between.
+            'draw': [max(0.0, r - s - p - o) for r, s, p, o in
+                     zip(recent['render'], recent['sort'], recent['project'], recent['overlay'])],
+            'overlay': list(recent['overlay']),
+        }
+        rows = []
+        for label, durations in phases.items():
+            ordered = sorted(durations)
+            rows.append((label, sum(ordered) / count * 1000, ordered[count // 2] * 1000,
+                         ordered[int(count * 0.99)] * 1000))
+        return rows
+
+    def overlay(self):
+        """
+            Returns (surface, rect, changed): the overlay in the top left corner of the window, redrawn at most every
+            UPDATE_INTERVAL seconds, changed telling whether it was.
+        """
+        now = perf_counter()
+        if self._overlay is not None and now - self._updated < UPDATE_INTERVAL:
+            return self._overlay + (False,)
+        if self._font is None:
+            self._font = pygame.font.Font(None, FONT_SIZE)
+        lines = [[f'{self.fps():.1f} fps', 'mean', 'p50', 'p99 ms']]
+        lines += [[label] + [f'{ms:.2f}' for ms in values] for label, *values in self.rows()]
+        # The default font is proportional, so the values are right aligned on the right edge of their column.
+        height = self._font.get_linesize()
+        surface = pygame.Surface((COLUMNS[-1] + 8, height * len(lines) + 8))
+        surface.fill(BACKGROUND)
+        for row, fields in enumerate(lines):
+            for column, field in enumerate(fields):
+                text = self._font.render(field, True, COLOR, BACKGROUND)
+                x = 4 if column == 0 else COLUMNS[column] - text.get_width()
+                surface.blit(text, (x, 4 + row * height))
+        self._overlay = (surface, surface.get_rect(topleft=(0, 0)))
+        self._updated = now
+        return self._overlay + (True,)
+
+    def histograms(self):
+        # The number of frames of every phase in every bucket, as {phase: [count per bucket]}.
+        histograms = {}
+        for name, durations in self.session.items():
+            counts = [0] * len(BUCKETS)
+            for seconds in durations:
+                counts[bisect_left(BUCKETS, seconds * 1000)] += 1
+            histograms[name] = counts
+        return histograms
+
+    def stop(self):
+        # Restores the wrapped functions and writes the histograms, returns their path.
+        self.restore()
+        if self.histogram is None:
+            return None
+        histograms = self.histograms()
+        with open(self.histogram, 'w') as output:
+            output.write('\t'.join(['ms'] + list(histograms)) + '\n')
+            for i, bound in enumerate(BUCKETS):
+                output.write('\t'.join([f'{bound:g}'] + [str(counts[i]) for counts in histograms.values()]) + '\n')
+        return self.histogram
@@ -0,0 +1,58 @@
+from copy import deepcopy
+from time import sleep
+import pytest
+from anytime import AnytimeSolver
+from main import anytime_generator, start_anytime_solver
+from rubik import Rubik
+from utilities import RubikUtilities
+
+
+@pytest.fixture(scope='module')
+def solver():
+    with AnytimeSolver(processes=1) as solver:
+        yield solver
+
+
+@pytest.fixture
+def scrambled():
+    rubik = Rubik()
+    RubikUtilities.shuffle(rubik, 50)
+    return rubik
+
+
+def play(rubik, generator, delay=0.0):
+    # delay stands for the animation of every move in the window.
+    moves = 0
+    for direction, face in generator:
+        sleep(delay)
+        rubik.move(direction, face)
+        moves += 1
+    return moves
+
+
+def test_plays_before_the_solver_is_ready(solver, scrambled):
+    calls = []
+
+    def anytime():
+        # Not ready for the first moves, as while it is built in the background.
+        calls.append(None)
+        return solver if len(calls) > 5 else None
+
+    generator = anytime_generator(scrambled, anytime)
+    scrambled.move(*next(generator))
+    assert len(calls) == 1
+    play(scrambled, generator)
+    assert RubikUtilities.is_solved(scrambled)
+    assert len(calls) > 5
+
+
+def test_switches_to_a_shorter_solution(solver, scrambled):
+    layer = play(deepcopy(scrambled), anytime_generator(deepcopy(scrambled), lambda: None))
+    moves = play(scrambled, anytime_generator(scrambled, lambda: solver), delay=0.02)
+    assert RubikUtilities.is_solved(scrambled)
+    assert moves < layer
+
+
+def test_close_before_any_get():
+    get, close = start_anytime_solver()
+    close()
@@ -0,0 +1,40 @@
+from random import Random
+import pytest
+from algorithms import simplify
+from best_of import BestOfSolver, LAYER, CFOP, _layer_moves
+from cfop import CFOPSolver
+from compact import SOLVED, encode
+from constants import ALL_MOVES, D
+from permutations import Permutation
+from rubik import Rubik
+
+
+@pytest.fixture(scope='module')
+def best_of():
+    with BestOfSolver(processes=1, solvers=(LAYER, CFOP)) as solver:
+        yield solver
+
+
+def shuffled(seed):
+    rubik, random = Rubik(), Random(seed)
+    scramble = [random.choice(ALL_MOVES) for _ in range(40)]
+    for direction, face in scramble:
+        rubik.move(direction, face)
+    return rubik, scramble
+
+
+@pytest.mark.parametrize('budget', [0.05, 1.0])
+def test_never_longer_than_a_single_solver(best_of, budget):
+    for seed in range(3):
+        rubik, scramble = shuffled(seed)
+        state = encode(rubik)
+        single = min(len(CFOPSolver.solve_state(state, D)), len(simplify(_layer_moves(state, D))))
+        solution = best_of.solve(rubik, budget)
+        assert len(solution) <= single
+        assert (Permutation.from_moves(scramble) * Permutation.from_moves(solution)).solves(SOLVED)
+
+
+def test_strongest_solver_runs_first(best_of):
+    candidates = best_of.candidates(SOLVED, 0)
+    assert [candidate[2:] for candidate in candidates[:2]] == [(CFOP, 0, D), (LAYER, 0, D)]
+    assert {candidate[2] for candidate in candidates[2:len(candidates) // 2 + 1]} == {CFOP}
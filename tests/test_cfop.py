@@ -0,0 +1,50 @@
+from random import Random
+import pytest
+from best_of import ORIENTATIONS
+from cfop import CFOPSolver
+from compact import SOLVED, FACE_TURNS, is_solved, move, rotate, turn
+from constants import CENTERS, D
+from rubik import Rubik
+from utilities import RubikUtilities
+
+
+def scramble(seed, length=40):
+    random, state = Random(seed), SOLVED
+    for _ in range(length):
+        state = turn(state, random.randrange(len(FACE_TURNS)))
+    return state
+
+
+def play(state, moves):
+    for direction, face in moves:
+        state = move(state, direction, face)
+    return state
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_solves_random_scrambles(seed):
+    state = scramble(seed)
+    assert is_solved(play(state, CFOPSolver.solve_state(state, D)))
+
+
+@pytest.mark.parametrize('orientation', range(1, len(ORIENTATIONS), 4))
+def test_solves_rotated_scrambles(orientation):
+    state = scramble(orientation)
+    for direction, axis in ORIENTATIONS[orientation]:
+        state = rotate(state, direction, axis)
+    assert is_solved(play(state, CFOPSolver.solve_state(state, D)))
+
+
+@pytest.mark.parametrize('base', CENTERS)
+def test_solves_from_every_base(base):
+    rubik = Rubik()
+    RubikUtilities.shuffle(rubik, 50)
+    for direction, face in CFOPSolver.solve(rubik, base):
+        rubik.move(direction, face)
+    assert RubikUtilities.is_solved(rubik)
+
+
+def test_average_length():
+    solutions = [CFOPSolver.solve_state(scramble(seed), D) for seed in range(20)]
+    assert sum(map(len, solutions)) / len(solutions) <= 60
+    assert len(CFOPSolver.solve_state(scramble(0), D, crosses=1)) >= len(solutions[0])
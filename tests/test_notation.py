@@ -0,0 +1,50 @@
+from random import Random
+import numpy as np
+import pytest
+from constants import ALL_MOVES, CW, ACW, F, R, U, L
+from compact import SOLVED, encode
+from nxn import NxNRubik
+from notation import apply, nxn_permutation, notation, parse, permutation, play
+from permutations import Permutation
+from rubik import Rubik
+
+
+def test_parse_turns():
+    assert parse("R U' F2") == ((R, 0, 0, 1), (U, 0, 0, 3), (F, 0, 0, 2))
+    assert parse('Rw2 3Fw\' M x') == ((R, 0, 1, 2), (F, 0, 2, 3), (L, 1, -2, 1), (R, 0, -1, 1))
+    assert parse('RUR\'U\'') == parse("R U R' U'")
+    assert parse('R4 U2 U2') == ((U, 0, 0, 2), (U, 0, 0, 2))
+
+
+@pytest.mark.parametrize('text', ['R Q', 'Rq', '0R', '2M', 'R U %'])
+def test_unknown_moves_raise(text):
+    with pytest.raises(ValueError):
+        parse(text)
+
+
+def test_sexy_move_has_order_six():
+    sexy = Permutation(permutation("R U R' U'"))
+    assert not sexy.is_identity() and (sexy ** 6).is_identity()
+
+
+def test_sequences_undone_by_their_inverse():
+    for text, inverse in [("R U F' D2", "D2 F U' R'"), ("Rw M' x2 S", "S' x2 M Rw'"), ("E y' z", "z' y E'")]:
+        assert apply(apply(SOLVED, text), inverse) == SOLVED
+
+
+def test_notation_writes_what_permutation_reads():
+    random = Random(3)
+    moves = [random.choice(ALL_MOVES) for _ in range(40)]
+    assert Permutation(permutation(notation(moves))) == Permutation.from_moves(moves)
+    assert notation([(CW, R), (CW, R), (ACW, U), (CW, U)]) == 'R2'
+
+
+def test_rubik_and_nxn_agree_on_3x3():
+    text = "R U2 F' L D B2 r M"
+    rubik = play(Rubik(), text)
+    assert encode(rubik) == apply(SOLVED, text)
+    cube = play(NxNRubik(3), text)
+    again = play(NxNRubik(3), text + ' ' + text)
+    assert not (cube.stickers == NxNRubik(3).stickers).all()
+    # Undoing the sequence once from twice the sequence leaves it played once.
+    assert (again.stickers[np.argsort(nxn_permutation(3, text))] == cube.stickers).all()
@@ -0,0 +1,98 @@
+import os
+from random import Random
+import pytest
+from compact import SOLVED, FACE_TURNS, decode, turn
+from optimal_solver import DATABASES, OptimalSolver, allowed_turns, to_moves
+from pattern_database import CornerPattern, EdgePattern, PatternDatabase
+from short_solver import ShortSolver
+
+
+@pytest.fixture(scope='module')
+def edge_paths(tmp_path_factory):
+    # Small edge databases, weak heuristics but enough for short scrambles.
+    directory = tmp_path_factory.mktemp('databases')
+    paths = []
+    for pieces in ((0, 1, 2), (3, 4, 5), (6, 7, 8), (9, 10, 11)):
+        path = str(directory / f'edges_{pieces[0]}.npz')
+        PatternDatabase.generate(EdgePattern(pieces)).save(path)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture(scope='module')
+def solver(edge_paths):
+    return OptimalSolver(edge_paths)
+
+
+@pytest.fixture(scope='module')
+def corner_path(tmp_path_factory):
+    # The corner database of DATABASES when generated in the working directory, else generated here (about 2
+    # minutes on one core).
+    if os.path.exists(DATABASES[0]):
+        return DATABASES[0]
+    path = str(tmp_path_factory.mktemp('corners') / 'corners.npz')
+    PatternDatabase.generate(CornerPattern()).save(path)
+    return path
+
+
+def scramble(turns):
+    state = SOLVED
+    for t in turns:
+        state = turn(state, t)
+    return state
+
+
+def test_short_scrambles_get_optimal_solutions(solver):
+    random = Random(2)
+    for length in range(5):
+        turns = [random.randrange(len(FACE_TURNS)) for _ in range(length)]
+        state = scramble(turns)
+        solution = solver.solve_turns(state)
+        assert scramble(turns + solution) == SOLVED
+        # The bidirectional search is exhaustive, so its solutions are optimal too.
+        assert len(solution) == len(ShortSolver().solve_turns(state))
+        assert solver.lower_bound(state) <= len(solution)
+
+
+def test_max_depth_bounds_the_search(solver):
+    state = scramble([0, 3, 6, 9])
+    assert solver.solve_turns(state, max_depth=2) is None
+
+
+def test_solve_returns_moves_solving_the_rubik(solver):
+    rubik = decode(scramble([1, 5, 13]))
+    for direction, face in solver.solve(rubik):
+        rubik.move(direction, face)
+    assert rubik.state_key() == decode(SOLVED).state_key()
+    assert len(to_moves([1])) == 2
+
+
+def test_opposite_faces_turn_in_one_order():
+    # Turns of a face never follow turns of the same face, nor of the opposite face listed before it.
+    assert all(t // 3 != 1 and t // 3 != 0 for t in allowed_turns(1))
+    assert all(t // 3 != 0 for t in allowed_turns(0)) and any(t // 3 == 1 for t in allowed_turns(0))
+
+
+def test_transposition_table_needs_the_whole_cube(edge_paths):
+    try:
+        OptimalSolver(edge_paths, table_memory=1 << 20)
+        assert OptimalSolver.table_statistics() is None
+    finally:
+        # The databases and the table are globals of the process, the module solver gets its own back.
+        OptimalSolver(edge_paths)
+
+
+def test_transposition_table_keeps_solutions_optimal(edge_paths, corner_path):
+    random = Random(3)
+    try:
+        solver = OptimalSolver([corner_path] + edge_paths, table_memory=1 << 20)
+        for length in range(4, 8):
+            turns = [random.randrange(len(FACE_TURNS)) for _ in range(length)]
+            state = scramble(turns)
+            solution = solver.solve_turns(state)
+            assert scramble(turns + solution) == SOLVED
+            assert len(solution) == len(ShortSolver().solve_turns(state))
+        statistics = OptimalSolver.table_statistics()
+        assert statistics['stores'] > 0 and statistics['hit_rate'] > 0
+    finally:
+        OptimalSolver(edge_paths)
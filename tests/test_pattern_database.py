@@ -0,0 +1,77 @@
+import os
+from itertools import permutations
+from multiprocessing import active_children
+import numpy as np
+import pytest
+from compact import SOLVED, FACE_TURNS, turn
+from pattern_database import (EdgePattern, PatternDatabase, rank_arrangement, rank_arrangements, rank_permutation,
+                              unrank_arrangements)
+
+
+def test_permutation_rank_is_the_lexicographic_index():
+    for index, permutation in enumerate(permutations(range(5))):
+        assert rank_permutation(permutation) == index
+
+
+def test_arrangement_rank_round_trips():
+    n, k = 7, 3
+    ranks = np.arange(7 * 6 * 5)
+    arrangements = unrank_arrangements(ranks, n, k)
+    assert len({tuple(row) for row in arrangements.tolist()}) == len(ranks)
+    assert (rank_arrangements(arrangements.astype(np.int64), n) == ranks).all()
+    assert [rank_arrangement(row, n) for row in arrangements.tolist()] == ranks.tolist()
+
+
+def test_full_permutations_unrank_like_rank_permutation():
+    ranks = np.arange(120)
+    assert [rank_permutation(row) for row in unrank_arrangements(ranks, 5, 5).tolist()] == ranks.tolist()
+
+
+def states_by_depth(depth):
+    # The states first reached at every depth of a breadth first search from solved.
+    layers, seen = [[SOLVED]], {SOLVED}
+    for _ in range(depth):
+        layer = []
+        for state in layers[-1]:
+            for t in range(len(FACE_TURNS)):
+                moved = turn(state, t)
+                if moved not in seen:
+                    seen.add(moved)
+                    layer.append(moved)
+        layers.append(layer)
+    return layers
+
+
+def test_small_database_is_admissible_and_exact_near_solved(tmp_path):
+    database = PatternDatabase.generate(EdgePattern((0, 1, 2)))
+    database.save(tmp_path / 'edges.npz')
+    loaded = PatternDatabase.load(tmp_path / 'edges.npz')
+    assert (loaded.table == database.table).all()
+    for depth, layer in enumerate(states_by_depth(3)):
+        distances = [loaded.heuristic(state) for state in layer]
+        assert max(distances) <= depth
+        if depth == 1:
+            # A single turn moving the pattern's edges is one turn from solved in the pattern too.
+            assert set(distances) <= {0, 1} and 1 in distances
+    assert loaded.heuristic(SOLVED) == 0
+
+
+def test_move_tables_follow_the_turns():
+    pattern = EdgePattern((3, 7, 10))
+    for state in states_by_depth(2)[2][:50]:
+        index = pattern.index(state)
+        for t in range(len(FACE_TURNS)):
+            assert pattern.turn(index, t) == pattern.index(turn(state, t))
+            assert pattern.neighbors(np.array([index]), t)[0] == pattern.index(turn(state, t))
+
+
+@pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason='lists the shared memory blocks in /dev/shm')
+def test_failed_generation_releases_the_pool_and_shared_memory():
+    before = set(os.listdir('/dev/shm'))
+    with pytest.raises(ValueError) as failure:
+        # A chunk size of 0 fails splitting the first frontier.
+        PatternDatabase.generate(EdgePattern((0, 1)), processes=2, chunk_size=0)
+    # The traceback keeps the frame of generate alive, its pool is not left for the garbage collector to stop.
+    assert failure.traceback and not active_children()
+    assert set(os.listdir('/dev/shm')) == before
+    assert PatternDatabase.generate(EdgePattern((0, 1)), processes=2).distance(EdgePattern((0, 1)).index(SOLVED)) == 0
@@ -0,0 +1,61 @@
+from random import Random
+from constants import ALL_MOVES, CW, ACW, R, U, F, D
+from compact import SOLVED, move
+from permutations import Permutation, verify
+from rubik import Rubik
+from solver import RubikSolver
+from utilities import RubikUtilities
+
+
+def random_moves(count, seed=0):
+    random = Random(seed)
+    return [random.choice(ALL_MOVES) for _ in range(count)]
+
+
+def test_product_plays_left_to_right():
+    a, b = Permutation.move(CW, R), Permutation.move(CW, U)
+    state = move(move(SOLVED, CW, R), CW, U)
+    assert (a * b).apply(SOLVED) == state
+    assert Permutation.from_moves([(CW, R), (CW, U)]) == a * b
+
+
+def test_inverse_and_powers():
+    p = Permutation.from_moves(random_moves(30))
+    assert (p * p.inverse()).is_identity() and (p.inverse() * p).is_identity()
+    assert p ** 3 == p * p * p and p ** -2 == (p * p).inverse() and (p ** 0).is_identity()
+    assert (p ** p.order()).is_identity()
+
+
+def test_orders():
+    assert Permutation.move(CW, R).order() == 4
+    assert Permutation.from_moves([(CW, R), (CW, U)]).order() == 105
+    assert Permutation().order() == 1
+
+
+def test_commutator_and_conjugate():
+    r, u = Permutation.move(CW, R), Permutation.move(CW, U)
+    assert r.commutator(u) == r * u * r.inverse() * u.inverse()
+    assert r.commutator(r).is_identity()
+    assert u.conjugate(r) == r * u * r.inverse()
+    # A conjugate has the cycle structure of the conjugated permutation.
+    assert sorted(map(len, u.conjugate(r).cycles())) == sorted(map(len, u.cycles()))
+
+
+def test_support_matches_cycles():
+    p = Permutation.move(ACW, F)
+    assert sorted(s for cycle in p.cycles() for s in cycle) == p.support()
+    assert len(p.support()) == 20
+
+
+def test_verify_solver_solution():
+    rubik, scramble = Rubik(), random_moves(40, seed=4)
+    for direction, face in scramble:
+        rubik.move(direction, face)
+    solution = []
+    for direction, face in RubikSolver.solve(rubik, D):
+        rubik.move(direction, face)
+        solution.append((direction, face))
+    assert verify(scramble, solution)
+    assert not verify(scramble, solution[:-1])
+    assert Permutation.from_moves(solution).solves(Permutation.from_moves(scramble).apply(SOLVED))
+    assert RubikUtilities.is_solved(rubik)
@@ -0,0 +1,68 @@
+from random import Random
+import profiling
+from profiling import Profiler, combine, DISABLED
+from constants import ALL_MOVES, D
+from rubik import Rubik
+from solver import RubikSolver
+
+
+class Owner:
+    @staticmethod
+    def plain(value):
+        return value * 2
+
+    @staticmethod
+    def steps(count):
+        for i in range(count):
+            yield i
+
+
+def shuffled(seed=0):
+    rubik, random = Rubik(), Random(seed)
+    for _ in range(40):
+        rubik.move(*random.choice(ALL_MOVES))
+    return rubik
+
+
+def test_wrapped_solve_is_timed_over_its_iteration(tmp_path):
+    original = RubikSolver.__dict__['solve']
+    profiler = Profiler(str(tmp_path))
+    profiler.wrap(RubikSolver, 'solve', 'RubikSolver.solve')
+    rubik = shuffled()
+    for direction, face in RubikSolver.solve(rubik, D):
+        rubik.move(direction, face)
+    profiler.restore()
+    durations = profiler.durations['RubikSolver.solve']
+    # The solve is a lazy chain of stage generators, its whole iteration takes milliseconds, not building it.
+    assert len(durations) == 1 and durations[0] > 0.001
+    assert RubikSolver.__dict__['solve'] is original
+
+
+def test_wrap_and_restore(tmp_path):
+    original = Owner.__dict__['plain']
+    profiler = Profiler(str(tmp_path))
+    profiler.wrap(Owner, 'plain')
+    profiler.wrap(Owner, 'steps')
+    assert Owner.plain(2) == 4 and list(Owner.steps(3)) == [0, 1, 2]
+    assert Owner().plain(1) == 2
+    profiler.restore()
+    assert Owner.__dict__['plain'] is original
+    assert len(profiler.durations['plain']) == 2 and len(profiler.durations['steps']) == 1
+    assert profiler.current == []
+
+
+def test_phases_and_summary(tmp_path):
+    profiler = Profiler(str(tmp_path), profiling.SAMPLE).start()
+    for _ in range(3):
+        with profiler.phase('outer'):
+            with profiler.phase('inner'):
+                sum(range(10000))
+    assert profiler.stop() == str(tmp_path)
+    assert len(profiler.durations['inner']) == 3
+    assert (tmp_path / 'phases.txt').read_text().splitlines()[1].split()[:2] == ['outer', '3']
+    assert (tmp_path / 'stacks.collapsed').exists()
+
+
+def test_combine_skips_disabled(tmp_path):
+    profiler = Profiler(str(tmp_path))
+    assert combine(profiler, DISABLED) is profiler and combine(DISABLED) is DISABLED
@@ -0,0 +1,40 @@
+from random import Random
+import numpy as np
+import pytest
+from nxn import NxNRubik, shuffle
+from reduction import CFOP, LAYER, ReductionSolver, _pure_cycle, _sequence_map, cycles, orbits, pieces
+
+
+@pytest.mark.parametrize('n', [4, 5])
+@pytest.mark.parametrize('seed', range(3))
+def test_solves_random_scrambles(n, seed):
+    rubik = NxNRubik(n)
+    shuffle(rubik, 60, Random(seed))
+    for move in ReductionSolver.solve(rubik):
+        rubik.move(*move)
+    assert rubik.is_solved()
+
+
+@pytest.mark.parametrize('n', [4, 5])
+def test_solves_with_the_layer_solver(n):
+    rubik = NxNRubik(n)
+    shuffle(rubik, 60, Random(n))
+    stages = ReductionSolver.solve_stages(rubik, LAYER)
+    for _, moves, _ in stages:
+        for move in moves:
+            rubik.move(*move)
+    assert rubik.is_solved()
+    assert len(ReductionSolver.solve_stages(rubik, CFOP)[-1][1]) == 0
+
+
+@pytest.mark.parametrize('n', [4, 5])
+def test_every_commutator_is_a_pure_3_cycle(n):
+    piece_of, _ = pieces(n)
+    orbit_of = {piece: index for index, orbit in enumerate(orbits(n)) for piece in orbit}
+    for orbit, table in cycles(n).items():
+        for source, destination, moves in table:
+            cycle = _pure_cycle(n, _sequence_map(n, moves), piece_of, orbit_of)
+            assert cycle is not None
+            assert orbit_of[piece_of[cycle[0][0]]] == orbit
+            # The moves take exactly the listed stickers where the table says.
+            assert dict(zip(*map(np.ndarray.tolist, cycle))) == dict(zip(source, destination))
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+from renderer import random_rubiks, render_batch
+
+
+def test_npy_output_holds_every_image(tmp_path):
+    path = str(tmp_path / 'images.npy')
+    render_batch(random_rubiks(5, seed=0), path, 5, size=32, processes=1, chunk_size=2)
+    images = np.load(path)
+    assert images.shape == (5, 32, 32, 3)
+    assert all(image.any() for image in images)
+
+
+@pytest.mark.parametrize('rendered', [3, 7])
+def test_count_mismatch_raises(tmp_path, rendered):
+    with pytest.raises(ValueError):
+        render_batch(random_rubiks(rendered, seed=0), str(tmp_path / 'images.npy'), 5, size=32, processes=1,
+                     chunk_size=2)
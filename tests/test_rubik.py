@@ -0,0 +1,22 @@
+from rubik import Rubik
+from constants import CW, ACW, R, U
+
+
+def test_state_key_follows_moves():
+    rubik, other = Rubik(), Rubik()
+    solved = rubik.state_key()
+    rubik.move(CW, R)
+    assert rubik.state_key() != solved
+    other.move(CW, R)
+    assert rubik.state_key() == other.state_key()
+    rubik.move(ACW, R)
+    assert rubik.state_key() == solved
+
+
+def test_rubik_stays_in_sets_after_moves():
+    rubik = Rubik()
+    rubiks = {rubik}
+    rubik.move(CW, U)
+    assert rubik in rubiks
+    # Identity equality, as before the state key: two solved rubiks are distinct objects.
+    assert Rubik() != Rubik()
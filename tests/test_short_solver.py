@@ -0,0 +1,45 @@
+from random import Random
+from compact import SOLVED, FACE_TURNS, decode, turn
+from short_solver import ShortSolver, _expand, inverse
+
+
+def scramble(turns):
+    state = SOLVED
+    for t in turns:
+        state = turn(state, t)
+    return state
+
+
+def test_short_scrambles_are_solved_optimally():
+    random = Random(1)
+    for length in range(1, 6):
+        turns = [random.randrange(len(FACE_TURNS)) for _ in range(length)]
+        solution = ShortSolver().solve_turns(scramble(turns))
+        assert solution is not None and scramble(turns + solution) == SOLVED
+        assert len(solution) <= length
+
+
+def test_inverse_undoes_every_turn():
+    for t in range(len(FACE_TURNS)):
+        assert turn(turn(SOLVED, t), inverse(t)) == SOLVED
+
+
+def test_expand_stops_at_the_limit():
+    visited = {hash(SOLVED): None}
+    frontier, _ = _expand([(SOLVED, None)], visited, {}, 50)
+    frontier, _ = _expand(frontier, visited, {}, 50)
+    assert frontier is None and len(visited) == 50
+
+
+def test_state_limit_hands_over_to_fallback():
+    fallen_back = []
+
+    def fallback(rubik):
+        fallen_back.append(rubik)
+        return []
+
+    solver = ShortSolver(max_states=100, fallback=fallback)
+    state = scramble([0, 3, 6, 9, 12, 15, 1, 4])
+    assert solver.solve_turns(state) is None
+    solver.solve(decode(state))
+    assert len(fallen_back) == 1
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import socket
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from random import Random
+from threading import Thread
+from time import perf_counter
+import pytest
+from constants import ALL_MOVES
+from compact import SOLVED, move
+from solve_service import LAYER, Batcher, SolveClient, SolveService, solve, solve_batch
+
+
+def scrambled(count, seed=0):
+    random = Random(seed)
+    states = []
+    for _ in range(count):
+        state = SOLVED
+        for direction, face in (random.choice(ALL_MOVES) for _ in range(30)):
+            state = move(state, direction, face)
+        states.append(state)
+    return states
+
+
+async def solve_all(executor, states, workers):
+    batcher = Batcher(executor, LAYER, size=len(states), window=1, workers=workers)
+    return await asyncio.gather(*(batcher.submit(state) for state in states), return_exceptions=True)
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(1)
+        self.chunks = []
+
+    def submit(self, function, states, *args):
+        self.chunks.append(len(states) // len(SOLVED))
+        return super().submit(function, states, *args)
+
+
+def test_batch_is_split_across_workers():
+    states = scrambled(10)
+    with CountingExecutor() as executor:
+        solutions = asyncio.run(solve_all(executor, states, workers=4))
+    assert executor.chunks == [3, 3, 3, 1]
+    assert solutions == [solve(state) for state in states]
+
+
+def test_failures_stay_with_their_request():
+    states = scrambled(3)
+    states[1] = bytes(len(SOLVED))
+    with CountingExecutor() as executor:
+        solutions = asyncio.run(solve_all(executor, states, workers=2))
+    assert isinstance(solutions[1], ValueError)
+    assert solutions[0] == solve(states[0]) and solutions[2] == solve(states[2])
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 2, reason='needs several cores')
+def test_batch_solves_faster_than_serial():
+    processes = min(4, os.cpu_count())
+    states = scrambled(8 * processes)
+    started = perf_counter()
+    solve_batch(b''.join(states))
+    serial = perf_counter() - started
+    with ProcessPoolExecutor(processes) as executor:
+        # Start the workers before timing.
+        list(executor.map(solve, [SOLVED] * processes))
+        started = perf_counter()
+        asyncio.run(solve_all(executor, states, processes))
+        parallel = perf_counter() - started
+    assert parallel < serial / processes * 1.5
+
+
+def serve_once(*replies):
+    # A server answering each of its first connections with the given lines, then closing it.
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(len(replies))
+
+    def answer():
+        for lines in replies:
+            connection, _ = server.accept()
+            connection.makefile('r').readline()
+            connection.sendall(lines.encode())
+            connection.close()
+        server.close()
+
+    Thread(target=answer, daemon=True).start()
+    return server.getsockname()
+
+
+def test_unattributable_error_fails_every_pending_request():
+    client = SolveClient(serve_once('ERR - Malformed request\n'))
+    solutions = client.solve_many(scrambled(3))
+    assert all(isinstance(solution, ValueError) for solution in solutions)
+    client.close()
+
+
+def test_connection_loss_fails_every_pending_request():
+    client = SolveClient(serve_once('OK 0 1 F\n'))
+    solutions = client.solve_many(scrambled(2))
+    assert solutions[0] == ['F'] and isinstance(solutions[1], ConnectionError)
+    client.close()
+
+
+def test_stale_answers_are_not_matched_to_the_next_requests():
+    # The answers of the failed requests come after the error, the next requests go to a new connection.
+    client = SolveClient(serve_once('ERR - Malformed request\nOK 0 1 F\nOK 1 1 R\n', 'OK 2 1 U\nOK 3 1 B\n'))
+    assert all(isinstance(solution, ValueError) for solution in client.solve_many(scrambled(2)))
+    assert client.solve_many(scrambled(2)) == [['U'], ['B']]
+    client.close()
+
+
+def test_cancelled_batch_cancels_its_requests():
+    async def cancel():
+        loop = asyncio.get_running_loop()
+        batch = [(SOLVED, loop.create_future()) for _ in range(2)]
+        solving = loop.create_future()
+        solving.cancel()
+        Batcher.resolve(batch, solving)
+        return [future.cancelled() for _, future in batch]
+
+    assert asyncio.run(cancel()) == [True, True]
+
+
+def test_undecodable_request_gets_an_error_line():
+    async def exchange():
+        service = SolveService(workers=1, batch_size=1)
+        server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+        try:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname())
+            writer.write(b'\xff\xfe 0\n1 ' + SOLVED.hex().encode() + b'\n')
+            await writer.drain()
+            answers = sorted([(await reader.readline()).decode(), (await reader.readline()).decode()])
+            writer.close()
+            return answers
+        finally:
+            server.close()
+            service.executor.shutdown()
+
+    error, solved = asyncio.run(exchange())
+    assert error.startswith('ERR - ') and 'UTF-8' in error
+    assert solved.startswith('OK 1 ')
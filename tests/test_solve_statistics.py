@@ -0,0 +1,19 @@
+import os
+from glob import glob
+import numpy as np
+from solve_statistics import collect, generate
+
+
+def test_resume_with_another_chunk_size(tmp_path):
+    corpus, output = str(tmp_path / 'corpus.npy'), str(tmp_path / 'results.npz')
+    generate(corpus, 12, seed=0)
+    complete = collect(corpus, output, processes=1, chunk_size=5)
+    # An interrupted run: the part of states 5 to 9 is lost, then the run is resumed with smaller chunks.
+    os.remove(os.path.join(output + '.parts', 'part-000000005-000000010.npz'))
+    resumed = collect(corpus, output, processes=1, chunk_size=3)
+    assert resumed['index'].tolist() == list(range(12))
+    assert resumed['solver_moves'].tolist() == complete['solver_moves'].tolist()
+    parts = sorted(os.path.basename(path) for path in glob(os.path.join(output + '.parts', '*.npz')))
+    assert parts == ['part-000000000-000000005.npz', 'part-000000005-000000008.npz', 'part-000000008-000000010.npz',
+                     'part-000000010-000000012.npz']
+    assert np.load(output)['index'].tolist() == list(range(12))
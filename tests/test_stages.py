@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from compact import encode
+from constants import CENTERS
+from rubik import Rubik
+from solver import RubikSolver
+from stages import SOLVED_STAGE, stage, stages
+from utilities import RubikUtilities
+
+PREDICATES = [RubikUtilities.is_bottom_cross_solved, RubikUtilities.is_bottom_layer_solved,
+              RubikUtilities.is_middle_layer_solved, RubikUtilities.is_top_cross_solved,
+              RubikUtilities.is_top_edges_solved, RubikUtilities.is_positioned_top_corners,
+              RubikUtilities.is_oriented_top_corners]
+
+
+def predicate_stage(rubik, base):
+    # The stage as the predicates give it: the first one not holding.
+    return next((index for index, predicate in enumerate(PREDICATES) if not predicate(rubik, base)), SOLVED_STAGE)
+
+
+@pytest.mark.parametrize('base', CENTERS)
+@pytest.mark.parametrize('scramble', range(3))
+def test_stage_matches_the_predicates_at_every_step(base, scramble):
+    rubik = Rubik()
+    RubikUtilities.shuffle(rubik, 50)
+    states, expected = [encode(rubik)], [predicate_stage(rubik, base)]
+    for direction, face in RubikSolver.solve(rubik, base):
+        rubik.move(direction, face)
+        states.append(encode(rubik))
+        expected.append(predicate_stage(rubik, base))
+    assert [stage(state, base) for state in states] == expected
+    array = np.frombuffer(b''.join(states), dtype=np.uint8).reshape(len(states), -1)
+    assert stages(array, base).tolist() == expected
+    # The solve goes through the stages up to solved, a lucky one being skipped at times.
+    assert expected[-1] == SOLVED_STAGE and len(set(expected)) > SOLVED_STAGE // 2
@@ -0,0 +1,65 @@
+import pytest
+from transposition import TranspositionTable, ALWAYS, DEPTH, ENTRY_BYTES
+
+
+def colliding(table, key):
+    # Another key of the same slot.
+    return key + table.capacity
+
+
+def test_capacity_follows_the_memory_cap():
+    assert TranspositionTable(100 * ENTRY_BYTES).capacity == 100
+    assert TranspositionTable(0).capacity == 1
+    with pytest.raises(ValueError):
+        TranspositionTable(policy='oldest')
+
+
+def test_lookup_returns_the_stored_bound():
+    table = TranspositionTable(100 * ENTRY_BYTES)
+    assert table.lookup(5) is None
+    table.store(5, 7, 3)
+    assert table.lookup(5) == 7
+    # A lower bound of the same state never replaces a higher one, a higher one does.
+    table.store(5, 4, 9)
+    assert table.lookup(5) == 7
+    table.store(5, 9, 1)
+    assert table.lookup(5) == 9
+    # Bounds and depths are capped to a byte, key 0 is stored as 1.
+    table.store(0, 300, 300)
+    assert table.lookup(0) == table.lookup(1) == 255
+
+
+def test_depth_policy_keeps_the_deeper_entry():
+    table = TranspositionTable(100 * ENTRY_BYTES, DEPTH)
+    table.store(5, 7, 6)
+    other = colliding(table, 5)
+    table.store(other, 8, 2)
+    assert table.lookup(5) == 7 and table.lookup(other) is None
+    table.store(other, 8, 6)
+    assert table.lookup(5) is None and table.lookup(other) == 8
+
+
+def test_always_policy_keeps_the_newest_entry():
+    table = TranspositionTable(100 * ENTRY_BYTES, ALWAYS)
+    table.store(5, 7, 6)
+    other = colliding(table, 5)
+    table.store(other, 8, 2)
+    assert table.lookup(5) is None and table.lookup(other) == 8
+
+
+def test_statistics():
+    table = TranspositionTable(100 * ENTRY_BYTES, ALWAYS)
+    assert table.statistics() == {'probes': 0, 'hit_rate': 0.0, 'collision_rate': 0.0, 'stores': 0,
+                                  'replacements': 0}
+    table.store(5, 7, 6)
+    table.store(5, 8, 6)
+    table.store(colliding(table, 5), 8, 6)
+    # A hit, a collision, then a miss on an empty slot.
+    table.lookup(colliding(table, 5))
+    table.lookup(5)
+    table.lookup(6)
+    assert table.statistics() == {'probes': 3, 'hit_rate': 1 / 3, 'collision_rate': 1 / 3, 'stores': 3,
+                                  'replacements': 1}
+    table.clear()
+    assert table.lookup(colliding(table, 5)) is None
+    assert table.statistics()['probes'] == 1 and table.statistics()['stores'] == 0
@@ -0,0 +1,38 @@
+import sys
+import pytest
+import verifier
+from verifier import TOKEN_TURNS, generate, turns, verify_file, verify_lines
+
+
+def run_main(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['verifier.py', *args])
+    with pytest.raises(SystemExit) as exited:
+        verifier.main()
+    return exited.value.code
+
+
+def test_verify_lines():
+    lines = ["R U2 F'\tF U2 R'\n", "R U\tU' R'\n", "R U\tR' U'\n", "Rw M'\tM Rw'\n", 'R U\n', "R Q\tR'\n"]
+    assert verify_lines(lines).tolist() == [True, True, False, True, False, False]
+
+
+def test_every_face_turn_token_is_known():
+    assert len(TOKEN_TURNS) == 24 and turns("R2' U F'") is not None and turns('R x') is None
+
+
+def test_generated_file_verifies(tmp_path, monkeypatch):
+    path = str(tmp_path / 'pairs.tsv')
+    generate(path, 30, steps=20, seed=0)
+    assert list(verify_file(path, processes=1, chunk_size=7))[-1][0] == 30
+    assert run_main(monkeypatch, path, '--processes', '1') == 0
+
+
+def test_corrupted_line_fails(tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'pairs.tsv'
+    generate(str(path), 5, steps=20, seed=1)
+    lines = path.read_text().splitlines(keepends=True)
+    scramble, solution = lines[2].rstrip('\n').split('\t')
+    lines[2] = f'{scramble}\t{solution} R\n'
+    path.write_text(''.join(lines))
+    assert run_main(monkeypatch, str(path), '--processes', '1') == 1
+    assert 'line 3' in capsys.readouterr().out
@@ -0,0 +1,74 @@
+"""
+    Transposition table for the iterative deepening searches: a fixed size table, allocated once from a memory cap,
+    mapping a 64-bit state hash to the best known lower bound of the distance to solved and the depth of the search
+    which established it. The slot of a key is its hash modulo the capacity, a key meeting another key in its slot
+    is a collision, resolved by the replacement policy:
+        'depth'  - keep the entry established by the deeper search (more work to redo if lost),
+        'always' - the newest entry replaces the old one.
+    Lookups and stores are guarded by a lock so that one table can be shared by several threads.
+"""
+from array import array
+from threading import Lock
+
+DEPTH, ALWAYS = 'depth', 'always'
+ENTRY_BYTES = 8 + 1 + 1
+KEY_MASK = (1 << 64) - 1
+
+
+class TranspositionTable:
+    def __init__(self, memory=64 << 20, policy=DEPTH):
+        if policy not in (DEPTH, ALWAYS):
+            raise ValueError(f'Unknown replacement policy {policy}')
+        self.capacity = max(1, memory // ENTRY_BYTES)
+        self.policy = policy
+        # Key 0 marks an empty slot, so stored keys are never 0.
+        self.keys = array('Q', bytes(8 * self.capacity))
+        self.bounds = array('B', bytes(self.capacity))
+        self.depths = array('B', bytes(self.capacity))
+        self.lock = Lock()
+        self.probes = self.hits = self.collisions = self.stores = self.replacements = 0
+
+    @staticmethod
+    def _key(key):
+        return (key & KEY_MASK) or 1
+
+    def lookup(self, key):
+        # Returns the stored lower bound of the state, or None.
+        key = self._key(key)
+        slot = key % self.capacity
+        with self.lock:
+            self.probes += 1
+            stored = self.keys[slot]
+            if stored == key:
+                self.hits += 1
+                return self.bounds[slot]
+            if stored:
+                self.collisions += 1
+            return None
+
+    def store(self, key, bound, depth):
+        # Records that the state needs at least bound moves, found by a search depth moves deep.
+        key = self._key(key)
+        slot = key % self.capacity
+        bound, depth = min(bound, 255), min(depth, 255)
+        with self.lock:
+            stored = self.keys[slot]
+            if stored == key:
+                if bound < self.bounds[slot]:
+                    return
+            elif stored:
+                if self.policy == DEPTH and depth < self.depths[slot]:
+                    return
+                self.replacements += 1
+            self.keys[slot], self.bounds[slot], self.depths[slot] = key, bound, depth
+            self.stores += 1
+
+    def clear(self):
+        with self.lock:
+            self.keys = array('Q', bytes(8 * self.capacity))
+            self.probes = self.hits = self.collisions = self.stores = self.replacements = 0
+
+    def statistics(self):
+        probes = max(self.probes, 1)
+        return {'probes': self.probes, 'hit_rate': self.hits / probes, 'collision_rate': self.collisions / probes,
+                'stores': self.stores, 'replacements': self.replacements}
@@ -0,0 +1,143 @@
+"""
+    Bulk solution verifier. Streams (scramble, solution) pairs from a text file, one pair per line as two sequences
+    in WCA notation separated by a tab, e.g. "R U2 F' D\tD' F U2 R'", and checks that every solution solves its
+    scramble. Lines are verified in chunks by a process pool: a chunk's face turns become a padded array of turn
+    indices and all its states are turned at once with numpy, one gather per turn column, using the sticker
+    permutations of compact.py (derived from rubik.Move). Solved is checked in bulk, every sticker against the center
+    of its face, so solutions ending in another orientation pass too. Lines using other moves (wide, slices,
+    rotations) are played one by one with their compiled permutation (see notation.py).
+    Mismatches are reported with their line number (from 1), malformed lines count as mismatches.
+
+    Usage: python verifier.py pairs.tsv [--processes 4] [--chunk-size 20000]
+           python verifier.py pairs.tsv --generate 10000 [--steps 50] [--seed 0]
+"""
+import numpy as np
+from argparse import ArgumentParser
+from itertools import islice
+from multiprocessing import Pool
+from random import Random
+from time import perf_counter
+import notation
+from constants import ALL_MOVES, CW, D
+from compact import FACE_TURNS, TURN_PERMUTATIONS, SOLVED, move
+from stages import CENTER_OF
+
+LETTERS = {face: letter for letter, face in notation.FACES.items()}
+# Turn index of every face turn token, e.g. "R2"; the last row of TURN_TABLE (padding) leaves states unchanged.
+TOKEN_TURNS = {LETTERS[face] + {1: '', 2: '2'}[times] + ('' if direction == CW else "'"): index
+               for index, (direction, face, times) in enumerate(FACE_TURNS)}
+TOKEN_TURNS.update({token + "'": index for token, index in list(TOKEN_TURNS.items()) if token.endswith('2')})
+PADDING = len(FACE_TURNS)
+TURN_TABLE = np.array(TURN_PERMUTATIONS + [tuple(range(len(SOLVED)))], dtype=np.uint8)
+SOLVED_ARRAY = np.frombuffer(SOLVED, dtype=np.uint8)
+
+
+def turns(text):
+    # The turn indices of a sequence of face turns, None if it has any other move.
+    try:
+        return [TOKEN_TURNS[token] for token in text.split()]
+    except KeyError:
+        return None
+
+
+def _is_solved(states):
+    return (states == states[:, CENTER_OF]).all(axis=1)
+
+
+def verify_lines(lines):
+    # Returns one bool per line: whether its solution solves its scramble.
+    results = np.zeros(len(lines), dtype=bool)
+    fast, sequences = [], []
+    for index, line in enumerate(lines):
+        pair = line.rstrip('\n').split('\t')
+        if len(pair) != 2:
+            continue
+        sequence = turns(pair[0] + ' ' + pair[1])
+        if sequence is not None:
+            fast.append(index)
+            sequences.append(sequence)
+        else:
+            try:
+                state = notation.apply(SOLVED, pair[0] + ' ' + pair[1])
+            except ValueError:
+                continue
+            results[index] = _is_solved(np.frombuffer(state, dtype=np.uint8)[None])[0]
+    if fast:
+        padded = np.full((len(fast), max(map(len, sequences))), PADDING, dtype=np.uint8)
+        for row, sequence in enumerate(sequences):
+            padded[row, :len(sequence)] = sequence
+        states = np.tile(SOLVED_ARRAY, (len(fast), 1))
+        for column in padded.T:
+            states = np.take_along_axis(states, TURN_TABLE[column], axis=1)
+        results[fast] = _is_solved(states)
+    return results
+
+
+def _verify_chunk(args):
+    start, lines = args
+    return start, len(lines), (start + np.flatnonzero(~verify_lines(lines))).tolist()
+
+
+def _chunks(path, chunk_size):
+    with open(path) as pairs:
+        start = 0
+        while True:
+            lines = list(islice(pairs, chunk_size))
+            if not lines:
+                return
+            yield start, lines
+            start += len(lines)
+
+
+def verify_file(path, processes=None, chunk_size=20000):
+    """
+        Generates (verified, mismatches) as chunks finish: the number of lines verified so far and the line numbers
+        (from 1) of the mismatches in the chunk, in no particular order between chunks.
+    """
+    verified = 0
+    with Pool(processes) as pool:
+        for _, count, mismatches in pool.imap_unordered(_verify_chunk, _chunks(path, chunk_size)):
+            verified += count
+            yield verified, [index + 1 for index in mismatches]
+
+
+def generate(path, count, steps=50, seed=None):
+    # Writes count pairs of random scrambles and their CFOP solutions.
+    from cfop import CFOPSolver
+    random = Random(seed)
+    with open(path, 'w') as pairs:
+        for _ in range(count):
+            scramble = [random.choice(ALL_MOVES) for _ in range(steps)]
+            state = SOLVED
+            for direction, face in scramble:
+                state = move(state, direction, face)
+            pairs.write(f'{notation.notation(scramble)}\t{notation.notation(CFOPSolver.solve_state(state, D))}\n')
+
+
+def main():
+    parser = ArgumentParser(description='Checks that every solution of a file of (scramble, solution) pairs solves its '
+                                        'scramble.')
+    parser.add_argument('pairs', help='Text file, one "scramble<TAB>solution" pair per line in WCA notation')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=20000)
+    parser.add_argument('--generate', type=int, metavar='COUNT', help='Write COUNT random pairs instead')
+    parser.add_argument('--steps', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    if args.generate:
+        generate(args.pairs, args.generate, args.steps, args.seed)
+        return
+    started, mismatches, verified = perf_counter(), [], 0
+    for verified, found in verify_file(args.pairs, args.processes, args.chunk_size):
+        mismatches += found
+        print(f'{verified} pairs verified, {len(mismatches)} mismatches', end='\r')
+    seconds = perf_counter() - started
+    print(f'{verified} pairs verified in {seconds:.1f}s ({verified / max(seconds, 1e-9) * 3600:,.0f} per hour), '
+          f'{len(mismatches)} mismatches')
+    for line in sorted(mismatches):
+        print(f'    line {line}')
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()